@@ -0,0 +1,84 @@
+# this class used as the value returned by every method of api_library clients (UserAccount, Password, ...):
+# - can still be unpacked the same way as before: "response_body, status = api.user_logout()"
+# (or "response, status = ..." for methods in the raw-response mode, e.g. username_check, where the first value
+# is the result itself and works like a response: .json(), .text, .content, .status_code)
+# - the body is decoded only when it's needed (on .json() or when the result is unpacked), and only once,
+# so checking only the status (result.status or result[1]) costs no parsing
+# - an empty body (e.g. 204 No Content) is decoded as None instead of raising an error
+# - timing of the API-call: .elapsed (from sending till the response received) and .timings
+# (all timings measured by the transport, see metrics.py - None for responses replayed from the cassette
+# or received by async clients)
+#
+# EXAMPLE:
+#     result = api.request_email_verify(email)
+#     assert result.status == 422
+#     assert result.json()["detail"][0]["type"] == "value_error.email"
+
+_NOT_DECODED = object()
+
+
+class ApiResult:
+
+    # "first" - what is returned first when the result is unpacked:
+    # "json" - decoded body, "text" - body as text, "response" - the result itself (raw-response mode)
+    def __init__(self, response, first="json"):
+        self.response = response  # response of requests or httpx
+        self.first = first
+        self._json = _NOT_DECODED
+
+    @property
+    def status(self):
+        return self.response.status_code
+
+    # the same name as the one of responses (for callers of the raw-response mode)
+    @property
+    def status_code(self):
+        return self.response.status_code
+
+    @property
+    def content(self):
+        return self.response.content
+
+    @property
+    def text(self):
+        return self.response.text
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    # time (in seconds) from sending the API-call till the response received
+    @property
+    def elapsed(self):
+        return self.response.elapsed.total_seconds()
+
+    @property
+    def timings(self):
+        return getattr(self.response, "timings", None)
+
+    # returns the decoded body (decoded on the first call only), None if the body is empty
+    def json(self):
+        if self._json is _NOT_DECODED:
+            self._json = self.response.json() if self.response.content.strip() else None
+        return self._json
+
+    def __getitem__(self, index):
+        if index in (1, -1):
+            return self.status
+        if index in (0, -2):
+            if self.first == "json":
+                return self.json()
+            if self.first == "text":
+                return self.text
+            return self
+        raise IndexError("ApiResult index out of range: use 0 (body) or 1 (status)")
+
+    def __iter__(self):
+        yield self[0]
+        yield self[1]
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return f"<ApiResult {self.status}>"
@@ -0,0 +1,87 @@
+# async twin of the Password-class (same methods, same values returned), used to run many API-calls at once
+# from one process (see AsyncUserAccount-class for an example); API-calls are sent by the transport
+#
+# (no allure step is reported for every call - allure can't nest steps of coroutines that run at the same time)
+
+import httpx
+import os
+
+from api.api_library.api_result import ApiResult
+from api.api_library.transport import get_default_transport
+
+
+class AsyncPassword:
+
+    def __init__(self, session: httpx.AsyncClient, transport=None):
+        self.base_url = os.environ.get("BASIC_URL")
+        self.session = session
+        self.transport = transport or get_default_transport()  # sends API-calls (with timeouts and retries)
+
+    # change password while being authorized and being in the user profile
+    async def change_password_in_profile(self, old_password, new_password):
+        request_body = {
+            "newPassword1": new_password,
+            "newPassword2": new_password,
+            "oldPassword": old_password
+        }
+
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/change_password_in_profile",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    # the next 3 methods are used for 3-steps process to reset a new password instead of the old that was forgotten
+    async def request_password_recovery_by_email_or_username(self, email_or_username):
+        request_body = {
+            "recoveryField": email_or_username
+        }
+
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/request_password_recovery",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def confirm_password_recovery(self, reset_token):
+        response = await self.transport.request_async(
+            self.session, "GET", self.base_url + f"/api/password/reset_password?reset_token={reset_token}"
+        )
+        return ApiResult(response, first="text")
+
+    async def reset_password(self, new_password, reset_token):
+        request_body = {
+            "newPassword1": new_password,
+            "newPassword2": new_password,
+            "resetToken": reset_token
+        }
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/reset_password",
+            json=request_body
+        )
+        return ApiResult(response)
+
+
+    #  ------ NEXT METHODS ARE USED IN NEGATIVE TESTS (to run API-calls with custom request body if needed)
+
+    # change password while being authorized and being in the user profile
+    async def change_password_in_profile_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/change_password_in_profile",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def request_password_recovery_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/request_password_recovery",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def reset_password_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/password/reset_password",
+            json=request_body
+        )
+        return ApiResult(response)
@@ -0,0 +1,117 @@
+# async twin of the UserAccount-class (same methods, same values returned), used to run many API-calls at once
+# from one process, e.g.:
+#     async with httpx.AsyncClient() as session:
+#         api = AsyncUserAccount(session)
+#         results = await asyncio.gather(*(api.request_email_verify(email) for email in emails))
+# API-calls are sent by the transport, like the ones of sync clients (timeouts, retries, latency, cassette,
+# circuit breaker - see Transport.request_async() in transport.py)
+#
+# (no allure step is reported for every call - allure can't nest steps of coroutines that run at the same time)
+
+import httpx
+import os
+
+from api.api_library.api_result import ApiResult
+from api.api_library.transport import get_default_transport
+
+
+class AsyncUserAccount:
+
+    def __init__(self, session: httpx.AsyncClient, transport=None):
+        self.base_url = os.environ.get("BASIC_URL")
+        self.session = session
+        self.transport = transport or get_default_transport()  # sends API-calls (with timeouts and retries)
+
+    async def user_registration(self, username, email, password):
+        request_body = {
+            "username": username,
+            "email": email,
+            "password": password
+        }
+
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/registration",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def confirm_email(self, token):
+        response = await self.transport.request_async(
+            self.session, "GET", self.base_url + f"/api/email/confirm_email/{token}",
+            endpoint="/api/email/confirm_email/{token}"
+        )
+        return ApiResult(response)
+
+    async def log_in_with_email_or_username(self, email_or_username, password):
+        request_body = {
+            "username": email_or_username,
+            "password": password
+        }
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/login/oauth",
+            data=request_body  # !use this form for each request in x-www-form-urlencoded format
+        )
+        return ApiResult(response)
+
+    async def user_logout(self):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/logout"
+        )
+        return ApiResult(response)
+
+    async def request_delete_user(self):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/delete/request_delete"
+        )
+        return ApiResult(response)
+
+    async def delete_user(self, code):
+        response = await self.transport.request_async(
+            self.session, "DELETE", self.base_url + f"/api/delete/user/{code}",
+            endpoint="/api/delete/user/{code}"
+        )
+        return ApiResult(response)
+
+    async def request_email_verify(self, email):
+        request_body = {"email": email}
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/email/request_email_verify",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def username_check(self, username):
+        request_body = {"username": username}
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/registration/username_check",
+            json=request_body
+        )
+        return ApiResult(response, first="response")
+
+    async def user_registration_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/registration",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def log_in_with_email_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/login/oauth",
+            data=request_body  # !use this form for each request in x-www-form-urlencoded format
+        )
+        return ApiResult(response)
+
+    async def request_email_verify_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/email/request_email_verify",
+            json=request_body
+        )
+        return ApiResult(response)
+
+    async def username_check_custom_body(self, request_body):
+        response = await self.transport.request_async(
+            self.session, "POST", self.base_url + "/api/registration/username_check",
+            json=request_body
+        )
+        return ApiResult(response, first="response")
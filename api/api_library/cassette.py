@@ -0,0 +1,176 @@
+# this class used to record responses of API-calls and replay them instead of sending API-calls again (cassette):
+# - only responses that depend on the request alone are recorded - by default validation errors (422),
+# so API-calls that change something in the backend are always sent
+# - a recorded response is found by the key: method, path and query of the URL, whether the API-call was authorized,
+# and the body - all of them exactly as they are (keys sorted), so only the same request gets the response recorded
+# - tokens and passwords are never saved: in the key their values are replaced by a hash (the same value - the same
+# hash), and in responses such fields - as well as these values echoed back anywhere in the response
+# (e.g. inside validation errors) - are redacted
+# - staleness: in the "record" mode every API-call is sent, and a recorded response that differs from the new one
+# is reported as stale (and replaced); in the "replay" mode a share of replayed API-calls can be checked the same way
+# - tests marked with @pytest.mark.live always send API-calls (see api/conftest.py)
+
+# settings can be changed in the .env file:
+# HTTP_CASSETTE_MODE - "off" (by default), "record" (send every API-call and save responses),
+# "replay" (use responses saved, send and save others)
+# HTTP_CASSETTE_PATH - file with responses saved ("api/cassettes/api_cassette.json" by default)
+# HTTP_CASSETTE_STATUSES - statuses of responses that are saved ("422" by default)
+# HTTP_CASSETTE_VERIFY_SHARE - share of replayed API-calls that are also sent to check for staleness (0 by default)
+
+import hashlib
+import json
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+REDACTED_FIELDS = {"access_token", "token", "resetToken", "password", "newPassword1", "newPassword2",
+                   "oldPassword"}
+
+
+# replaces the value of a secret field with its hash (stable: the same value always gets the same hash)
+def hash_of(value):
+    return f"<sha256:{hashlib.sha256(json.dumps(value).encode()).hexdigest()}>"
+
+
+# returns the value as it is (keys of dicts sorted), but values of secret fields are replaced by their hashes
+def normalize(value):
+    if isinstance(value, dict):
+        return {key: hash_of(value[key]) if key in REDACTED_FIELDS else normalize(value[key]) for key in sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+# returns values of secret fields (strings) found in the request body or query
+def secrets_of(value):
+    if isinstance(value, dict):
+        return [secret for key, item in value.items()
+                for secret in ([item] if key in REDACTED_FIELDS and isinstance(item, str) and item
+                               else secrets_of(item))]
+    if isinstance(value, (list, tuple)):
+        return [secret for item in value for secret in secrets_of(item)]
+    return []
+
+
+# redacts secret fields, and secret values of the request ("secrets") wherever they are echoed back
+def redact(value, secrets=()):
+    if isinstance(value, dict):
+        return {key: "<redacted>" if key in REDACTED_FIELDS else redact(item, secrets) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item, secrets) for item in value]
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, "<redacted>")
+    return value
+
+
+class Cassette:
+
+    def __init__(self, path, mode="replay", statuses=(422,), verify_share=0.0):
+        self.path = path
+        self.mode = mode  # "record" or "replay"
+        self.statuses = set(statuses)
+        self.verify_share = verify_share
+        self.entries = {}  # key -> recorded response: {"status", "content_type", "body", "recorded_at"}
+        self.force_live = False  # True while a test marked with @pytest.mark.live is run
+        self.replayed = 0
+        self.recorded = 0
+        self.stale = []  # keys of entries that differed from the live response
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as file:
+                self.entries = json.load(file)
+
+    # creates the cassette with settings from the .env file (or returns None if the mode is "off")
+    @classmethod
+    def from_env(cls):
+        mode = os.environ.get("HTTP_CASSETTE_MODE", "off").lower()
+        if mode == "off":
+            return None
+        assert mode in ("record", "replay"), f"Unknown HTTP_CASSETTE_MODE: {mode}, use: off, record, replay"
+        return cls(
+            os.environ.get("HTTP_CASSETTE_PATH", os.path.join("api", "cassettes", "api_cassette.json")),
+            mode=mode,
+            statuses=[int(status) for status in os.environ.get("HTTP_CASSETTE_STATUSES", "422").split(",")],
+            verify_share=float(os.environ.get("HTTP_CASSETTE_VERIFY_SHARE", 0))
+        )
+
+    # returns the query and the body of the API-call
+    def request_of(self, url, kwargs):
+        query = dict(parse_qsl(urlparse(url).query, keep_blank_values=True))
+        query.update(kwargs.get("params") or {})
+        body = kwargs.get("json") if kwargs.get("json") is not None else kwargs.get("data")
+        return query, body
+
+    def key_of(self, session, method, url, kwargs):
+        query, body = self.request_of(url, kwargs)
+        authorized = "Authorization" in session.headers or "Authorization" in (kwargs.get("headers") or {})
+        return json.dumps([method.upper(), urlparse(url).path, normalize(query), authorized, normalize(body)])
+
+    # returns the recorded response for the API-call (None if it must be sent)
+    def play(self, key):
+        if self.mode != "replay" or self.force_live:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or random.random() < self.verify_share:
+            return None
+        self.replayed += 1
+        return self.build_response(entry)
+
+    def build_response(self, entry):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response._content = entry["body"].encode()
+        response.headers = CaseInsensitiveDict({"Content-Type": entry["content_type"]})
+        response.encoding = "utf-8"
+        response.elapsed = timedelta(0)
+        return response
+
+    # saves the response of an API-call sent (if its status is recorded), and reports the entry as stale
+    # if the response differs from the one recorded before
+    # ("url" and "kwargs" - of the API-call, secret values sent in it are redacted in the response)
+    def record(self, key, response, url="", kwargs=None):
+        if self.force_live or response.status_code not in self.statuses:
+            return
+        secrets = sorted(set(secrets_of(list(self.request_of(url, kwargs or {})))), key=len, reverse=True)
+        content_type = response.headers.get("Content-Type", "")
+        body = response.text
+        if "json" in content_type and body:
+            body = json.dumps(redact(response.json(), secrets))
+        else:
+            body = redact(body, secrets)
+        entry = {"status": response.status_code, "content_type": content_type, "body": body,
+                 "recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+
+        with self.lock:
+            recorded_before = self.entries.get(key)
+            changed = recorded_before is None \
+                or (recorded_before["status"], recorded_before["body"]) != (entry["status"], entry["body"])
+            if recorded_before is not None and changed:
+                self.stale.append(key)
+                print(f"Cassette entry is stale (the live response differs): {key}")
+            if changed:
+                self.recorded += 1
+                self.entries[key] = entry
+
+    # saves all entries into the file (merged with entries saved there by other processes in the meantime)
+    def save(self):
+        with self.lock:
+            entries = {}
+            if os.path.exists(self.path):
+                with open(self.path) as file:
+                    entries = json.load(file)
+            entries.update(self.entries)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as file:
+                json.dump(entries, file, indent=1, sort_keys=True)
+
+    def summary(self):
+        return f"Cassette ({self.mode}): {self.replayed} API-calls replayed, {self.recorded} responses recorded, " \
+               f"{len(self.stale)} stale entries replaced"
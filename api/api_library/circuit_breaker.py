@@ -0,0 +1,167 @@
+# this class used to stop sending API-calls to a service that is down or hangs (the J.* backend, the mailbox
+# service), so a broken environment fails the remaining tests in milliseconds instead of the full suite time:
+# - counts failed API-calls in a row for every service (host): connection errors, timeouts and responses with
+# temporary server errors (502, 503, 504) - after all retries of the transport
+# - after CIRCUIT_BREAKER_THRESHOLD failures in a row the circuit of the service is opened: every next API-call
+# to it fails right away (CircuitOpenError) without being sent
+# - every CIRCUIT_BREAKER_RESET_TIMEOUT seconds one API-call is let through to check the service again:
+# if it succeeds the circuit is closed, otherwise it stays open
+# - probe(url) - one quick API-call to check the service before tests start (any response that isn't a server
+# error in HEALTH_PROBE_TIMEOUT seconds is fine), the circuit is opened right away if the service doesn't respond
+# - one breaker is shared by all transports of the process (see get_circuit_breaker())
+
+# settings can be changed in the .env file:
+# CIRCUIT_BREAKER_THRESHOLD - failed API-calls in a row that open the circuit (5 by default, 0 - never open it)
+# CIRCUIT_BREAKER_RESET_TIMEOUT - time (in seconds) before the service is checked again (60 by default)
+# HEALTH_PROBE_TIMEOUT - max time (in seconds) the service is given to respond to the probe (5 by default)
+
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+
+# raised instead of sending an API-call to the service whose circuit is open
+# (a connection error - so it's handled the same way as if the service didn't respond)
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+
+class Circuit:
+
+    def __init__(self, service):
+        self.service = service
+        self.failures = 0  # failed API-calls in a row
+        self.opened_at = None  # time.monotonic() when the circuit was opened, None - the circuit is closed
+        self.trial_started_at = None  # time.monotonic() when one API-call was let through to check the service
+        self.last_error = None  # description of the last failure
+        self.short_circuited = 0  # API-calls not sent because the circuit was open
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold=None, reset_timeout=None, probe_timeout=None):
+        self.threshold = threshold if threshold is not None \
+            else int(os.environ.get("CIRCUIT_BREAKER_THRESHOLD", 5))
+        self.reset_timeout = reset_timeout if reset_timeout is not None \
+            else float(os.environ.get("CIRCUIT_BREAKER_RESET_TIMEOUT", 60))
+        self.probe_timeout = probe_timeout if probe_timeout is not None \
+            else float(os.environ.get("HEALTH_PROBE_TIMEOUT", 5))
+        self.circuits = {}  # host (with port) -> Circuit
+        self.lock = threading.Lock()
+
+    def _circuit_of(self, url):
+        service = urlparse(url).netloc
+        with self.lock:
+            return self.circuits.setdefault(service, Circuit(service))
+
+    # returns True if it's time to let one API-call through to check the service again
+    # (a check that didn't finish in time is given up)
+    def _trial_due(self, circuit):
+        last_attempt_at = circuit.trial_started_at if circuit.trial_started_at is not None else circuit.opened_at
+        return time.monotonic() - last_attempt_at >= self.reset_timeout
+
+    def _error(self, circuit, what):
+        return CircuitOpenError(
+            f"The service {circuit.service} is unavailable (the last error: {circuit.last_error}) - {what}")
+
+    # raises CircuitOpenError if API-calls to the service of the url can't be sent
+    # (lets one API-call through when it's time to check the service again)
+    def before_call(self, url):
+        if self.threshold <= 0:
+            return
+        circuit = self._circuit_of(url)
+        with self.lock:
+            if circuit.opened_at is None:
+                return
+            if self._trial_due(circuit):
+                circuit.trial_started_at = time.monotonic()
+                return
+            circuit.short_circuited += 1
+        raise self._error(circuit, "the API-call wasn't sent")
+
+    # raises CircuitOpenError if the service of the url is unavailable (e.g. before a test is started),
+    # unless it's time to check the service again
+    def check(self, url):
+        if self.threshold <= 0:
+            return
+        circuit = self._circuit_of(url)
+        with self.lock:
+            if circuit.opened_at is None or self._trial_due(circuit):
+                return
+            circuit.short_circuited += 1
+        raise self._error(circuit, "the test wasn't started")
+
+    def record_success(self, url):
+        circuit = self._circuit_of(url)
+        with self.lock:
+            if circuit.opened_at is not None:
+                print(f"The service {circuit.service} responds again, the circuit is closed")
+            circuit.failures = 0
+            circuit.opened_at = None
+            circuit.trial_started_at = None
+
+    # "error" - description of the failure (an exception or a status of the response)
+    def record_failure(self, url, error):
+        circuit = self._circuit_of(url)
+        with self.lock:
+            circuit.failures += 1
+            circuit.last_error = error
+            circuit.trial_started_at = None
+            if circuit.opened_at is not None or (0 < self.threshold <= circuit.failures):
+                if circuit.opened_at is None:
+                    print(f"The service {circuit.service} doesn't respond ({circuit.failures} failed API-calls "
+                          f"in a row, the last one: {error}) - the circuit is opened")
+                circuit.opened_at = time.monotonic()
+
+    def open(self, url, error):
+        circuit = self._circuit_of(url)
+        with self.lock:
+            circuit.last_error = error
+            circuit.opened_at = time.monotonic()
+        print(f"The service {circuit.service} is unavailable ({error}) - the circuit is opened")
+
+    # checks the service with one quick API-call (GET of the url given), opens the circuit if it fails;
+    # returns True if the service responded
+    def probe(self, url):
+        if self.threshold <= 0:
+            return True
+        started_at = time.monotonic()
+        try:
+            response = requests.get(url, timeout=self.probe_timeout, allow_redirects=False)
+        except requests.exceptions.RequestException as error:
+            self.open(url, f"health probe failed: {type(error).__name__}")
+            return False
+        elapsed = time.monotonic() - started_at
+        if response.status_code >= 500:
+            self.open(url, f"health probe failed: {response.status_code}")
+            return False
+        print(f"The service {urlparse(url).netloc} responded to the health probe in {elapsed:.2f} s")
+        return True
+
+    # returns a line about every circuit opened during the run (an empty string if there were none);
+    # "short_circuited" counts both API-calls and tests not started
+    def summary(self):
+        with self.lock:
+            lines = [f"Circuit breaker: the service {circuit.service} was unavailable "
+                     f"({'still' if circuit.opened_at is not None else 'available again in the end'}), "
+                     f"{circuit.short_circuited} API-calls and tests were not started, "
+                     f"the last error: {circuit.last_error}"
+                     for circuit in self.circuits.values()
+                     if circuit.short_circuited > 0 or circuit.opened_at is not None]
+        return "\n".join(lines)
+
+
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+
+# returns the circuit breaker shared by all transports
+def get_circuit_breaker():
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker()
+        return _circuit_breaker
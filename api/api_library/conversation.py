@@ -0,0 +1,91 @@
+# the file contains the client for conversations (chats) of the user authorized in the session:
+# - chat_list(params) - chats of the user (GET /api/chat_list with "limit" and "offset"), as every client does
+# - first_chat() - "chatInfo" of the first chat only (one API-call with limit=1), e.g. for fixtures that need
+# "some chat of the user"; it's kept in the cache shared by the whole session (ChatCache, separate for every
+# user account), so the next fixtures get it without API-calls
+# (the endpoint is checked against the real J.* backend by api/tests/conversation/test_chat_list.py)
+
+import os
+import threading
+
+import allure
+
+from api.api_library.api_result import ApiResult
+from api.api_library.token_manager import get_token_manager
+from api.api_library.transport import get_default_transport
+
+
+class Conversation:
+
+    def __init__(self, session, transport=None, cache=None):
+        self.base_url = os.environ.get("BASIC_URL")
+        self.session = session
+        self.transport = transport or get_default_transport()  # sends API-calls (with timeouts and retries)
+        self.cache = cache or get_chat_cache()  # "chatInfo" of first chats already received
+
+    @allure.step('Send request to get list of chats: {params}')
+    # "params" - {"limit": ..., "offset": ...}
+    def chat_list(self, params):
+        response = self.transport.request(
+            self.session, "GET", self.base_url + "/api/chat_list",
+            params=params
+        )
+        return ApiResult(response)
+
+    @allure.step('Get the first chat of the user')
+    # returns "chatInfo" of the first chat (from the cache if it was received before), None if the user has no chats
+    def first_chat(self, refresh=False):
+        user = self.cache.user_of(self.session)
+        if not refresh:
+            chat_info = self.cache.first_chat(user)
+            if chat_info is not None:
+                return chat_info
+
+        response_json, status = self.chat_list({"limit": 1, "offset": 0})
+        assert status == 200, f"Failed to retrieve chat list: {status} {response_json}"
+        if len(response_json) == 0:
+            return None
+        self.cache.remember_first(user, response_json[0]["chatInfo"])
+        return response_json[0]["chatInfo"]
+
+
+# this class used to keep "chatInfo" of first chats received by Conversation-clients during the whole session,
+# separately for every user account (the one logged in by the token manager, or the access token of the session)
+class ChatCache:
+
+    def __init__(self):
+        self.first_chats = {}  # user -> "chatInfo" of the first chat
+        self.lock = threading.Lock()
+
+    # returns the key of the user account the session is authorized for
+    def user_of(self, session):
+        principal = get_token_manager().principal_of(session)
+        if principal is not None:
+            return principal
+        return session.headers.get("Authorization")
+
+    def remember_first(self, user, chat_info):
+        with self.lock:
+            self.first_chats[user] = chat_info
+
+    def first_chat(self, user):
+        with self.lock:
+            return self.first_chats.get(user)
+
+    # forgets the first chat of the user account (e.g. after chats were created or deleted by the test)
+    def forget(self, user):
+        with self.lock:
+            self.first_chats.pop(user, None)
+
+
+_chat_cache = None
+_chat_cache_lock = threading.Lock()
+
+
+# returns the cache of chats shared by all Conversation-clients
+def get_chat_cache():
+    global _chat_cache
+    with _chat_cache_lock:
+        if _chat_cache is None:
+            _chat_cache = ChatCache()
+        return _chat_cache
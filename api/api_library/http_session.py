@@ -0,0 +1,139 @@
+# the file contains everything needed to create sessions for API-calls that reuse connections:
+# - create_session() returns a new session (with its own headers and cookies), but all sessions created by it share
+# one pool of connections - so a connection opened once (TCP + TLS) is kept alive and reused by the next API-calls,
+# even if they are done in another session (e.g. in the next test)
+# - connection_stats counts API-calls done and connections opened - to see how many times connections were reused
+# (counts of xdist workers are saved into files and added up by the main process, see api/conftest.py)
+
+# size of the pool can be changed in the .env file:
+# HTTP_POOL_CONNECTIONS - number of hosts to keep connections to (10 by default)
+# HTTP_POOL_MAXSIZE - max number of connections kept to one host (20 by default)
+
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from api.api_library.metrics import TimedHTTPConnection, TimedHTTPSConnection
+
+
+class ConnectionStats:
+
+    def __init__(self):
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self.lock = threading.Lock()
+
+    def count_request(self):
+        with self.lock:
+            self.requests_sent += 1
+
+    def count_connection(self):
+        with self.lock:
+            self.connections_opened += 1
+
+    # share of API-calls that were sent over a connection opened before
+    def reuse_ratio(self):
+        if self.requests_sent == 0:
+            return 0.0
+        return max(self.requests_sent - self.connections_opened, 0) / self.requests_sent
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump({"requests_sent": self.requests_sent, "connections_opened": self.connections_opened}, file)
+
+    # adds counts saved by another process (e.g. by an xdist worker)
+    def load(self, path):
+        with open(path) as file:
+            counts = json.load(file)
+        with self.lock:
+            self.requests_sent += counts["requests_sent"]
+            self.connections_opened += counts["connections_opened"]
+
+    def summary(self):
+        return (f"HTTP connections: {self.requests_sent} API-calls sent, {self.connections_opened} connections opened,"
+                f" {self.reuse_ratio():.0%} of API-calls reused a connection")
+
+
+connection_stats = ConnectionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+
+    ConnectionCls = TimedHTTPConnection  # measures DNS lookup and opening of connection (see metrics.py)
+
+    def _new_conn(self):
+        connection_stats.count_connection()
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        connection_stats.count_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+
+    ConnectionCls = TimedHTTPSConnection
+
+    def _new_conn(self):
+        connection_stats.count_connection()
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        connection_stats.count_request()
+        return super().urlopen(*args, **kwargs)
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool
+        }
+
+
+_shared_adapter = None
+_shared_adapter_lock = threading.Lock()
+
+
+# returns the adapter (with the pool of connections) shared by all sessions of the process
+def get_shared_adapter():
+    global _shared_adapter
+    with _shared_adapter_lock:
+        if _shared_adapter is None:
+            _shared_adapter = PooledHTTPAdapter(
+                pool_connections=int(os.environ.get("HTTP_POOL_CONNECTIONS", 10)),
+                pool_maxsize=int(os.environ.get("HTTP_POOL_MAXSIZE", 20))
+            )
+        return _shared_adapter
+
+
+# session that doesn't close the shared pool of connections when it's closed itself
+class PooledSession(requests.Session):
+
+    def close(self):
+        self.adapters.clear()
+
+
+# returns a new session that uses the pool of connections shared by all sessions of the process
+def create_session():
+    session = PooledSession()
+    adapter = get_shared_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# returns a new session without headers and cookies of the session given (so without its access token),
+# that sends API-calls by the same adapters - so over the same pool of connections
+# (used for API-calls done by a user who isn't logged in, e.g. password recovery)
+def create_not_authorized_session(session):
+    not_authorized_session = PooledSession()
+    for prefix, adapter in session.adapters.items():
+        not_authorized_session.mount(prefix, adapter)
+    return not_authorized_session
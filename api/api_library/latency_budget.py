@@ -0,0 +1,58 @@
+# this class used to check that API-calls are fast enough (latency budget):
+# - a budget sets max values (in ms) for percentiles of latency: p50_ms, p95_ms, p99_ms, max_ms
+# - a budget can be set for all API-calls or only for API-calls of one endpoint (e.g. "POST /api/login/oauth")
+# - a budget can be used as a context manager inside a test (it checks API-calls made inside the "with" block):
+#     with LatencyBudget(p95_ms=300, endpoint="POST /api/login/oauth"):
+#         api.log_in_with_email_or_username(email, password)
+# - or as the marker @pytest.mark.latency_budget(p95_ms=300) for the whole test (see api/conftest.py),
+# budgets for specific endpoints can also be set in pytest.ini, e.g.:
+#     latency_budgets =
+#         POST /api/login/oauth p95_ms=300
+
+from api.api_library.metrics import latency_recorder, percentile
+
+PERCENTILES = {"p50_ms": 0.50, "p95_ms": 0.95, "p99_ms": 0.99, "max_ms": 1.0}
+
+
+class LatencyBudget:
+
+    def __init__(self, endpoint=None, **limits):
+        unknown_limits = set(limits) - set(PERCENTILES)
+        assert len(unknown_limits) == 0, f"Unknown latency limits: {unknown_limits}, use: {list(PERCENTILES)}"
+        self.endpoint = endpoint  # None - the budget is for all API-calls
+        self.limits = limits  # e.g. {"p95_ms": 300}
+        self.calls_before = 0
+
+    # creates a budget from a line of pytest.ini, e.g. "POST /api/login/oauth p95_ms=300 p99_ms=800"
+    @classmethod
+    def from_line(cls, line):
+        words = line.split()
+        limits = {word.split("=")[0]: float(word.split("=")[1]) for word in words if "=" in word}
+        endpoint = " ".join(word for word in words if "=" not in word) or None
+        return cls(endpoint, **limits)
+
+    # returns a list of violations of the budget (an empty list if the budget is kept) for API-calls given
+    def check(self, calls):
+        if self.endpoint is not None:
+            calls = [call for call in calls if call.endpoint == self.endpoint]
+        if len(calls) == 0:
+            return []
+
+        walls = [call.wall * 1000 for call in calls]
+        violations = []
+        for name, limit in self.limits.items():
+            value = percentile(walls, PERCENTILES[name])
+            if value > limit:
+                violations.append(f"{self.endpoint or 'all API-calls'}: {name.replace('_ms', '')} is {value:.1f} ms"
+                                  f" (budget is {limit:.1f} ms, {len(calls)} API-calls)")
+        return violations
+
+    def __enter__(self):
+        self.calls_before = len(latency_recorder.calls_of())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            return
+        violations = self.check(latency_recorder.calls_of()[self.calls_before:])
+        assert len(violations) == 0, "Latency budget exceeded:\n" + "\n".join(violations)
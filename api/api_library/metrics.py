@@ -0,0 +1,190 @@
+# the file contains everything needed to measure latency of every API-call made through the Transport-class:
+# - CallTimings - timings of one API-call: total (wall) time, time of DNS lookup, time to open a connection
+# (TCP + TLS), time to the first byte of the response (TTFB), and size of the response
+# - TimedHTTPConnection, TimedHTTPSConnection - connections that measure DNS lookup and opening of the connection
+# (both are 0 if an API-call reused a connection opened before)
+# - LatencyRecorder - keeps timings of all API-calls grouped by endpoint and builds a report
+# with percentiles (p50/p95/p99) for every endpoint
+# - latency_recorder - the recorder used by the whole run (see pytest hooks in api/conftest.py)
+
+import json
+import math
+import socket
+import threading
+import time
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+_current_call = threading.local()  # timings of the API-call being sent by the current thread
+
+
+class CallTimings:
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint  # e.g. "POST /api/login/oauth"
+        self.wall = 0.0
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.size = 0
+        self.status = None
+        self.test = None  # ID of the test that made the API-call (or name of background work, if any)
+
+    def as_dict(self):
+        return {
+            "endpoint": self.endpoint,
+            "wall_ms": self.wall * 1000,
+            "dns_ms": self.dns * 1000,
+            "connect_ms": self.connect * 1000,
+            "ttfb_ms": self.ttfb * 1000,
+            "size_bytes": self.size,
+            "status": self.status,
+            "test": self.test
+        }
+
+
+# returns timings of the API-call being sent by the current thread (or None)
+def current_call():
+    return getattr(_current_call, "timings", None)
+
+
+def set_current_call(timings):
+    _current_call.timings = timings
+
+
+# marks API-calls made by the current thread as background work (e.g. "cleanup"), so they are not counted
+# as API-calls of the test running at the moment (None - API-calls belong to the current test)
+def set_background_work(name):
+    _current_call.background_work = name
+
+
+def background_work():
+    return getattr(_current_call, "background_work", None)
+
+
+class _TimedConnectionMixin:
+
+    # the host is resolved once, and that lookup is measured as DNS; then the connection is opened to the addresses
+    # found, one after another (the same way the connection itself does it, but without resolving the host again)
+    def _new_conn(self):
+        timings = current_call()
+        if timings is None:
+            return super()._new_conn()
+        started_at = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host.strip("[]"), self.port, allowed_gai_family(),
+                                           socket.SOCK_STREAM)
+        except socket.gaierror as error:
+            raise NameResolutionError(self.host, self, error) from error
+        finally:
+            timings.dns += time.perf_counter() - started_at
+
+        dns_host = self._dns_host
+        last_error = NewConnectionError(self, "Failed to establish a new connection: no addresses found")
+        try:
+            for address in dict.fromkeys(address[4][0] for address in addresses):
+                self._dns_host = address  # an IP address isn't looked up in DNS
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as error:
+                    last_error = error
+        finally:
+            self._dns_host = dns_host
+        raise last_error
+
+    def connect(self):
+        timings = current_call()
+        dns_before = timings.dns if timings is not None else 0.0
+        started_at = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            if timings is not None:
+                timings.connect += time.perf_counter() - started_at - (timings.dns - dns_before)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+def percentile(values, share):
+    if len(values) == 0:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(share * len(values)) - 1))]
+
+
+class LatencyRecorder:
+
+    def __init__(self):
+        self.calls = []  # timings of all API-calls
+        self.lock = threading.Lock()
+
+    def record(self, timings):
+        with self.lock:
+            self.calls.append(timings)
+
+    def calls_of(self, endpoint=None):
+        with self.lock:
+            return [call for call in self.calls if endpoint is None or call.endpoint == endpoint]
+
+    # returns a report: {endpoint: {"count", "errors", "p50_ms", "p95_ms", "p99_ms", ...}}
+    def report(self):
+        calls_by_endpoint = {}
+        for call in self.calls_of():
+            calls_by_endpoint.setdefault(call.endpoint, []).append(call)
+
+        report = {}
+        for endpoint, calls in sorted(calls_by_endpoint.items()):
+            walls = [call.wall * 1000 for call in calls]
+            report[endpoint] = {
+                "count": len(calls),
+                "errors": len([call for call in calls if call.status is None or call.status >= 500]),
+                "p50_ms": percentile(walls, 0.50),
+                "p95_ms": percentile(walls, 0.95),
+                "p99_ms": percentile(walls, 0.99),
+                "max_ms": max(walls),
+                "ttfb_p95_ms": percentile([call.ttfb * 1000 for call in calls], 0.95),
+                "dns_p95_ms": percentile([call.dns * 1000 for call in calls], 0.95),
+                "connect_p95_ms": percentile([call.connect * 1000 for call in calls], 0.95),
+                "avg_size_bytes": sum(call.size for call in calls) / len(calls)
+            }
+        return report
+
+    def format_table(self):
+        lines = [f"{'endpoint':<50} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}"]
+        for endpoint, row in self.report().items():
+            lines.append(f"{endpoint:<50} {row['count']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f}"
+                         f" {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['errors']:>6}")
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    # saves timings of all API-calls (so they can be merged with timings from other processes)
+    def save_calls(self, path):
+        with open(path, "w") as file:
+            json.dump([call.as_dict() for call in self.calls_of()], file)
+
+    def load_calls(self, path):
+        with open(path) as file:
+            for call in json.load(file):
+                timings = CallTimings(call["endpoint"])
+                timings.wall = call["wall_ms"] / 1000
+                timings.dns = call["dns_ms"] / 1000
+                timings.connect = call["connect_ms"] / 1000
+                timings.ttfb = call["ttfb_ms"] / 1000
+                timings.size = call["size_bytes"]
+                timings.status = call["status"]
+                timings.test = call["test"]
+                self.record(timings)
+
+
+latency_recorder = LatencyRecorder()
@@ -1,12 +1,18 @@
-import requests
 import allure
+from api.api_library.transport import get_default_transport
+from api.api_library.token_manager import get_token_manager
+from api.api_library.api_result import ApiResult
+from api.api_library.http_session import create_not_authorized_session
 import os
 
 class Password:
 
-    def __init__(self, session):
+    def __init__(self, session, transport=None):
         self.base_url = os.environ.get("BASIC_URL")
         self.session = session
+        self.transport = transport or get_default_transport()  # sends API-calls (with timeouts and retries)
+        # password recovery is done by a user who isn't logged in, so the access token of the session isn't sent
+        self.not_authorized_session = create_not_authorized_session(session)
 
     @allure.step('Send request to change password in profile')
     # change password while being authorized and being in the user profile
@@ -17,12 +23,14 @@ class Password:
             "oldPassword": old_password
         }
 
-        response = self.session.post(
-            self.base_url + "/api/password/change_password_in_profile",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/password/change_password_in_profile",
             json=request_body  # !use this form for each request in JSON format, no "json.dumps()" needed
         )
         status = response.status_code
-        return response.json(), status
+        if status == 200:  # the token was issued for the old password
+            get_token_manager().forget_session_token(self.session)
+        return ApiResult(response)
 
     @allure.step('Send request to request password recovery by email or username (1st step in the whole process)')
     # the next 3 methods are used for 3-steps process to reset a new password instead of the old that was forgotten
@@ -31,20 +39,19 @@ class Password:
             "recoveryField": email_or_username
         }
 
-        response = requests.post(
-            self.base_url + "/api/password/request_password_recovery",
+        response = self.transport.request(
+            self.not_authorized_session, "POST", self.base_url + "/api/password/request_password_recovery",
             json=request_body
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
 
     @allure.step('Send request to confirm password recovery (2nd step in the whole process)')
     def confirm_password_recovery(self, reset_token):
-        response = requests.get(
+        response = self.transport.request(
+            self.not_authorized_session, "GET",
             self.base_url + f"/api/password/reset_password?reset_token={reset_token}"
         )
-        status = response.status_code
-        return response.text, status
+        return ApiResult(response, first="text")
 
     @allure.step('Send request to reset password recovery (3rd step in the whole process)')
     def reset_password(self, new_password, reset_token):
@@ -53,12 +60,11 @@ class Password:
             "newPassword2": new_password,
             "resetToken": reset_token
         }
-        response = requests.post(
-            self.base_url + "/api/password/reset_password",
+        response = self.transport.request(
+            self.not_authorized_session, "POST", self.base_url + "/api/password/reset_password",
             json=request_body
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
 
 
     #  ------ NEXT METHODS ARE USED IN NEGATIVE TESTS (to run API-calls with custom request body if needed)
@@ -66,27 +72,28 @@ class Password:
     @allure.step('Send request to change password in profile, but with custom request body)')
     # change password while being authorized and being in the user profile
     def change_password_in_profile_custom_body(self, request_body):
-        response = self.session.post(
-            self.base_url + "/api/password/change_password_in_profile",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/password/change_password_in_profile",
             json=request_body  # !use this form for each request in JSON format, no "json.dumps()" needed
         )
         status = response.status_code
-        return response.json(), status
+        if status == 200:  # the token was issued for the old password
+            get_token_manager().forget_session_token(self.session)
+        return ApiResult(response)
 
     @allure.step('Send request to request password recovery, but with custom request body')
     def request_password_recovery_custom_body(self, request_body):
-        response = requests.post(
-            self.base_url + "/api/password/request_password_recovery",
+        if isinstance(request_body, dict):
+            response = self.transport.request(
+            self.not_authorized_session, "POST", self.base_url + "/api/password/request_password_recovery",
             json=request_body
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
 
     @allure.step('Send request to reset password, but with custom request body')
     def reset_password_custom_body(self, request_body):
-        response = requests.post(
-            self.base_url + "/api/password/reset_password",
+        response = self.transport.request(
+            self.not_authorized_session, "POST", self.base_url + "/api/password/reset_password",
             json=request_body
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
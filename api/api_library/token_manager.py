@@ -0,0 +1,156 @@
+# this class used to keep access tokens of user accounts, so fixtures and helpers don't log in again and again
+# with the same credentials:
+# - logs in (POST /api/login/oauth) only if there's no token for the user account yet, or if it expires soon
+# - expiry is decoded from the token itself (the "exp" claim of JWT), or ACCESS_TOKEN_LIFETIME is used
+# - sessions authorized by the manager get the new token right away when it's refreshed
+# (refresh_expiring() refreshes every token that expires soon, see the autouse fixture in api/conftest.py)
+# - a token is forgotten when the user logs out, changes password or is deleted by clients of api_library,
+# so the next call to get() logs in again
+
+# settings can be changed in the .env file:
+# ACCESS_TOKEN_LIFETIME - lifetime (in seconds) of tokens without the "exp" claim (900 by default)
+# ACCESS_TOKEN_REFRESH_MARGIN - a token is refreshed if it expires in less than that (in seconds, 60 by default)
+
+import base64
+import json
+import os
+import threading
+import time
+import weakref
+
+from api.api_library.http_session import create_session
+
+
+class AccessToken:
+
+    def __init__(self, value, expires_at, login_response):
+        self.value = value
+        self.expires_at = expires_at  # time.time() when the token expires
+        self.login_response = login_response  # body of the response to log in: "user_profile_id", "user_role", ...
+
+
+# returns time (time.time()) of expiry from the "exp" claim of JWT - or None if the token isn't JWT
+def decode_expiry(token):
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+
+    def __init__(self, lifetime=None, refresh_margin=None):
+        self.lifetime = lifetime if lifetime is not None \
+            else float(os.environ.get("ACCESS_TOKEN_LIFETIME", 900))
+        self.refresh_margin = refresh_margin if refresh_margin is not None \
+            else float(os.environ.get("ACCESS_TOKEN_REFRESH_MARGIN", 60))
+        self.tokens = {}  # email or username (in lower case) -> (password, AccessToken)
+        self.sessions = {}  # email or username (in lower case) -> sessions authorized with its token
+        self.locks = {}  # email or username (in lower case) -> lock (so only one thread logs in at a time)
+        self.lock = threading.Lock()
+        self.logins = 0  # how many times the manager logged in
+
+    def _lock_for(self, principal):
+        with self.lock:
+            return self.locks.setdefault(principal.lower(), threading.Lock())
+
+    # returns the token for the user account if it's known and doesn't expire soon (otherwise - None)
+    def cached(self, principal, password):
+        with self.lock:
+            password_cached, token = self.tokens.get(principal.lower(), (None, None))
+        if token is None or password_cached != password:
+            return None
+        if token.expires_at - time.time() < self.refresh_margin:
+            return None
+        return token
+
+    # returns the token kept for the user account (even if it expires soon), None if there's no token for it
+    def token_of(self, principal):
+        with self.lock:
+            return self.tokens.get(principal.lower(), (None, None))[1]
+
+    # returns a valid token for the user account (logs in only if needed), or None if it's impossible to log in
+    def get(self, principal, password):
+        with self._lock_for(principal):
+            token = self.cached(principal, password)
+            if token is None:
+                token = self._log_in(principal, password)
+            return token
+
+    def _log_in(self, principal, password):
+        from api.api_library.user_account import UserAccount  # user_account.py uses the manager too
+
+        response_body, status = UserAccount(create_session()).log_in_with_email_or_username(principal, password)
+        if status != 200:
+            print(f"Unable to log in as '{principal}': {status} {response_body}")
+            return None
+
+        value = response_body.get("access_token")
+        expires_at = decode_expiry(value) or time.time() + self.lifetime
+        token = AccessToken(value, expires_at, response_body)
+        with self.lock:
+            old_token = self.tokens.get(principal.lower(), (None, None))[1]
+            self.tokens[principal.lower()] = (password, token)
+            self.logins += 1
+            sessions = list(self.sessions.get(principal.lower(), weakref.WeakSet()))
+        # sessions that still use the old token get the new one
+        for session in sessions:
+            if old_token is not None and session.headers.get("Authorization") == f"Bearer {old_token.value}":
+                session.headers["Authorization"] = f"Bearer {value}"
+        return token
+
+    # authorizes the session with the token of the user account, returns the token (None if unable to log in)
+    def authorize(self, session, principal, password):
+        token = self.get(principal, password)
+        if token is not None:
+            session.headers.update({"Authorization": f"Bearer {token.value}"})
+            with self.lock:
+                self.sessions.setdefault(principal.lower(), weakref.WeakSet()).add(session)
+        return token
+
+    # refreshes every token that expires soon (and sessions authorized with it)
+    def refresh_expiring(self):
+        with self.lock:
+            expiring = [(principal, password) for principal, (password, token) in self.tokens.items()
+                        if token.expires_at - time.time() < self.refresh_margin]
+        for principal, password in expiring:
+            self.get(principal, password)
+
+    # forgets the token (after the user logged out, changed password or was deleted)
+    def forget_token(self, value):
+        if value is None:
+            return
+        with self.lock:
+            for principal, (password, token) in list(self.tokens.items()):
+                if token.value == value:
+                    del self.tokens[principal]
+
+    # forgets the token used by the session (if any)
+    def forget_session_token(self, session):
+        authorization = session.headers.get("Authorization") or ""
+        if authorization.startswith("Bearer "):
+            self.forget_token(authorization[len("Bearer "):])
+
+    # returns the user account (email or username, in lower case) whose token the session was authorized with
+    # by the manager - or None
+    def principal_of(self, session):
+        with self.lock:
+            for principal, sessions in self.sessions.items():
+                if session in sessions:
+                    return principal
+        return None
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+# returns the token manager shared by all fixtures and helpers
+def get_token_manager():
+    global _token_manager
+    with _token_manager_lock:
+        if _token_manager is None:
+            _token_manager = TokenManager()
+        return _token_manager
@@ -0,0 +1,256 @@
+# this class used to send every API-call made by clients of api_library (UserAccount, Password, ...)
+# and by the 1secmail mailbox backend:
+# - sets a timeout for every API-call (can be different for specific endpoints)
+# - retries API-calls that failed because of connection errors or temporary server errors (502, 503, 504),
+# with a random (jittered) pause that grows after each attempt; API-calls that are not idempotent (POST)
+# are retried only if they for sure never reached the server, unless the endpoint is listed as idempotent
+# - sends API-calls over the pool of connections shared by all sessions (see http_session.py),
+# or over HTTP/2 if enabled (requires "pip install httpx[http2]")
+# - measures latency of every API-call and saves it into latency_recorder (see metrics.py)
+# - can replay responses recorded before instead of sending API-calls (see cassette.py)
+# - stops sending API-calls to a service that failed too many API-calls in a row (see circuit_breaker.py)
+# - async clients (AsyncUserAccount, AsyncPassword) send API-calls by request_async() with the same settings
+# over the httpx.AsyncClient they were given (latency of such API-calls is measured as a whole, without
+# time to connect and to resolve the host)
+
+# settings can be changed in the .env file (next to BASIC_URL):
+# HTTP_TIMEOUT - time (in seconds) to wait for the response (30 by default)
+# HTTP_CONNECT_TIMEOUT - time (in seconds) to wait for a connection to be opened (5 by default)
+# HTTP_ENDPOINT_TIMEOUTS - timeouts for specific endpoints, e.g. "/api/login/oauth=10,/api/registration=20"
+# HTTP_RETRIES - how many times an API-call can be retried (2 by default)
+# HTTP_RETRY_BACKOFF - pause (in seconds) before the first retry, doubled before each next one (0.3 by default)
+# HTTP_RETRY_MAX_BACKOFF - max pause (in seconds) before a retry (5 by default)
+# HTTP_RETRY_STATUSES - statuses of responses that are retried ("502,503,504" by default)
+# HTTP_IDEMPOTENT_ENDPOINTS - POST endpoints that can be retried safely (login and username check by default)
+# HTTP2 - "true" to send API-calls over HTTP/2
+# HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE - size of the pool of connections (see http_session.py)
+# HTTP_CASSETTE_MODE and others - recording and replaying of responses (see cassette.py)
+# CIRCUIT_BREAKER_THRESHOLD and others - when a service is treated as unavailable (see circuit_breaker.py)
+
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from api.api_library.cassette import Cassette
+from api.api_library.circuit_breaker import get_circuit_breaker
+from api.api_library.metrics import CallTimings, background_work, latency_recorder, set_current_call
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def _parse_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class Transport:
+
+    def __init__(self, timeout=30, connect_timeout=5, endpoint_timeouts=None, retries=2, retry_backoff=0.3,
+                 retry_max_backoff=5, retry_statuses=(502, 503, 504), idempotent_endpoints=(), http2=False,
+                 cassette=None, circuit_breaker=None):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.endpoint_timeouts = endpoint_timeouts or {}  # path of endpoint (or its beginning) -> timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.retry_statuses = set(retry_statuses)
+        self.idempotent_endpoints = list(idempotent_endpoints)
+        self.http2_client = None
+        self.cassette = cassette  # None - every API-call is sent
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()  # shared by all transports by default
+        self.retryable_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+        self.never_sent_errors = (requests.exceptions.ConnectTimeout,)
+        if http2:
+            import httpx  # optional dependency, only needed for HTTP/2
+            self.httpx = httpx
+            self.http2_client = httpx.Client(http2=True)
+            self.retryable_errors += (httpx.TransportError,)
+            self.never_sent_errors += (httpx.ConnectError, httpx.ConnectTimeout)
+
+    # creates the transport with settings from the .env file
+    @classmethod
+    def from_env(cls):
+        endpoint_timeouts = {}
+        for item in _parse_list(os.environ.get("HTTP_ENDPOINT_TIMEOUTS", "")):
+            path, timeout = item.split("=")
+            endpoint_timeouts[path.strip()] = float(timeout)
+
+        return cls(
+            timeout=float(os.environ.get("HTTP_TIMEOUT", 30)),
+            connect_timeout=float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5)),
+            endpoint_timeouts=endpoint_timeouts,
+            retries=int(os.environ.get("HTTP_RETRIES", 2)),
+            retry_backoff=float(os.environ.get("HTTP_RETRY_BACKOFF", 0.3)),
+            retry_max_backoff=float(os.environ.get("HTTP_RETRY_MAX_BACKOFF", 5)),
+            retry_statuses=[int(status) for status in _parse_list(os.environ.get("HTTP_RETRY_STATUSES", "502,503,504"))],
+            idempotent_endpoints=_parse_list(os.environ.get(
+                "HTTP_IDEMPOTENT_ENDPOINTS", "/api/login/oauth,/api/registration/username_check")),
+            http2=os.environ.get("HTTP2", "false").lower() == "true",
+            cassette=Cassette.from_env()
+        )
+
+    # returns timeout for the endpoint: (time to open a connection, time to wait for the response)
+    # if several paths from HTTP_ENDPOINT_TIMEOUTS match the endpoint, the longest one is used
+    def timeout_for(self, url):
+        path = urlparse(url).path
+        matching_paths = [endpoint for endpoint in self.endpoint_timeouts if path.startswith(endpoint)]
+        if len(matching_paths) == 0:
+            return self.connect_timeout, self.timeout
+        return self.connect_timeout, self.endpoint_timeouts[max(matching_paths, key=len)]
+
+    def is_idempotent(self, method, url):
+        if method.upper() in IDEMPOTENT_METHODS:
+            return True
+        path = urlparse(url).path
+        return any(path.startswith(endpoint) for endpoint in self.idempotent_endpoints)
+
+    # returns True if the API-call failed before it was sent to the server (so it's safe to retry it anyway)
+    def _never_sent(self, error):
+        if isinstance(error, self.never_sent_errors):
+            return True
+        reason = error.args[0] if error.args else None
+        return isinstance(reason, MaxRetryError) and isinstance(reason.reason, NewConnectionError)
+
+    def _pause_before_retry(self, attempt):
+        time.sleep(self._backoff(attempt))
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.retry_max_backoff, self.retry_backoff * 2 ** attempt))
+
+    def _send(self, session, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        if self.http2_client is not None:
+            connect_timeout, timeout = kwargs.pop("timeout")
+            kwargs["timeout"] = self.httpx.Timeout(timeout, connect=connect_timeout)
+            return self.http2_client.request(method, url, headers=dict(session.headers),
+                                             cookies=session.cookies.get_dict(), **kwargs)
+        return session.request(method, url, **kwargs)
+
+    # sends the API-call once and saves its latency; "endpoint" is used to group latencies in the report
+    def _send_measured(self, session, method, url, endpoint, **kwargs):
+        timings = CallTimings(f"{method.upper()} {endpoint or urlparse(url).path}")
+        timings.test = background_work() or os.environ.get("PYTEST_CURRENT_TEST", "").rsplit(" (", 1)[0] or None
+        set_current_call(timings)
+        started_at = time.perf_counter()
+        try:
+            response = self._send(session, method, url, **kwargs)
+            timings.status = response.status_code
+            timings.ttfb = response.elapsed.total_seconds()
+            timings.size = len(response.content)
+            response.timings = timings  # see api_result.py
+            return response
+        finally:
+            timings.wall = time.perf_counter() - started_at
+            set_current_call(None)
+            latency_recorder.record(timings)
+
+    # sends an API-call in the session and returns the response
+    # "endpoint" - path of the endpoint with placeholders (e.g. "/api/delete/user/{code}"),
+    # needed only if the path contains values that are different for every API-call
+    def request(self, session, method, url, endpoint=None, **kwargs):
+        if self.cassette is None:
+            return self._request_with_retries(session, method, url, endpoint, **kwargs)
+
+        key = self.cassette.key_of(session, method, url, kwargs)
+        response = self.cassette.play(key)
+        if response is None:
+            response = self._request_with_retries(session, method, url, endpoint, **kwargs)
+            self.cassette.record(key, response, url, kwargs)
+        return response
+
+    def _request_with_retries(self, session, method, url, endpoint=None, **kwargs):
+        self.circuit_breaker.before_call(url)  # fails right away if the service is unavailable
+        idempotent = self.is_idempotent(method, url)
+        attempt = 0
+        while True:
+            try:
+                response = self._send_measured(session, method, url, endpoint, **kwargs)
+            except self.retryable_errors as error:
+                if attempt >= self.retries or not (idempotent or self._never_sent(error)):
+                    self.circuit_breaker.record_failure(url, type(error).__name__)
+                    raise
+            else:
+                if attempt >= self.retries or not idempotent or response.status_code not in self.retry_statuses:
+                    if response.status_code in self.retry_statuses:
+                        self.circuit_breaker.record_failure(url, response.status_code)
+                    else:
+                        self.circuit_breaker.record_success(url)
+                    return response
+            print(f"Retrying {method} {url} (attempt {attempt + 2} of {self.retries + 1})")
+            self._pause_before_retry(attempt)
+            attempt += 1
+
+
+    # async twin of request(): sends an API-call by the httpx.AsyncClient and returns the response
+    async def request_async(self, client, method, url, endpoint=None, **kwargs):
+        if self.cassette is None:
+            return await self._request_with_retries_async(client, method, url, endpoint, **kwargs)
+
+        key = self.cassette.key_of(client, method, url, kwargs)
+        response = self.cassette.play(key)
+        if response is None:
+            response = await self._request_with_retries_async(client, method, url, endpoint, **kwargs)
+            self.cassette.record(key, response, url, kwargs)
+        return response
+
+    async def _request_with_retries_async(self, client, method, url, endpoint=None, **kwargs):
+        import httpx  # async clients are the only ones that need it
+        connect_timeout, timeout = self.timeout_for(url)
+        kwargs.setdefault("timeout", httpx.Timeout(timeout, connect=connect_timeout))
+        self.circuit_breaker.before_call(url)  # fails right away if the service is unavailable
+        idempotent = self.is_idempotent(method, url)
+        attempt = 0
+        while True:
+            try:
+                response = await self._send_measured_async(client, method, url, endpoint, **kwargs)
+            except httpx.TransportError as error:
+                never_sent = isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+                if attempt >= self.retries or not (idempotent or never_sent):
+                    self.circuit_breaker.record_failure(url, type(error).__name__)
+                    raise
+            else:
+                if attempt >= self.retries or not idempotent or response.status_code not in self.retry_statuses:
+                    if response.status_code in self.retry_statuses:
+                        self.circuit_breaker.record_failure(url, response.status_code)
+                    else:
+                        self.circuit_breaker.record_success(url)
+                    return response
+            print(f"Retrying {method} {url} (attempt {attempt + 2} of {self.retries + 1})")
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    # sends the API-call once and saves its latency (coroutines of one thread run at the same time,
+    # so the API-call isn't set as the current one - see metrics.py)
+    async def _send_measured_async(self, client, method, url, endpoint, **kwargs):
+        timings = CallTimings(f"{method.upper()} {endpoint or urlparse(url).path}")
+        timings.test = background_work() or os.environ.get("PYTEST_CURRENT_TEST", "").rsplit(" (", 1)[0] or None
+        started_at = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            timings.status = response.status_code
+            timings.ttfb = response.elapsed.total_seconds()
+            timings.size = len(response.content)
+            response.timings = timings  # see api_result.py
+            return response
+        finally:
+            timings.wall = time.perf_counter() - started_at
+            latency_recorder.record(timings)
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+# returns the transport (with settings from the .env file) used by every client that didn't get its own one
+def get_default_transport():
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport.from_env()
+        return _default_transport
@@ -1,12 +1,15 @@
-import requests
 import allure
+from api.api_library.transport import get_default_transport
+from api.api_library.token_manager import get_token_manager
+from api.api_library.api_result import ApiResult
 import os
 
 class UserAccount:
 
-    def __init__(self, session):
+    def __init__(self, session, transport=None):
         self.base_url = os.environ.get("BASIC_URL")
         self.session = session
+        self.transport = transport or get_default_transport()  # sends API-calls (with timeouts and retries)
 
     @allure.step('Send request to register user')
     def user_registration(self, username, email, password):
@@ -16,19 +19,19 @@ class UserAccount:
             "password": password
         }
 
-        response = self.session.post(
-            self.base_url + "/api/registration",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/registration",
             json=request_body  # !use this form for each request in JSON format, no "json.dumps()" needed
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
 
     @allure.step('Send request to confirm email with token')
     def confirm_email(self, token):
-        response = self.session.get(
-            self.base_url + f"/api/email/confirm_email/{token}"
+        response = self.transport.request(
+            self.session, "GET", self.base_url + f"/api/email/confirm_email/{token}",
+            endpoint="/api/email/confirm_email/{token}"
         )
-        return response.json(), response.status_code
+        return ApiResult(response)
 
     @allure.step('Send request to log in with email or username')
     def log_in_with_email_or_username(self, email_or_username, password):
@@ -36,78 +39,88 @@ class UserAccount:
             "username": email_or_username,
             "password": password
         }
-        response = self.session.post(
-            self.base_url + "/api/login/oauth",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/login/oauth",
             data=request_body  # !use this form for each request in x-www-form-urlencoded format
         )
-        status = response.status_code
         # by "response_data.get()" we can later obtain values from such fields: "user_profile_id",
         # "user_role", "user_status", "access_token"
-        return response.json(), status
+        return ApiResult(response)
 
 
     @allure.step('Send request to log out')
     def user_logout(self):
-        response = self.session.post(
-            self.base_url + "/api/logout"
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/logout"
         )
-        return response.json(), response.status_code
+        if response.status_code == 200:  # the token can't be used anymore
+            get_token_manager().forget_session_token(self.session)
+        return ApiResult(response)
 
     @allure.step('Send request to request delete user (start)')
     def request_delete_user(self):
-        response = self.session.post(
-            self.base_url + "/api/delete/request_delete"
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/delete/request_delete"
         )
-        return response.json(), response.status_code
+        return ApiResult(response)
 
     @allure.step('Send request to delete user (finish)')
     def delete_user(self, code):
-        response = self.session.delete(
-            self.base_url + f"/api/delete/user/{code}"
+        response = self.transport.request(
+            self.session, "DELETE", self.base_url + f"/api/delete/user/{code}",
+            endpoint="/api/delete/user/{code}"
         )
-        return response.json(), response.status_code
+        if response.status_code == 200:  # the token can't be used anymore
+            get_token_manager().forget_session_token(self.session)
+        return ApiResult(response)
 
 
     @allure.step('Send request to request email verify (start)')
     def request_email_verify(self, email):
         request_body = {"email": email}
-        response = self.session.post(
-            self.base_url + "/api/email/request_email_verify",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/email/request_email_verify",
             json=request_body
         )
-        return response.json(), response.status_code
+        return ApiResult(response)
 
     @allure.step('Send request to check username')
     def username_check(self, username):
         request_body = {"username": username}
-        response = self.session.post(
-            self.base_url + "/api/registration/username_check",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/registration/username_check",
             json=request_body
         )
-        return response, response.status_code
+        return ApiResult(response, first="response")
 
     @allure.step('Send request to register user with a custom request body')
     def user_registration_custom_body(self, request_body):
-        response = self.session.post(
-            self.base_url + "/api/registration",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/registration",
             json=request_body
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
 
     @allure.step('Send request to log in with email but with custom request body')
     def log_in_with_email_custom_body(self, request_body):
-        response = self.session.post(
-            self.base_url + "/api/login/oauth",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/login/oauth",
             data=request_body  # !use this form for each request in x-www-form-urlencoded format
         )
-        status = response.status_code
-        return response.json(), status
+        return ApiResult(response)
+
+    @allure.step('Send request to request email verify but with custom request body')
+    def request_email_verify_custom_body(self, request_body):
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/email/request_email_verify",
+            json=request_body
+        )
+        return ApiResult(response)
 
     @allure.step('Send request to check username but with custom request body')
     def username_check_custom_body(self, request_body):
-        response = self.session.post(
-            self.base_url + "/api/registration/username_check",
+        response = self.transport.request(
+            self.session, "POST", self.base_url + "/api/registration/username_check",
             json=request_body
         )
-        return response, response.status_code
+        return ApiResult(response, first="response")
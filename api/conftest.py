@@ -1,14 +1,48 @@
 from api.api_library.user_account import UserAccount
+from api.api_library.http_session import create_session, connection_stats
+from api.api_library.transport import get_default_transport
+from api.api_library.token_manager import get_token_manager
+from api.api_library.metrics import latency_recorder
+from api.api_library.latency_budget import LatencyBudget
 from api.api_library.conversation import Conversation
-from api.support.temporary_email_generator import EmailAndPasswordGenerator
+from api.support.read_only_accounts import get_read_only_accounts, guard_session
+from api.api_library.circuit_breaker import get_circuit_breaker
+from api.support.user_account_support import UserAccountSupport
+from api.support.file_lock import FileLock
+from api.support.user_account_pool import UserAccountPool
+from api.support.cleanup_queue import get_cleanup_queue
+from api.support.mock_backend import start_mock_backend
+from api.support.mailbox_backends import get_mailbox_backend
+from api.support.duration_scheduler import DurationHistory, DurationEstimator, LongestFirstScheduling, MAIL_MARKER
 import pytest
-import requests
 import os
+import glob
+import json
 from dotenv import load_dotenv
 import allure
 
 load_dotenv()
 
+# with MOCK_BACKEND=true in the .env file tests are run against a local mock of the J.* backend,
+# started inside the test process (every pytest-xdist worker starts its own one), instead of BASIC_URL;
+# user accounts from the .env file (VALID_EMAIL, VALID_EMAIL_GW1, ...) are created in it right away (with a few chats)
+if os.environ.get("MOCK_BACKEND", "false").lower() == "true":
+    os.environ.setdefault("VALID_EMAIL", "valid.user@mail.local")
+    os.environ.setdefault("VALID_PASSWORD", "ValidPassword1")
+    mock_backend = start_mock_backend().backend
+    for name, value in list(os.environ.items()):
+        if name.startswith("VALID_EMAIL"):
+            password = os.environ.get(name.replace("VALID_EMAIL", "VALID_PASSWORD", 1))
+            mock_backend.add_user(value.split("@")[0].replace("_", "."), value, password)
+            for number in range(1, 4):
+                mock_backend.add_chat(value, f"Chat {number}")
+
+# with MAILBOX_BACKEND=local the local mail servers are started right away, before pytest-xdist starts workers:
+# only the main process listens on the SMTP port, workers read mails through its HTTP server
+# (see api/support/mailbox_backends.py)
+if os.environ.get("MAILBOX_BACKEND", "1secmail") == "local":
+    get_mailbox_backend()
+
 # Loading required variables from the .env file
 VALID_EMAIL = os.environ.get("VALID_EMAIL")
 VALID_PASSWORD = os.environ.get("VALID_PASSWORD")
@@ -19,7 +53,47 @@ VALID_PASSWORD = os.environ.get("VALID_PASSWORD")
 BASIC_URL = os.environ.get("BASIC_URL")
 
 
-# basic fixture that logs user in (with the credentials provided in env-file)
+# returns ID of the pytest-xdist worker running tests ("gw0", "gw1", ...) - or "master" if tests are run without xdist
+def get_worker_id():
+    return os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+
+# fixture that returns credentials of the user account used by the current worker for the whole session:
+# 1) email of the user account 2) password of the user account
+# - if credentials for the worker are provided in the .env file (VALID_EMAIL_GW1 and VALID_PASSWORD_GW1 for the worker
+# "gw1" etc.) - they are used
+# - otherwise the first worker ("gw0", or "master" if tests are run without xdist) uses the user account from
+# the .env file (VALID_EMAIL and VALID_PASSWORD), and every other worker creates its own user account
+# (and deletes it in background after the session) - so tests that change the user account don't affect tests of other workers
+@allure.step('Get credentials of the user account used by the current worker')
+@pytest.fixture(scope="session")
+def worker_user_account_fixture():
+    worker_id = get_worker_id()
+    email = os.environ.get(f"VALID_EMAIL_{worker_id.upper()}")
+    password = os.environ.get(f"VALID_PASSWORD_{worker_id.upper()}")
+
+    if email and password:
+        yield email, password
+    elif worker_id in ("master", "gw0"):
+        yield VALID_EMAIL, VALID_PASSWORD
+    else:
+        user_account_support = UserAccountSupport()
+        email_and_password_generator, username, email, password = user_account_support.create_user_account()
+        yield email, password
+        get_cleanup_queue().register(email_and_password_generator)
+
+
+# fixture that locks the user account returned by user_logged_in_session_fixture for the time of the test
+# (against other processes running tests at the same time) - should be used by every test that changes the account
+# (e.g. changes password), so other tests won't log in with the account while it's being changed
+@pytest.fixture()
+def user_account_lock_fixture(user_logged_in_session_fixture):
+    email = user_logged_in_session_fixture[1]
+    with FileLock(f"user_account_{email}"):
+        yield
+
+
+# basic fixture that logs user in (with the credentials provided in env-file, see worker_user_account_fixture)
 # returns: 1) a session of specific user being authorized
 # 2) email of the user account
 # 3) password of the user account 4) profile ID of the user
@@ -39,58 +113,56 @@ BASIC_URL = os.environ.get("BASIC_URL")
 @allure.step('Log in with credentials of the user provided in .env-file and get:'
              ' session of user authorized, email, password, ID, role and status of the user')
 @pytest.fixture(scope="session")
-def user_logged_in_session_fixture():
-    session = requests.Session()
-    # Data preparation for the query
-    login_data = {
-        "grant_type": "password",
-        "username": VALID_EMAIL,
-        "password": VALID_PASSWORD,
-        # "scope": SCOPE,
-        # "client_id": CLIENT_ID,
-        # "client_secret": CLIENT_SECRET
-    }
-
-    # Executing the login request
-    response = session.post(
-        BASIC_URL + "/api/login/oauth",
-        data=login_data
-    )
-
-    # Checking for a successful response status
-    assert response.status_code == 200, f"Failed to log in: {response.text}"
+def user_logged_in_session_fixture(worker_user_account_fixture):
+    email, password = worker_user_account_fixture
+    session = guard_session(create_session())
 
-    # Retrieving values from response
-    response_body = response.json()
-    access_token = response_body.get("access_token")
-    user_profile_id = response_body.get("user_profile_id")
-    user_role = response_body.get("user_role")
-    user_status = response_body.get("user_status")
+    # the token is taken from the token manager (it logs in only if there's no valid token yet),
+    # the account is locked, so its password isn't being changed by another worker
+    with FileLock(f"user_account_{email}"):
+        token = get_token_manager().authorize(session, email, password)
 
-    # adding a token to the session headers - that will create a session of authorized user
-    session.headers.update({"Authorization": f"Bearer {access_token}"})
+    # Checking for a successful log in
+    assert token is not None, f"Failed to log in as {email}"
+
+    # Retrieving values from response
+    user_profile_id = token.login_response.get("user_profile_id")
+    user_role = token.login_response.get("user_role")
+    user_status = token.login_response.get("user_status")
 
-    return session, VALID_EMAIL, VALID_PASSWORD, user_profile_id, user_role, user_status
+    return session, email, password, user_profile_id, user_role, user_status
 
 
 # basic fixture that returns 1) session without any user being authorized
-@pytest.step('Get not-authorized session')
+@allure.step('Get not-authorized session')
 @pytest.fixture()
 def user_not_logged_in_session_fixture():
-    session = requests.Session()
+    session = guard_session(create_session())
     return session
 
 
+# fixture that creates a pool of user accounts already registered and confirmed (once per session - so once per worker
+# if tests are run by pytest-xdist), and deletes all of them after the session
+# (see api/support/user_account_pool.py; size of the pool is set by USER_ACCOUNT_POOL_SIZE in the .env file)
+@allure.step('Create a pool of user accounts (and delete all of them after the session)')
+@pytest.fixture(scope="session")
+def user_account_pool_fixture():
+    user_account_pool = UserAccountPool()
+    user_account_pool.fill()
+    yield user_account_pool
+    user_account_pool.delete_all()
+
+
 # basic fixture that (before executing a test itself!):
-# - generates email and password needed to create user account
-# - registers a user with the credentials generated before
-# - logs into the user account created
+# - takes a user account (already registered and confirmed) from the pool of user accounts,
+# no other test uses this account at the same time
+# - logs into the user account
 # - returns: 1) session of this user being authorized 2) email of the user account 3) password of the user account
-# 4) profile ID of the user 5) role of the user in system 6) status of the user 7) access token already used in session
+# 4) profile ID of the user 5) role of the user in system 6) status of the user 7) username of the user
 
 # and (after executing the test!):
-# - delete user account
-# - delete email that was generated and used to create user account
+# - gives the user account back to the pool (if the password was changed in the test, it's reset back),
+# all user accounts of the pool (and emails used to create them) are deleted after the session
 
 # to use fixture in test - just mention it as a parameter of test
 # to get values that returned by fixture in test - just address to them as regular variables, like that:
@@ -98,117 +170,260 @@ def user_not_logged_in_session_fixture():
 # EXAMPLE of how to use fixture in test:
 # def test_example(new_user_logged_in_session_fixture):
 #     # Obtain values returned by the fixture
-#     session, email, password, user_profile_id, user_role, user_status = new_user_logged_in_session_fixture
+#     session, email, password, user_profile_id, user_role, user_status, username = new_user_logged_in_session_fixture
 #
 #     # Your test logic here, using the obtained values...
 #     # For example:
 #     assert user_role == "admin", "User should have admin role"
 #     ...
-@allure.step('1) Generate username, email and password; register user with it and return:'
+@allure.step('1) Take a user account from the pool, log in and return:'
              'session of user authorized, email, password, ID, role, status and username of the user;'
-             '2) (after test execution) delete user; delete email generated before for user registration')
+             '2) (after test execution) give the user account back to the pool')
 @pytest.fixture()
-def new_user_logged_in_session_fixture():
-    email_and_password_generator = EmailAndPasswordGenerator()
-    username, email, password = email_and_password_generator.generate_username_and_email_and_password()
-
-    session = requests.Session()
-    user_account_api = UserAccount(session)
-
-    request_create_user = user_account_api.user_registration(username, email, password)
-    response_body, status = request_create_user
-    assert status == 201, "Error with request to register user. Try again"
+def new_user_logged_in_session_fixture(user_account_pool_fixture):
+    account = user_account_pool_fixture.lease()
+    username, email, password = account.username, account.email, account.password
 
-    token_to_confirm_email_for_registration = email_and_password_generator.get_token_from_confirmation_link_for_registration()
-    assert token_to_confirm_email_for_registration is not None
-    request_confirm_email_for_registration = user_account_api.confirm_email(token_to_confirm_email_for_registration)
-    status = request_confirm_email_for_registration[1]
-    assert status == 200, "Error with confirm email for registration. Try again"
+    session = guard_session(create_session())
+    token = get_token_manager().authorize(session, email, password)  # logs in only if there's no valid token yet
+    assert token is not None, "Error with request to log in user. Try again"
 
-    request_log_in_with_email = user_account_api.log_in_with_email_or_username(email, password)
-    # print(f"Response for request_log_in_with_email: {request_log_in_with_email}")
-    response_body, status = request_log_in_with_email
-    assert status == 200, "Error with request to log in user. Try again"
-
-    user_profile_id = response_body.get("user_profile_id")
-    user_role = response_body.get("user_role")
-    user_status = response_body.get("user_status")
-    access_token = response_body.get("access_token")
-
-    session.headers.update({"Authorization": f"Bearer {access_token}"})  # by that we update session, so now the user is logged in
+    user_profile_id = token.login_response.get("user_profile_id")
+    user_role = token.login_response.get("user_role")
+    user_status = token.login_response.get("user_status")
 
     yield session, email, password, user_profile_id, user_role, user_status, username
     # ALL THE CODE ABOVE will be automatically executed before test itself (where this fixture is used)
 
     # ALL THE CODE BELOW will be executed after test itself
-    request_log_in_with_email = user_account_api.log_in_with_email_or_username(email, password)
-    response_body, status = request_log_in_with_email
-    assert status == 200, "Error with request to log in user. Try again"
-    access_token = response_body.get("access_token")
-    session.headers.update(
-        {"Authorization": f"Bearer {access_token}"})  # by that we update session, so now the user is logged in
+    user_account_pool_fixture.give_back(account)
+
 
-    request_delete_user = user_account_api.request_delete_user()
-    # print(f"Response for request_delete_user: {request_delete_user}")
-    status = request_delete_user[1]
-    assert status == 200, "Error with request to start delete user. Try again"
-    print(f"User (with email \'{email}\' and password \'{password}\' and username \'{username}\'was successfully deleted")
 
-    confirmation_code_for_delete_user_from_email = email_and_password_generator.get_confirmation_code_for_delete_user()
-    assert confirmation_code_for_delete_user_from_email is not None, "Error with getting confirmation code from email to delete user. Try again"
-    request_confirm_delete_user = user_account_api.delete_user(confirmation_code_for_delete_user_from_email)
-    status = request_confirm_delete_user[1]
-    assert status == 200, "Error with request to complete delete user. Try again"
+# fixture that returns a user account (already registered and confirmed) shared by all tests of the module
+# that only need "an existing user account" and don't change it (e.g. log in with a wrong password,
+# register with the email already used): 1) email of the user account 2) password of the user account
+# 3) username of the user
+# - the account is taken from the pool once per module (not once per test) and given back after the module
+# - the account is read-only: a test that tries to change it (log out, delete the user, change or reset
+# password) in a session given by a fixture of this file fails right away (see api/support/read_only_accounts.py) -
+# such tests should use new_user_logged_in_session_fixture
+@allure.step('Take a read-only user account shared by tests of the module and return: email, password and username')
+@pytest.fixture(scope="module")
+def shared_user_account_fixture(user_account_pool_fixture):
+    account = user_account_pool_fixture.lease()
+    read_only_accounts = get_read_only_accounts()
+    read_only_accounts.protect(account.email, account.username)
 
-    email_and_password_generator.delete_email_generated()  # assertion for successful deletion of user is done inside
+    yield account.email, account.password, account.username
 
+    read_only_accounts.release(account.email, account.username)
+    user_account_pool_fixture.give_back(account)
 
 
 #fixture to get chat_id
 @pytest.fixture(scope="session")
 def chat_id_session():
-    session = requests.Session()
-    login_data = {
-        "grant_type": "password",
-        "username": VALID_EMAIL,
-        "password": VALID_PASSWORD,
-    }
-
-    response = session.post(
-        BASIC_URL + "/api/login/oauth",
-        data=login_data
-    )
-
-    assert response.status_code == 200, f"Failed to log in: {response.text}"
-    access_token = response.json().get("access_token")
-    session.headers.update({"Authorization": f"Bearer {access_token}"})
+    session = create_session()
 
+    # the account from the .env file is locked, so its password isn't being changed by another worker
+    # (the token is shared with user_logged_in_session_fixture through the token manager)
+    with FileLock(f"user_account_{VALID_EMAIL}"):
+        token = get_token_manager().authorize(session, VALID_EMAIL, VALID_PASSWORD)
+
+    assert token is not None, f"Failed to log in as {VALID_EMAIL}"
     return session
 
+# only the first chat is requested (limit=1), and it's kept in the cache of chats for the whole session
+# (see api/api_library/conversation.py)
 @pytest.fixture(scope="session")
 def chat_id(chat_id_session):
     conversation_api = Conversation(chat_id_session)
-    response_json, status_code = conversation_api.chat_list({"limit": 100, "offset": 0})
-    assert status_code == 200, "Failed to retrieve chat list"
-    return response_json[0]['chatInfo']['id']
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    chat_info = conversation_api.first_chat()
+    assert chat_info is not None, f"The user account {VALID_EMAIL} has no chats"
+    return chat_info['id']
+
+
+# fixture that refreshes (before every test) access tokens that expire soon - in all sessions authorized with them
+# (see api/api_library/token_manager.py)
+@pytest.fixture(autouse=True)
+def access_tokens_refresh_fixture():
+    get_token_manager().refresh_expiring()
+
+
+# fixture that (after all tests of the session) attaches the latency report (see api/api_library/metrics.py)
+# to the allure report
+@pytest.fixture(scope="session", autouse=True)
+def latency_report_fixture():
+    yield
+    if len(latency_recorder.calls_of()) > 0:
+        allure.attach(json.dumps(latency_recorder.report(), indent=2), name="Latency of API-calls by endpoint",
+                      attachment_type=allure.attachment_type.JSON)
+
+
+def pytest_addoption(parser):
+    parser.addini("latency_budgets", "latency budgets for specific endpoints, one per line"
+                                     " (e.g. 'POST /api/login/oauth p95_ms=300'), checked in tests marked"
+                                     " with @pytest.mark.latency_budget", type="linelist", default=[])
+
+
+# checks latency of API-calls made in tests marked with @pytest.mark.latency_budget:
+# - the budget from the marker itself: @pytest.mark.latency_budget(p95_ms=300) - for all API-calls of the test,
+# or @pytest.mark.latency_budget(p95_ms=300, endpoint="POST /api/login/oauth") - for API-calls of one endpoint
+# - and budgets for specific endpoints from pytest.ini ("latency_budgets")
+# the test fails if any budget is exceeded (or xfails - if the marker has "xfail=True")
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("latency_budget")
+    if marker is None:
+        yield
+        return
+
+    calls_before = len(latency_recorder.calls_of())
+    outcome = yield
+    if outcome.excinfo is not None:  # the test failed anyway
+        return
+
+    limits = dict(marker.kwargs)
+    xfail = limits.pop("xfail", False)
+    endpoint = limits.pop("endpoint", None)
+    budgets = [LatencyBudget.from_line(line) for line in item.config.getini("latency_budgets")]
+    if len(limits) > 0:
+        budgets.append(LatencyBudget(endpoint, **limits))
+
+    calls = [call for call in latency_recorder.calls_of()[calls_before:] if call.test == item.nodeid]
+    violations = [violation for budget in budgets for violation in budget.check(calls)]
+    if len(violations) > 0:
+        message = "Latency budget exceeded:\n" + "\n".join(violations)
+        outcome.force_exception(pytest.xfail.Exception(message) if xfail
+                                else pytest.fail.Exception(message, pytrace=False))
+
+
+# tests marked with @pytest.mark.live send every API-call (including API-calls of their fixtures),
+# even if responses recorded before are replayed for other tests (see api/api_library/cassette.py)
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item):
+    cassette = get_default_transport().cassette
+    if cassette is None or item.get_closest_marker("live") is None:
+        yield
+        return
+
+    cassette.force_live = True
+    try:
+        yield
+    finally:
+        cassette.force_live = False
+
+
+def is_xdist_worker(config):
+    return hasattr(config, "workerinput")
+
+
+# durations of tests measured in previous runs, updated by the current run (in the main process only,
+# see api/support/duration_scheduler.py)
+duration_history = None
+
+
+def pytest_configure(config):
+    if is_xdist_worker(config):
+        return
+    global duration_history
+    duration_history = DurationHistory.load(config)
+    # user accounts left by previous (crashed) runs are deleted in background (see api/support/cleanup_queue.py)
+    get_cleanup_queue().sweep_orphans()
+    # latencies and connection counts saved by xdist workers of the previous run are removed
+    if getattr(config, "cache", None) is not None:
+        for directory in ("latency", "connection_stats"):
+            for file_name in glob.glob(os.path.join(config.cache.mkdir(directory), "*.json")):
+                os.remove(file_name)
+
+
+# before tests start, the J.* backend and the mailbox service are checked (one quick API-call each):
+# a service that doesn't respond is treated as unavailable right away (see api/api_library/circuit_breaker.py)
+def pytest_sessionstart(session):
+    if session.config.getoption("collectonly"):
+        return
+    get_circuit_breaker().probe(os.environ.get("BASIC_URL"))
+    probe_url = get_mailbox_backend().probe_url
+    if probe_url is not None:
+        get_circuit_breaker().probe(probe_url)
+
+
+# tests aren't started while the J.* backend is unavailable (after the health probe failed, or too many API-calls
+# failed in a row) - every remaining test fails as an error right away instead of waiting for timeouts;
+# tests that wait for mails (marked with @pytest.mark.waits_for_mail) aren't started while the mailbox service
+# is unavailable either
+def pytest_runtest_setup(item):
+    get_circuit_breaker().check(os.environ.get("BASIC_URL"))
+    probe_url = get_mailbox_backend().probe_url
+    if probe_url is not None and item.get_closest_marker(MAIL_MARKER) is not None:
+        get_circuit_breaker().check(probe_url)
+
+
+# tests run in parallel (pytest -n ...) are given to workers longest first, by durations of previous runs
+# (or by heuristics for tests not run before), instead of the "load" distribution of pytest-xdist as it is
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("dist") != "load" or os.environ.get("TEST_SCHEDULER", "on").lower() == "off":
+        return None
+    return LongestFirstScheduling(config, log, DurationEstimator(duration_history, config.rootpath))
+
+
+# the wall time expected is printed before tests start (for runs without pytest-xdist -
+# the scheduler prints it for runs with it)
+def pytest_report_collectionfinish(config, items):
+    if duration_history is None or len(items) == 0:
+        return None
+    return DurationEstimator(duration_history, config.rootpath).summary([item.nodeid for item in items], 1)
+
+
+def pytest_runtest_logreport(report):
+    if duration_history is not None:
+        duration_history.record(report)
+
+
+# in the end of the run: user accounts registered in the cleanup queue are waited for to be deleted,
+# responses recorded are saved into the cassette (if it's enabled),
+# every xdist worker saves latencies of its API-calls and counts of its connections, and the main process
+# merges them and writes the latency report (into LATENCY_REPORT_PATH, "latency_report.json" by default)
+def pytest_sessionfinish(session):
+    config = session.config
+    get_cleanup_queue().flush()
+    if duration_history is not None:
+        duration_history.save(config)
+    cassette = get_default_transport().cassette
+    if cassette is not None and cassette.recorded > 0:
+        with FileLock("cassette"):  # xdist workers save their responses into the same file
+            cassette.save()
+
+    if getattr(config, "cache", None) is None:
+        return
+    latency_directory = config.cache.mkdir("latency")
+    connection_stats_directory = config.cache.mkdir("connection_stats")
+    if is_xdist_worker(config):
+        latency_recorder.save_calls(os.path.join(latency_directory, f"{get_worker_id()}.json"))
+        connection_stats.save(os.path.join(connection_stats_directory, f"{get_worker_id()}.json"))
+        return
+
+    for file_name in glob.glob(os.path.join(latency_directory, "*.json")):
+        latency_recorder.load_calls(file_name)
+    for file_name in glob.glob(os.path.join(connection_stats_directory, "*.json")):
+        connection_stats.load(file_name)
+    if len(latency_recorder.calls_of()) > 0:
+        latency_recorder.write_report(os.environ.get("LATENCY_REPORT_PATH", "latency_report.json"))
+
+
+# prints in the end of the run how many times connections were reused by API-calls, how many API-calls
+# were replayed from the cassette, how many user accounts were deleted in background (and which ones leaked), and percentiles of latency for every endpoint
+def pytest_terminal_summary(terminalreporter):
+    if connection_stats.requests_sent > 0:  # nothing is counted by the main process if workers' counts weren't saved
+        terminalreporter.write_line(connection_stats.summary())
+    terminalreporter.write_line(get_cleanup_queue().summary())
+    if get_circuit_breaker().summary():
+        terminalreporter.write_line(get_circuit_breaker().summary())
+    cassette = get_default_transport().cassette
+    if cassette is not None:
+        terminalreporter.write_line(cassette.summary())
+    if len(latency_recorder.calls_of()) > 0:
+        terminalreporter.write_sep("-", "latency of API-calls by endpoint")
+        terminalreporter.write_line(latency_recorder.format_table())
@@ -0,0 +1,59 @@
+# the entry point of the load runner, e.g.:
+#     python -m api.load --mix login=5,username_check=3,register_confirm=1 --rps 20 --duration 60
+#     python -m api.load --mix username_check --concurrency 50 --duration 30 --mock
+# - targets BASIC_URL from the .env file, or a local mock backend (--mock, see api/support/mock_backend.py)
+# - the "login" scenario logs in with VALID_EMAIL and VALID_PASSWORD from the .env file
+# (with --mock such user account is created in the mock backend)
+# - the report is printed and can also be saved as JSON (--report)
+# - user accounts registered by scenarios are deleted in background, the run ends when all of them are deleted
+# (see api/support/cleanup_queue.py)
+
+import argparse
+import json
+import os
+
+from dotenv import load_dotenv
+
+from api.load.runner import LoadRunner, parse_mix
+from api.load.scenarios import LoadScenarios
+from api.support.cleanup_queue import get_cleanup_queue
+
+
+def main(arguments=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog="python -m api.load", description="Load test of the J.* API")
+    parser.add_argument("--mix", default="login=5,username_check=3,register_confirm=1",
+                        help="scenarios and their weights, e.g. login=5,username_check=3,register_confirm=1")
+    parser.add_argument("--duration", type=float, default=30, help="duration of the run (in seconds)")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="scenarios started per second (open loop); if not set, workers run without pauses")
+    parser.add_argument("--concurrency", type=int, default=10, help="number of workers")
+    parser.add_argument("--mock", action="store_true", help="run against a local mock backend")
+    parser.add_argument("--report", default=None, help="path of the JSON file to save the report into")
+    options = parser.parse_args(arguments)
+
+    login_email = os.environ.get("VALID_EMAIL")
+    login_password = os.environ.get("VALID_PASSWORD")
+    if options.mock:
+        from api.support.mock_backend import start_mock_backend
+        server = start_mock_backend()
+        login_email, login_password = "load_user@mail.local", "LoadUser1"
+        server.backend.add_user("load_user", login_email, login_password)
+
+    runner = LoadRunner(LoadScenarios(login_email, login_password), parse_mix(options.mix), options.duration,
+                        rps=options.rps, concurrency=options.concurrency)
+    report = runner.run()
+    print(runner.format_report(report))
+    get_cleanup_queue().flush()
+    print(get_cleanup_queue().summary())
+    if options.report:
+        with open(options.report, "w") as file:
+            json.dump(report, file, indent=2)
+
+    error_rate = sum(row["errors"] for row in report["scenarios"].values()) \
+        / max(1, sum(row["count"] for row in report["scenarios"].values()))
+    return 1 if error_rate > 0 else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
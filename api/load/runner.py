@@ -0,0 +1,177 @@
+# this class used to run scenarios (see api/load/scenarios.py) under load and build a report:
+# - scenarios are chosen at random by their weights in the mix, e.g. {"login": 5, "username_check": 3}
+# - open-loop mode (rps is set): scenarios are started at the fixed rate no matter how fast the backend responds,
+# and latency is counted from the moment the scenario was scheduled (so waiting for a free worker is counted too)
+# - closed-loop mode (rps is None): "concurrency" workers run scenarios one after another without pauses
+# - the report contains throughput, error rate and latency histogram for every scenario,
+# and for every endpoint (API-calls are measured by the Transport-class, see api/api_library/metrics.py)
+
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from api.api_library.metrics import latency_recorder, percentile
+
+# upper bounds (in ms) of bars of latency histograms
+HISTOGRAM_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+# parses a mix like "login=5,username_check=3,register_confirm=1" into {"login": 5.0, ...}
+def parse_mix(line):
+    mix = {}
+    for item in line.split(","):
+        if item.strip():
+            name, _, weight = item.partition("=")
+            mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# returns a histogram of latencies (in ms): {label of bar: number of latencies}
+def histogram(latencies_ms):
+    counts = Counter()
+    for latency in latencies_ms:
+        bound = next((bound for bound in HISTOGRAM_BOUNDS_MS if latency <= bound), None)
+        counts[bound] += 1
+    return {(f"<= {bound} ms" if bound is not None else f"> {HISTOGRAM_BOUNDS_MS[-1]} ms"): counts[bound]
+            for bound in HISTOGRAM_BOUNDS_MS + [None]}
+
+
+# returns lines of the histogram as text (empty bars before the first and after the last non-empty one are skipped)
+def format_histogram(bars, width=40):
+    labels = [label for label, count in bars.items() if count > 0]
+    if len(labels) == 0:
+        return []
+    all_labels = list(bars)
+    biggest = max(bars.values())
+    lines = []
+    for label in all_labels[all_labels.index(labels[0]):all_labels.index(labels[-1]) + 1]:
+        lines.append(f"  {label:>12} {bars[label]:>7} {'#' * round(width * bars[label] / biggest)}")
+    return lines
+
+
+class ScenarioStats:
+
+    def __init__(self):
+        self.latencies = []  # latency (in seconds) of every run of the scenario
+        self.errors = Counter()  # error message -> how many times it happened
+        self.lock = threading.Lock()
+
+    def record(self, latency, error=None):
+        with self.lock:
+            self.latencies.append(latency)
+            if error is not None:
+                self.errors[error] += 1
+
+
+class LoadRunner:
+
+    def __init__(self, scenarios, mix, duration, rps=None, concurrency=10):
+        unknown_scenarios = set(mix) - set(scenarios.scenarios)
+        assert len(unknown_scenarios) == 0, \
+            f"Unknown scenarios: {unknown_scenarios}, use: {list(scenarios.scenarios)}"
+        self.scenarios = scenarios
+        self.mix = mix
+        self.duration = duration  # in seconds
+        self.rps = rps  # None - closed-loop mode
+        self.concurrency = concurrency
+        self.stats = {name: ScenarioStats() for name in mix}
+        self.elapsed = 0.0
+        self.calls_before = 0
+
+    def choose_scenario(self):
+        return random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    def run_scenario(self, name, scheduled_at):
+        error = None
+        try:
+            self.scenarios.scenarios[name]()
+        except Exception as exception:
+            error = f"{type(exception).__name__}: {str(exception).splitlines()[0] if str(exception) else ''}"
+        self.stats[name].record(time.perf_counter() - scheduled_at, error)
+
+    # starts scenarios at the rate of "rps" per second until the duration has passed
+    def run_open_loop(self, executor, started_at):
+        futures = []
+        scheduled = 0
+        while True:
+            scheduled_at = started_at + scheduled / self.rps
+            if scheduled_at - started_at >= self.duration:
+                break
+            pause = scheduled_at - time.perf_counter()
+            if pause > 0:
+                time.sleep(pause)
+            futures.append(executor.submit(self.run_scenario, self.choose_scenario(), scheduled_at))
+            scheduled += 1
+        for future in futures:
+            future.result()
+
+    # every worker runs scenarios one after another until the duration has passed
+    def run_closed_loop(self, executor, started_at):
+        def worker():
+            while time.perf_counter() - started_at < self.duration:
+                self.run_scenario(self.choose_scenario(), time.perf_counter())
+
+        for future in [executor.submit(worker) for i in range(self.concurrency)]:
+            future.result()
+
+    def run(self):
+        mode = f"{self.rps} scenarios per second" if self.rps else f"{self.concurrency} concurrent workers"
+        print(f"Running {self.mix} for {self.duration} s with {mode}")
+        self.calls_before = len(latency_recorder.calls_of())
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            if self.rps:
+                self.run_open_loop(executor, started_at)
+            else:
+                self.run_closed_loop(executor, started_at)
+        self.elapsed = time.perf_counter() - started_at
+        return self.report()
+
+    # returns the report: {"elapsed_s", "scenarios": {name: {...}}, "endpoints": {endpoint: {...}}}
+    def report(self):
+        report = {"elapsed_s": self.elapsed, "scenarios": {}, "endpoints": {}}
+        for name, stats in self.stats.items():
+            report["scenarios"][name] = self.summary([latency * 1000 for latency in stats.latencies],
+                                                     sum(stats.errors.values()))
+            report["scenarios"][name]["error_messages"] = dict(stats.errors.most_common(5))
+
+        calls_by_endpoint = {}
+        for call in latency_recorder.calls_of()[self.calls_before:]:
+            if call.test is not None:  # background work (e.g. deleting user accounts), not the load itself
+                continue
+            calls_by_endpoint.setdefault(call.endpoint, []).append(call)
+        for endpoint, calls in sorted(calls_by_endpoint.items()):
+            errors = len([call for call in calls if call.status is None or call.status >= 500])
+            report["endpoints"][endpoint] = self.summary([call.wall * 1000 for call in calls], errors)
+        return report
+
+    def summary(self, latencies_ms, errors):
+        count = len(latencies_ms)
+        return {
+            "count": count,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "throughput_per_s": count / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": percentile(latencies_ms, 0.50),
+            "p95_ms": percentile(latencies_ms, 0.95),
+            "p99_ms": percentile(latencies_ms, 0.99),
+            "max_ms": max(latencies_ms) if count else None,
+            "histogram": histogram(latencies_ms)
+        }
+
+    def format_report(self, report):
+        lines = [f"Load run finished in {report['elapsed_s']:.1f} s"]
+        for title, rows in (("scenario", report["scenarios"]), ("endpoint", report["endpoints"])):
+            for name, row in rows.items():
+                lines.append("")
+                lines.append(f"{title} {name}: {row['count']} runs, {row['throughput_per_s']:.1f}/s,"
+                             f" errors {row['error_rate']:.1%}")
+                if row["count"]:
+                    lines.append(f"  p50 {row['p50_ms']:.1f} ms, p95 {row['p95_ms']:.1f} ms,"
+                                 f" p99 {row['p99_ms']:.1f} ms, max {row['max_ms']:.1f} ms")
+                lines.extend(format_histogram(row["histogram"]))
+                for message, count in row.get("error_messages", {}).items():
+                    lines.append(f"  {count} x {message}")
+        return "\n".join(lines)
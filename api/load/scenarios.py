@@ -0,0 +1,63 @@
+# this class used to describe scenarios run by the load runner (see api/load/runner.py),
+# every scenario is one user flow made by the same clients of api_library that are used by tests:
+# - "login" - log in with email of an existing user account
+# - "username_check" - check that a random username is free
+# - "register_confirm" - register a new user account and confirm its email (by the link received in the mail),
+# the user account is deleted in background by the cleanup queue (see api/support/cleanup_queue.py)
+# every scenario raises AssertionError if the backend responded not as expected
+
+import random
+import string
+import threading
+
+from api.api_library.http_session import create_session
+from api.api_library.user_account import UserAccount
+from api.support.cleanup_queue import get_cleanup_queue
+from api.support.temporary_email_generator import EmailAndPasswordGenerator
+
+
+class LoadScenarios:
+
+    def __init__(self, login_email=None, login_password=None):
+        self.login_email = login_email  # the user account used by the "login" scenario
+        self.login_password = login_password
+        self.clients = threading.local()  # every thread uses its own session (but the pool of connections is shared)
+        self.scenarios = {
+            "login": self.login,
+            "username_check": self.username_check,
+            "register_confirm": self.register_confirm,
+        }
+
+    def client(self):
+        if getattr(self.clients, "user_account", None) is None:
+            self.clients.user_account = UserAccount(create_session())
+        return self.clients.user_account
+
+    def login(self):
+        assert self.login_email is not None, "Email and password of the user account to log in are not set"
+        response_data, status = self.client().log_in_with_email_or_username(self.login_email, self.login_password)
+        assert status == 200, f"Log in failed with status {status}: {response_data}"
+
+    def username_check(self):
+        username = "load" + "".join(random.choice(string.ascii_lowercase) for i in range(21))
+        status = self.client().username_check(username)[1]
+        assert status == 204, f"Username check failed with status {status}"
+
+    def register_confirm(self):
+        generator = EmailAndPasswordGenerator()
+        username, email, password = generator.generate_username_and_email_and_password()
+        registered = False
+        try:
+            response_data, status = self.client().user_registration(username, email, password)
+            assert status == 201, f"Registration failed with status {status}: {response_data}"
+            registered = True
+
+            token = generator.get_token_from_confirmation_link_for_registration()
+            assert token is not None, "No mail with the confirmation link was received"
+            response_data, status = self.client().confirm_email(token)
+            assert status == 200, f"Email confirmation failed with status {status}: {response_data}"
+        finally:
+            if registered:  # the user account is deleted together with the email
+                get_cleanup_queue().register(generator)
+            else:
+                generator.delete_email_generated()
@@ -0,0 +1,163 @@
+# this class used to delete user accounts created by tests in background, so tests don't wait for it:
+# - tests and fixtures register user accounts (with the EmailAndPasswordGenerator-instance used to create them)
+# - a pool of background workers deletes them (log in, request delete, wait for the code, delete the user
+# and the email) while the next tests are already running
+# - at the end of the session the queue is flushed (all deletions are waited for), and user accounts
+# that couldn't be deleted are reported as leaked
+# - every user account registered is written into a ledger file and removed from it when deleted, so
+# user accounts left by a crashed run are deleted (swept) at the start of the next run
+# (the ledger keeps passwords - they are needed to log in and delete the user account - so it's readable
+# by the current user only: the file is created with 0600 permissions in a directory of the user)
+
+# settings can be changed in the .env file:
+# CLEANUP_WORKERS - how many user accounts are deleted at the same time (4 by default)
+# CLEANUP_LEDGER_PATH - the ledger file ("~/.j_project_api/cleanup_ledger.json" by default),
+# not used with MOCK_BACKEND=true (user accounts of the mock backend don't outlive the run)
+# CLEANUP_MAX_ATTEMPTS - after so many unsuccessful sweeps a user account is removed from the ledger (3 by default)
+# CLEANUP_ORPHAN_AGE - only user accounts registered earlier than that (in seconds) are swept, so user accounts
+# of another run going on at the same time aren't touched (3600 by default)
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from api.api_library.metrics import set_background_work
+from api.support.file_lock import FileLock
+from api.support.temporary_email_generator import EmailAndPasswordGenerator
+from api.support.user_account_support import UserAccountSupport
+
+
+class CleanupQueue:
+
+    def __init__(self, workers=None, ledger_path=None, max_attempts=None, orphan_age=None):
+        self.workers = workers if workers is not None else int(os.environ.get("CLEANUP_WORKERS", 4))
+        self.ledger_path = ledger_path  # None - no ledger
+        self.max_attempts = max_attempts if max_attempts is not None \
+            else int(os.environ.get("CLEANUP_MAX_ATTEMPTS", 3))
+        self.orphan_age = orphan_age if orphan_age is not None \
+            else float(os.environ.get("CLEANUP_ORPHAN_AGE", 3600))
+        self.base_url = os.environ.get("BASIC_URL")
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cleanup")
+        self.futures = []
+        self.deleted = 0
+        self.leaked = []  # emails of user accounts that couldn't be deleted
+        self.lock = threading.Lock()
+
+    # creates the queue with settings from the .env file
+    @classmethod
+    def from_env(cls):
+        ledger_path = None
+        if os.environ.get("MOCK_BACKEND", "false").lower() != "true":
+            ledger_path = os.environ.get("CLEANUP_LEDGER_PATH",
+                                        os.path.join(os.path.expanduser("~"), ".j_project_api", "cleanup_ledger.json"))
+        return cls(ledger_path=ledger_path)
+
+    # changes the ledger: "change" is a function that gets all records of the ledger (a dict: email -> record)
+    # and changes them in place
+    def _update_ledger(self, change):
+        if self.ledger_path is None:
+            return
+        with self.lock, FileLock("cleanup_ledger"):  # the ledger is shared by all processes (e.g. xdist workers)
+            records = {}
+            if os.path.exists(self.ledger_path):
+                with open(self.ledger_path) as file:
+                    records = json.load(file)
+            change(records)
+            os.makedirs(os.path.dirname(os.path.abspath(self.ledger_path)), mode=0o700, exist_ok=True)
+            # only the current user can read the ledger (a file created by an older version is fixed too)
+            file_descriptor = os.open(self.ledger_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(file_descriptor, 0o600)
+            with os.fdopen(file_descriptor, "w") as file:
+                json.dump(records, file, indent=1)
+
+    # registers the user account created with the generator, it will be deleted in background
+    # (together with the email); the generator shouldn't be used by the test after that
+    def register(self, email_and_password_generator):
+        email = email_and_password_generator.email
+        record = {"username": email_and_password_generator.username, "email": email,
+                  "password": email_and_password_generator.password, "base_url": self.base_url,
+                  "registered_at": time.time(), "attempts": 0}
+        self._update_ledger(lambda records: records.update({email: record}))
+        return self._submit(email_and_password_generator, record)
+
+    def _submit(self, email_and_password_generator, record, orphan=False):
+        future = self.executor.submit(self._delete, email_and_password_generator, record, orphan)
+        with self.lock:
+            self.futures.append(future)
+        return future
+
+    def _delete(self, email_and_password_generator, record, orphan):
+        set_background_work("cleanup")  # API-calls made here don't belong to the test running at the moment
+        email = record["email"]
+        try:
+            if orphan:  # codes received by the previous run mustn't be used
+                email_and_password_generator.ignore_mails_received_before()
+            UserAccountSupport().delete_user_account(email_and_password_generator)
+            email_and_password_generator.delete_email_generated()
+        except Exception as error:
+            print(f"Unable to delete user account '{email}': {type(error).__name__} {error}")
+            record["attempts"] += 1
+            gave_up = record["attempts"] >= self.max_attempts
+            self._update_ledger(lambda records: records.pop(email, None) if gave_up
+                                else records.update({email: record}))
+            with self.lock:
+                self.leaked.append(email)
+            return False
+
+        self._update_ledger(lambda records: records.pop(email, None))
+        with self.lock:
+            self.deleted += 1
+        return True
+
+    # deletes (in background) user accounts left in the ledger by previous runs against the same backend
+    def sweep_orphans(self):
+        if self.ledger_path is None or not os.path.exists(self.ledger_path):
+            return 0
+        orphans = []
+        registered_before = time.time() - self.orphan_age
+        self._update_ledger(lambda records: orphans.extend(
+            record for record in records.values()
+            if record.get("base_url") == self.base_url and record["registered_at"] < registered_before))
+
+        for record in orphans:
+            email_and_password_generator = EmailAndPasswordGenerator()
+            email_and_password_generator.username = record["username"]
+            email_and_password_generator.email = record["email"]
+            email_and_password_generator.password = record["password"]
+            self._submit(email_and_password_generator, record, orphan=True)
+        if len(orphans) > 0:
+            print(f"{len(orphans)} user accounts left by previous runs will be deleted")
+        return len(orphans)
+
+    # waits until all user accounts registered are deleted, returns emails of user accounts that couldn't be deleted
+    def flush(self, timeout=None):
+        with self.lock:
+            futures = list(self.futures)
+        not_done = wait(futures, timeout=timeout).not_done
+        with self.lock:
+            leaked = list(self.leaked)
+        if len(not_done) > 0:
+            leaked.append(f"{len(not_done)} user accounts still being deleted")
+        return leaked
+
+    def summary(self):
+        leaked = self.flush(timeout=0)
+        line = f"Cleanup: {self.deleted} user accounts deleted in background"
+        if len(leaked) > 0:
+            line += f", NOT deleted (leaked): {', '.join(leaked)}"
+        return line
+
+
+_cleanup_queue = None
+_cleanup_queue_lock = threading.Lock()
+
+
+# returns the queue used by the whole process
+def get_cleanup_queue():
+    global _cleanup_queue
+    with _cleanup_queue_lock:
+        if _cleanup_queue is None:
+            _cleanup_queue = CleanupQueue.from_env()
+        return _cleanup_queue
@@ -0,0 +1,255 @@
+# the file contains everything needed to run tests in parallel (pytest -n ...) longest first:
+# - DurationHistory keeps the duration of every test (setup + call + teardown) measured in previous runs
+# (in the pytest cache, smoothed over runs), it's updated at the end of every run
+# - DurationEstimator estimates tests never run before by heuristics: fixtures they use (e.g. a new user account)
+# and mails they wait for (given by the marker: @pytest.mark.waits_for_mail(mails=2), see pytest.ini)
+# - LongestFirstScheduling (used by pytest-xdist instead of its "load" distribution) gives the longest work unit
+# left to the worker that asks for work (longest processing time first) - so the slowest tests (that wait
+# for mails) are started first and spread over all workers, and short tests fill the gaps in the end;
+# tests that share a module- or class-scoped fixture are kept together in one work unit (so the fixture
+# is created once)
+# - the wall time of the run is estimated by the same schedule before tests start, and printed
+#
+# settings can be changed in the .env file:
+# TEST_SCHEDULER - "off" to use the "load" distribution of pytest-xdist as it is ("on" by default)
+# TEST_DURATION_SMOOTHING - weight of the last run in the duration kept (0.5 by default)
+# TEST_MAIL_WAIT_ESTIMATE - time (in seconds) a test never run before is expected to wait for every mail
+# (3 by default)
+
+import ast
+import heapq
+import os
+
+try:
+    from xdist.scheduler import LoadScopeScheduling
+except ImportError:  # pytest-xdist isn't installed - tests can't be run in parallel anyway
+    LoadScopeScheduling = object
+
+DURATIONS_CACHE_KEY = "j_project_api/durations"
+
+# time (in seconds) of a test that only sends a couple of API-calls, for tests never run before
+BASE_TEST_COST = 0.3
+# time (in seconds) added by fixtures, for tests never run before (fixtures not listed add nothing)
+FIXTURE_COSTS = {
+    "new_user_logged_in_session_fixture": 0.5,  # takes a user account from the pool and logs in
+    "user_logged_in_session_fixture": 0.1,  # the token is usually cached
+    "shared_user_account_fixture": 0.1,  # created once per module
+    "user_account_lock_fixture": 0.1,
+    "chat_id": 0.3,
+}
+# marker of tests that wait for mails (the same marker is checked before such tests are started, see api/conftest.py)
+MAIL_MARKER = "waits_for_mail"
+
+
+class DurationHistory:
+
+    def __init__(self, durations=None, smoothing=None):
+        self.durations = dict(durations or {})  # node ID of the test -> duration (in seconds)
+        self.smoothing = smoothing if smoothing is not None \
+            else float(os.environ.get("TEST_DURATION_SMOOTHING", 0.5))
+        self.measured = {}  # node ID -> duration measured in the current run (all phases together)
+        self.skipped = set()  # node IDs of tests skipped in the current run (their durations aren't kept)
+
+    @classmethod
+    def load(cls, config):
+        cache = getattr(config, "cache", None)
+        return cls(cache.get(DURATIONS_CACHE_KEY, {}) if cache is not None else {})
+
+    # adds the duration of one phase (setup, call, teardown) of the test
+    def record(self, report):
+        self.measured[report.nodeid] = self.measured.get(report.nodeid, 0.0) + report.duration
+        if report.skipped:
+            self.skipped.add(report.nodeid)
+
+    # merges durations measured in the current run into the history and saves it into the pytest cache
+    def save(self, config):
+        for nodeid, duration in self.measured.items():
+            if nodeid in self.skipped:
+                continue
+            previous = self.durations.get(nodeid)
+            self.durations[nodeid] = round(duration if previous is None
+                                           else self.smoothing * duration + (1 - self.smoothing) * previous, 3)
+        cache = getattr(config, "cache", None)
+        if cache is not None and len(self.measured) > 0:
+            cache.set(DURATIONS_CACHE_KEY, self.durations)
+
+
+# this class used to estimate durations of tests (and to find tests that should be run together) by node IDs only,
+# so it works in the main process of pytest-xdist too (where tests aren't collected):
+# the test module and conftest.py files are parsed to find fixtures of the test and calls in its source
+class DurationEstimator:
+
+    def __init__(self, history, rootdir, mail_wait=None):
+        self.history = history
+        self.rootdir = str(rootdir)
+        self.mail_wait = mail_wait if mail_wait is not None \
+            else float(os.environ.get("TEST_MAIL_WAIT_ESTIMATE", 3))
+        self.modules = {}  # path -> (parsed module, its source) - or (None, "") if it can't be parsed
+        self.fixtures = {}  # path of the test module -> fixtures available in it (see _fixtures())
+        self.groups = {}  # node ID -> work unit (the node ID itself, the module or the class)
+        self.estimated = set()  # node IDs estimated by heuristics (not run before)
+
+    def _parse(self, path):
+        if path not in self.modules:
+            try:
+                with open(path, encoding="utf-8") as file:
+                    source = file.read()
+                self.modules[path] = ast.parse(source), source
+            except (OSError, SyntaxError):
+                self.modules[path] = None, ""
+        return self.modules[path]
+
+    # returns (function of the test, classes it's defined in) or (None, [])
+    def _test_function(self, nodeid):
+        parts = nodeid.split("::")
+        path = os.path.join(self.rootdir, parts[0])
+        module = self._parse(path)[0]
+        if module is None:
+            return None, []
+        scope, classes = module.body, []
+        for name in parts[1:-1]:
+            node = next((node for node in scope if isinstance(node, ast.ClassDef) and node.name == name), None)
+            if node is None:
+                return None, []
+            scope = node.body
+            classes.append(node)
+        name = parts[-1].split("[")[0]  # without parameters
+        function = next((node for node in scope if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                         and node.name == name), None)
+        return function, classes
+
+    # returns how many mails the test waits for, by the marker of the test (or of its class):
+    # @pytest.mark.waits_for_mail(mails=2) - 2, @pytest.mark.waits_for_mail - 1, no marker - 0
+    def _mail_waits(self, function, classes):
+        for node in [function] + list(reversed(classes)):
+            for decorator in node.decorator_list:
+                target = decorator.func if isinstance(decorator, ast.Call) else decorator
+                if getattr(target, "attr", None) != MAIL_MARKER:
+                    continue
+                arguments = list(getattr(decorator, "args", [])) + [keyword.value for keyword in
+                                                                   getattr(decorator, "keywords", [])
+                                                                   if keyword.arg == "mails"]
+                if len(arguments) > 0 and isinstance(arguments[0], ast.Constant):
+                    return arguments[0].value
+                return 1
+        return 0
+
+    # returns fixtures defined in the test module and conftest.py files above it:
+    # name -> (scope, names of fixtures it uses)
+    def _fixtures(self, nodeid):
+        path = os.path.join(self.rootdir, nodeid.split("::")[0])
+        if path in self.fixtures:
+            return self.fixtures[path]
+        paths = [path]
+        directory = os.path.dirname(path)
+        while directory.startswith(self.rootdir):
+            paths.append(os.path.join(directory, "conftest.py"))
+            if directory == self.rootdir:
+                break
+            directory = os.path.dirname(directory)
+
+        fixtures = {}
+        for module in filter(None, (self._parse(path)[0] for path in reversed(paths) if os.path.exists(path))):
+            for node in ast.walk(module):
+                if not isinstance(node, ast.FunctionDef):
+                    continue
+                for decorator in node.decorator_list:
+                    target = decorator.func if isinstance(decorator, ast.Call) else decorator
+                    if getattr(target, "attr", getattr(target, "id", None)) != "fixture":
+                        continue
+                    scope = next((keyword.value.value for keyword in getattr(decorator, "keywords", [])
+                                  if keyword.arg == "scope" and isinstance(keyword.value, ast.Constant)),
+                                 "function")
+                    fixtures[node.name] = (scope, [arg.arg for arg in node.args.args if arg.arg != "request"])
+        self.fixtures[path] = fixtures
+        return fixtures
+
+    # returns names of all fixtures the test uses (including fixtures used by its fixtures)
+    def _fixtures_of(self, function, fixtures):
+        used = set()
+        names = [arg.arg for arg in function.args.args if arg.arg != "self"]
+        while len(names) > 0:
+            name = names.pop()
+            if name not in used:
+                used.add(name)
+                names.extend(fixtures.get(name, (None, []))[1])
+        return used
+
+    # returns the work unit of the test: tests that use the same module- or class-scoped fixture
+    # are run together, every other test is a unit of its own
+    def group_of(self, nodeid):
+        if nodeid not in self.groups:
+            self.groups[nodeid] = nodeid
+            function = self._test_function(nodeid)[0]
+            if function is not None:
+                fixtures = self._fixtures(nodeid)
+                scopes = {fixtures[name][0] for name in self._fixtures_of(function, fixtures) if name in fixtures}
+                parts = nodeid.split("::")
+                if "module" in scopes:
+                    self.groups[nodeid] = parts[0]
+                elif "class" in scopes:
+                    self.groups[nodeid] = "::".join(parts[:-1])
+        return self.groups[nodeid]
+
+    # returns the expected duration of the test (in seconds)
+    def estimate(self, nodeid):
+        if nodeid in self.history.durations:
+            return self.history.durations[nodeid]
+
+        self.estimated.add(nodeid)
+        function, classes = self._test_function(nodeid)
+        if function is None:
+            return BASE_TEST_COST
+        fixtures = self._fixtures(nodeid)
+        fixture_cost = sum(FIXTURE_COSTS.get(name, 0.0) for name in self._fixtures_of(function, fixtures))
+        return BASE_TEST_COST + fixture_cost + self._mail_waits(function, classes) * self.mail_wait
+
+    # returns work units (unit -> node IDs, in the order of the collection) and the expected duration of every unit
+    def work_units(self, nodeids):
+        units = {}
+        for nodeid in nodeids:
+            units.setdefault(self.group_of(nodeid), []).append(nodeid)
+        return units, {unit: sum(self.estimate(nodeid) for nodeid in unit_nodeids)
+                       for unit, unit_nodeids in units.items()}
+
+    # returns a line with the wall time of the run expected (the longest work unit first to the first worker free)
+    def summary(self, nodeids, workers):
+        units, durations = self.work_units(nodeids)
+        total = sum(durations.values())
+        estimated = len([nodeid for nodeid in nodeids if nodeid in self.estimated])
+        return f"Expected wall time: {estimate_wall_time(durations.values(), workers):.1f} s on {workers} " \
+               f"worker(s), {total:.1f} s of tests in {len(units)} work units " \
+               f"({estimated} of {len(nodeids)} tests estimated by heuristics, not run before)"
+
+
+# returns the wall time of running jobs (durations) on workers, when every worker free takes the longest job left
+def estimate_wall_time(durations, workers):
+    finish_times = [0.0] * max(workers, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + duration)
+    return max(finish_times)
+
+
+# the "load" distribution of pytest-xdist, but work units are given to workers longest first
+# (created by the pytest_xdist_make_scheduler hook in api/conftest.py)
+class LongestFirstScheduling(LoadScopeScheduling):
+
+    def __init__(self, config, log=None, estimator=None):
+        super().__init__(config, log)
+        self.estimator = estimator
+        self.sorted = False
+
+    def _split_scope(self, nodeid):
+        return self.estimator.group_of(nodeid)
+
+    def _assign_work_unit(self, node):
+        if not self.sorted:  # the first unit is assigned when the collection is complete
+            self.sorted = True
+            nodeids = [nodeid for unit in self.workqueue.values() for nodeid in unit]
+            durations = self.estimator.work_units(nodeids)[1]
+            for unit in sorted(self.workqueue, key=lambda unit: -durations[unit]):
+                self.workqueue.move_to_end(unit)
+            terminal_reporter = self.config.pluginmanager.get_plugin("terminalreporter")
+            if terminal_reporter is not None:
+                terminal_reporter.write_line(self.estimator.summary(nodeids, len(self.assigned_work)))
+        super()._assign_work_unit(node)
@@ -0,0 +1,89 @@
+# this class used to lock something shared between several processes running tests at the same time
+# (e.g. between pytest-xdist workers), like a user account whose password is changed in a test:
+# - the lock is a file created in the temporary directory of the system, so every process on the machine sees it
+# - the lock is re-entrant inside one thread (it can be taken again by the thread that already holds it),
+# other threads of the same process wait for it like other processes do
+# - the lock file keeps the id of the process holding it: if the process doesn't exist anymore (it crashed),
+# the lock file is removed; a lock file without a process id is removed once it's older than "stale_after" seconds
+
+import os
+import re
+import tempfile
+import threading
+import time
+
+
+def _process_exists(process_id):
+    try:
+        os.kill(process_id, 0)  # no signal is sent, only checks the process
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # the process exists, but belongs to another user
+        return True
+    return True
+
+
+class FileLock:
+
+    directory = os.path.join(tempfile.gettempdir(), "j_project_api_locks")
+    _held_in_process = {}  # (path of lock file, id of thread) -> how many times it was taken by the thread
+    _process_lock = threading.RLock()
+
+    def __init__(self, name, timeout=300, stale_after=600, poll_interval=0.1):
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        self.path = os.path.join(self.directory, f"{safe_name}.lock")
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._process_lock:
+                if self._held_in_process.get(self._key(), 0) > 0:
+                    self._held_in_process[self._key()] += 1
+                    return
+                try:
+                    file_descriptor = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    os.write(file_descriptor, str(os.getpid()).encode())
+                    os.close(file_descriptor)
+                    self._held_in_process[self._key()] = 1
+                    return
+                except FileExistsError:
+                    self._remove_if_stale()
+
+            assert time.monotonic() < deadline, f"Unable to take the lock {self.path} in {self.timeout} s"
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        with self._process_lock:
+            self._held_in_process[self._key()] -= 1
+            if self._held_in_process[self._key()] == 0:
+                del self._held_in_process[self._key()]
+                os.remove(self.path)
+
+    def _key(self):
+        return self.path, threading.get_ident()
+
+    # removes the lock file if the process that took the lock doesn't exist anymore
+    # (a lock held for a long time by a live process is never removed)
+    def _remove_if_stale(self):
+        try:
+            with open(self.path) as file:
+                holder = file.read().strip()
+            if holder.isdigit():
+                stale = not _process_exists(int(holder))
+            else:  # the process id isn't written yet (or the file is damaged)
+                stale = time.time() - os.path.getmtime(self.path) > self.stale_after
+            if stale:
+                os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,100 @@
+# this class used to wait for several mails at once (in background), while the test keeps sending API-calls:
+# - created by EmailAndPasswordGenerator.expect_mails() with names of extraction rules
+# (see api/support/mail_extraction.py), the same rule can be given several times to wait for several such mails
+# - one background thread checks the email (with the same adaptive backoff as MailWaiter-class uses)
+# until a new value is found for every rule expected, or the deadline is reached
+# - values are returned as they arrive (as_completed()), or all at once for a rule (values(), value())
+# - only values that weren't returned before by the generator are taken (the same way as get_token_...() methods do)
+#
+# EXAMPLE:
+#     mails = email_and_password_generator.expect_mails(TOKEN_FOR_PASSWORD_RESET)
+#     password_api.request_password_recovery_by_email_or_username(email)
+#     ...  # other API-calls while the mail is on its way
+#     reset_token = mails.value(TOKEN_FOR_PASSWORD_RESET)
+
+import queue
+import threading
+
+from api.support.mail_waiter import MailWaiter
+
+_DONE = object()  # put into the queue when waiting is over
+
+
+class MailExpectation:
+
+    def __init__(self, email_and_password_generator, names):
+        self.generator = email_and_password_generator
+        self.pending = list(names)  # names of rules that are still waited for (a name per mail)
+        self.found = {name: [] for name in names}  # name of rule -> values found (in order of arrival)
+        self.arrived = queue.Queue()  # (name, value) in order of arrival
+        self.cancelled = False
+        self.done = False  # True when waiting is over
+        self.error = None  # error raised while checking the email (raised again to the test by values() and value())
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)  # notified when a value is found and when waiting is over
+        self.mail_waiter = MailWaiter()
+        self.thread = threading.Thread(target=self._wait, daemon=True)
+        self.thread.start()
+
+    def _wait(self):
+        try:
+            self.mail_waiter.wait_for(
+                self._check, lambda timeout: self.generator.mailbox.wait_for_new_mail(self.generator.email, timeout))
+        except Exception as error:
+            self.error = error
+        finally:
+            with self.changed:
+                self.done = True
+                self.changed.notify_all()
+            self.arrived.put(_DONE)
+
+    # checks the email once, takes new values for rules still pending (the oldest mails first),
+    # returns True when nothing is pending anymore (or waiting was cancelled), otherwise - None
+    def _check(self):
+        if self.cancelled:
+            return True
+        for name in set(self.pending):
+            for value in self.generator.take_new_values(name, self.pending.count(name)):
+                with self.changed:
+                    self.pending.remove(name)
+                    self.found[name].append(value)
+                    self.changed.notify_all()
+                self.arrived.put((name, value))
+        return True if len(self.pending) == 0 else None
+
+    # yields (name of rule, value) as soon as every mail arrives; after the deadline - (name, None)
+    # for every mail that didn't arrive
+    def as_completed(self):
+        while True:
+            item = self.arrived.get()
+            if item is _DONE:
+                break
+            yield item
+        with self.lock:
+            self._raise_error()
+            missing = list(self.pending)
+        for name in missing:
+            yield name, None
+
+    # waits until all mails for the rule arrived (or the deadline is reached), returns the values found
+    def values(self, name):
+        with self.changed:
+            self.changed.wait_for(lambda: name not in self.pending or self.done)
+            self._raise_error()
+            return list(self.found[name])
+
+    # waits until the first mail for the rule arrived (or the deadline is reached), returns its value or None
+    def value(self, name):
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.found[name]) > 0 or self.done)
+            self._raise_error()
+            return self.found[name][0] if len(self.found[name]) > 0 else None
+
+    def _raise_error(self):
+        if self.error is not None and not self.cancelled:
+            raise self.error
+
+    # stops waiting (values found so far are kept)
+    def cancel(self):
+        self.cancelled = True
+        self.thread.join()
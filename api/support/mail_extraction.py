@@ -0,0 +1,76 @@
+# the file contains everything needed to extract values (links, tokens, codes) from mails received:
+# 1) ExtractionRule - describes one value to look for: from which sender and with which subject the mail should be,
+# and which pattern (compiled only once) and group of this pattern contains the value
+# 2) MailExtractor - applies all rules to a mail at once (by one pass over the content of the mail)
+# 3) default_extraction_rules() - the table of rules for all mails sent by the J.* project
+
+import os
+import re
+from collections import namedtuple
+from datetime import datetime
+
+ExtractionRule = namedtuple("ExtractionRule", ["name", "sender", "subject", "pattern", "group"])
+
+# names of values extracted from mails
+CONFIRMATION_LINK_FOR_REGISTRATION = "confirmation_link_for_registration"
+CONFIRMATION_CODE_FOR_DELETE_USER = "confirmation_code_for_delete_user"
+TOKEN_FOR_PASSWORD_RESET = "token_for_password_reset"
+
+CONFIRMATION_LINK_PATTERN = re.compile(r'Please confirm your e-mail\s*</h3>\s*<a href="([^"]+)">')
+DELETE_USER_CODE_PATTERN = re.compile(r"Your code: <b>([^<]+)</b>")
+PASSWORD_RESET_TOKEN_PATTERN = re.compile(
+    r'Use the button below to reset it.\s*</h3>\s*<a href="[^"]*\?reset_token=([^"]+)">')
+
+
+# returns the table of rules for all mails sent by the J.* project
+# (sender and subject of the welcome mail are loaded from the .env file)
+def default_extraction_rules():
+    sender_email = os.environ.get("SENDER_EMAIL")
+    return [
+        ExtractionRule(CONFIRMATION_LINK_FOR_REGISTRATION, sender_email, os.environ.get("WELCOME_EMAIL_SUBJECT"),
+                       CONFIRMATION_LINK_PATTERN, 1),
+        ExtractionRule(CONFIRMATION_CODE_FOR_DELETE_USER, sender_email, "Account delete process",
+                       DELETE_USER_CODE_PATTERN, 1),
+        ExtractionRule(TOKEN_FOR_PASSWORD_RESET, sender_email, "Password recovery process",
+                       PASSWORD_RESET_TOKEN_PATTERN, 1),
+    ]
+
+
+class MailExtractor:
+
+    def __init__(self, rules):
+        self.rules_by_sender_and_subject = {}  # (sender, subject) -> list of rules for such mails
+        for rule in rules:
+            self.rules_by_sender_and_subject.setdefault((rule.sender, rule.subject), []).append(rule)
+        self.combined_patterns = {}  # (sender, subject) -> (one pattern for all rules, groups of every rule)
+
+    # returns one pattern that matches every pattern of the rules (as alternatives),
+    # and for every rule - number of the group that wraps its pattern and number of the group that contains the value
+    def _combined_pattern(self, key):
+        if key not in self.combined_patterns:
+            alternatives = []
+            groups_of_rules = []
+            groups_before = 0
+            for rule in self.rules_by_sender_and_subject[key]:
+                alternatives.append(f"({rule.pattern.pattern})")
+                groups_of_rules.append((rule, groups_before + 1, groups_before + 1 + rule.group))
+                groups_before += 1 + rule.pattern.groups
+            self.combined_patterns[key] = (re.compile("|".join(alternatives)), groups_of_rules)
+        return self.combined_patterns[key]
+
+    # returns date-time of receiving the mail and a dict with all values found in it: {name of rule: value}
+    # (if the same rule matches several times, the first value is taken)
+    def extract(self, mail):
+        key = (mail.get("from"), mail.get("subject"))
+        values_found = {}
+        if key in self.rules_by_sender_and_subject:
+            combined_pattern, groups_of_rules = self._combined_pattern(key)
+            for match in combined_pattern.finditer(mail.get("htmlBody") or ""):
+                for rule, rule_group, value_group in groups_of_rules:
+                    if match.group(rule_group) is not None:
+                        values_found.setdefault(rule.name, match.group(value_group))
+                        break
+                if len(values_found) == len(groups_of_rules):
+                    break
+        date_parsed = datetime.fromisoformat(mail.get("date")) if values_found else None
+        return date_parsed, values_found
@@ -0,0 +1,63 @@
+# this class used to wait for a mail to be received in the temporary email
+# (instead of a fixed time gap before checking the email):
+# - polls the email with adaptive backoff (short gaps first, then longer ones) until the deadline is reached
+# - returns as soon as the mail needed is detected
+# - can be woken up earlier by a mailbox backend that notifies about new mails received
+# - saves latency observed (time passed from the start of waiting till the mail detected)
+
+# settings can be changed in the .env file:
+# MAIL_WAIT_TIMEOUT - max time (in seconds) to wait for a mail, INCREASE IF IT'S NOT ENOUGH
+# MAIL_POLL_INITIAL_INTERVAL - time gap (in seconds) before the second check of the email
+# MAIL_POLL_MAX_INTERVAL - max time gap (in seconds) between two checks of the email
+# MAIL_POLL_BACKOFF_FACTOR - how many times the time gap grows after each unsuccessful check
+
+import os
+import time
+
+
+class MailWaiter:
+
+    def __init__(self, timeout=None, initial_interval=None, max_interval=None, backoff_factor=None):
+        self.timeout = timeout if timeout is not None \
+            else float(os.environ.get("MAIL_WAIT_TIMEOUT", 20))
+        self.initial_interval = initial_interval if initial_interval is not None \
+            else float(os.environ.get("MAIL_POLL_INITIAL_INTERVAL", 0.5))
+        self.max_interval = max_interval if max_interval is not None \
+            else float(os.environ.get("MAIL_POLL_MAX_INTERVAL", 5))
+        self.backoff_factor = backoff_factor if backoff_factor is not None \
+            else float(os.environ.get("MAIL_POLL_BACKOFF_FACTOR", 1.5))
+        self.last_latency = None  # latency (in seconds) of the last successful waiting, None if nothing was found
+        self.latencies = []  # latencies of all successful waitings done by this instance
+
+    # runs "check" (a function without parameters that returns the value looked for - or None if nothing found yet)
+    # again and again until it returns some value or the deadline is reached
+    # "wait_for_notification" is an optional function that accepts time (in seconds) and blocks no longer than that,
+    # but returns earlier if a new mail was received (used instead of time.sleep() if the mailbox can notify)
+    # returns the value found by "check" - or None if nothing was found before the deadline
+    def wait_for(self, check, wait_for_notification=None):
+        started_at = time.monotonic()
+        deadline = started_at + self.timeout
+        interval = self.initial_interval
+
+        while True:
+            result = check()
+            now = time.monotonic()
+
+            if result is not None:
+                self.last_latency = now - started_at
+                self.latencies.append(self.last_latency)
+                print(f"Mail detected in {self.last_latency:.2f} s")
+                return result
+
+            remaining = deadline - now
+            if remaining <= 0:
+                self.last_latency = None
+                print(f"No mail needed detected in {self.timeout} s")
+                return None
+
+            pause = min(interval, remaining)
+            if wait_for_notification is not None:
+                wait_for_notification(pause)
+            else:
+                time.sleep(pause)
+            interval = min(interval * self.backoff_factor, self.max_interval)
@@ -0,0 +1,317 @@
+# the file contains mailbox backends used by EmailAndPasswordGenerator-class to access temporary emails:
+# 1) MailboxBackend - a basic class that describes methods every backend should have
+# 2) OneSecMailBackend - emails created by utilizing this service: https://www.1secmail.com/api/
+# 3) LocalMailboxBackend - emails stored in memory of the current process; mails are delivered into them
+# by a local SMTP server (LocalSmtpServer), so the system under test should be pointed at this server
+# (its SMTP host and port); the same emails are also shared with other processes through a local HTTP server
+# (LocalMailboxHttpServer) that works the same way as the 1secmail API does: servers are started only by
+# the first process (e.g. the main process of pytest-xdist), processes started by it (e.g. xdist workers)
+# read mails through its HTTP server, so only one process listens on the SMTP port
+
+# backend used in tests is chosen in the .env file:
+# MAILBOX_BACKEND - "1secmail" (by default) or "local"
+# ONESECMAIL_API_URL - link to the 1secmail API (can be pointed at LocalMailboxHttpServer of another process)
+# LOCAL_SMTP_HOST, LOCAL_SMTP_PORT - where the local SMTP server listens (127.0.0.1 and 2525 by default)
+# LOCAL_MAILBOX_HTTP_PORT - port of the local HTTP server (a free port by default)
+# (LOCAL_MAILBOX_SHARED_URL - the link to the local HTTP server, set by the process that started it,
+# don't set it in the .env file)
+# LOCAL_MAIL_DOMAIN - domain used to create emails in the local backend ("mail.local" by default)
+
+import email
+import email.policy
+import json
+import os
+import socketserver
+import threading
+import time
+from datetime import datetime
+from email.utils import parseaddr
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from api.api_library.http_session import create_session
+from api.api_library.transport import get_default_transport
+
+
+class MailboxBackend:
+
+    # list of domains that can be used to create an email
+    domains = []
+    # link checked by the health probe before tests start (None - the backend isn't a remote service)
+    probe_url = None
+
+    # creates the email (or just checks it can be used)
+    def create_mailbox(self, email_address):
+        raise NotImplementedError
+
+    # returns a list of short descriptions of all mails in the email,
+    # each one is a dict with keys: "id", "from", "subject", "date"
+    def list_messages(self, email_address):
+        raise NotImplementedError
+
+    # returns one mail as a dict with keys: "id", "from", "subject", "date", "htmlBody"
+    def read_message(self, email_address, message_id):
+        raise NotImplementedError
+
+    # deletes the email with all mails inside
+    def delete_mailbox(self, email_address):
+        raise NotImplementedError
+
+    # blocks no longer than "timeout" seconds, but returns earlier if a new mail was received in the email
+    # (backends that can't notify about new mails just wait the whole time)
+    def wait_for_new_mail(self, email_address, timeout):
+        time.sleep(timeout)
+
+
+class OneSecMailBackend(MailboxBackend):
+
+    domains = [
+        "1secmail.com",
+        "1secmail.org",
+        "1secmail.net"
+    ]
+
+    # "api" - link to the API (ONESECMAIL_API_URL by default)
+    def __init__(self, api=None):
+        self.api = api or os.environ.get("ONESECMAIL_API_URL", "https://www.1secmail.com/api/v1/")
+        self.probe_url = f"{self.api}?action=getDomainList"
+        self.session = create_session()  # connections to the service are kept alive and reused
+        self.transport = get_default_transport()  # sends API-calls (with timeouts and retries)
+
+    def create_mailbox(self, email_address):
+        login, domain = email_address.split('@')
+        # sending request to log into the email generated - just to check it works
+        log_in_response = self.transport.request(
+            self.session, "GET", f"{self.api}?login={login}&domain={domain}")
+        assert log_in_response.status_code == 200, "Unknown error. Unable to log into the email generated. Try again"
+
+    def list_messages(self, email_address):
+        login, domain = email_address.split('@')
+        return self.transport.request(
+            self.session, "GET", f"{self.api}?action=getMessages&login={login}&domain={domain}").json()
+
+    def read_message(self, email_address, message_id):
+        login, domain = email_address.split('@')
+        return self.transport.request(
+            self.session, "GET", f"{self.api}?action=readMessage&login={login}&domain={domain}&id={message_id}").json()
+
+    def delete_mailbox(self, email_address):
+        login, domain = email_address.split('@')
+        # the "mailbox" page is placed next to the API itself (".../api/v1/" -> ".../mailbox")
+        url = self.api.split("/api/")[0] + "/mailbox"
+        request_data = {
+            "action": "deleteMailBox",
+            "login": login,
+            "domain": domain
+        }
+        response = self.transport.request(self.session, "POST", url, data=request_data)
+        assert response.status_code == 200, "Unknown error. Unable to delete the email. Try again"
+
+
+class LocalMailboxBackend(MailboxBackend):
+
+    def __init__(self):
+        self.domains = [os.environ.get("LOCAL_MAIL_DOMAIN", "mail.local")]
+        self.mailboxes = {}  # email -> list of mails received (each one is a dict like in read_message())
+        self.last_message_id = 0
+        self.messages_listed = {}  # email -> number of mails returned by the last list_messages() call
+        self.new_mail_received = threading.Condition()
+
+    # saves a mail into the email of recipient and wakes up everyone waiting for new mails
+    def deliver(self, sender, recipient, subject, html_body):
+        with self.new_mail_received:
+            self.last_message_id += 1
+            self.mailboxes.setdefault(recipient.lower(), []).append({
+                "id": self.last_message_id,
+                "from": sender,
+                "subject": subject,
+                "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "htmlBody": html_body
+            })
+            self.new_mail_received.notify_all()
+
+    def create_mailbox(self, email_address):
+        with self.new_mail_received:
+            self.mailboxes.setdefault(email_address.lower(), [])
+
+    def list_messages(self, email_address):
+        with self.new_mail_received:
+            mails = self.mailboxes.get(email_address.lower(), [])
+            self.messages_listed[email_address.lower()] = len(mails)
+            return [{key: mail[key] for key in ("id", "from", "subject", "date")} for mail in mails]
+
+    def read_message(self, email_address, message_id):
+        with self.new_mail_received:
+            for mail in self.mailboxes.get(email_address.lower(), []):
+                if str(mail["id"]) == str(message_id):
+                    return dict(mail)
+        return None
+
+    def delete_mailbox(self, email_address):
+        with self.new_mail_received:
+            self.mailboxes.pop(email_address.lower(), None)
+            self.messages_listed.pop(email_address.lower(), None)
+
+    # returns as soon as the email has more mails than were returned by the last list_messages() call
+    def wait_for_new_mail(self, email_address, timeout):
+        with self.new_mail_received:
+            self.new_mail_received.wait_for(
+                lambda: len(self.mailboxes.get(email_address.lower(), []))
+                > self.messages_listed.get(email_address.lower(), 0),
+                timeout=timeout)
+
+
+# handles one SMTP connection: accepts every mail and delivers it into the local backend
+# (only commands needed to receive a mail are supported)
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        backend = self.server.backend
+        sender = None
+        recipients = []
+        self.reply("220 local SMTP sink ready")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 local SMTP sink")
+            elif verb == "MAIL":
+                sender = parseaddr(command.split(":", 1)[1])[1]
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(parseaddr(command.split(":", 1)[1])[1])
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data_lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line.rstrip(b"\r\n") == b".":
+                        break
+                    if data_line.startswith(b".."):  # dot-stuffing
+                        data_line = data_line[1:]
+                    data_lines.append(data_line)
+                message = email.message_from_bytes(b"".join(data_lines), policy=email.policy.default)
+                body = message.get_body(preferencelist=("html", "plain"))
+                html_body = body.get_content() if body is not None else ""
+                mail_sender = parseaddr(message.get("From", ""))[1] or sender
+                for recipient in recipients:
+                    backend.deliver(mail_sender, recipient, message.get("Subject", ""), html_body)
+                self.reply("250 OK")
+            elif verb == "RSET":
+                sender = None
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class LocalSmtpServer(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, backend, host, port):
+        super().__init__((host, port), _SmtpSinkHandler)
+        self.backend = backend
+
+    # starts the server in a background thread
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# works the same way as the 1secmail API, so OneSecMailBackend of other processes can use the local emails
+class _MailboxHttpHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, body, status=200):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        backend = self.server.backend
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        email_address = f"{query.get('login')}@{query.get('domain')}"
+        action = query.get("action")
+
+        if action == "getMessages":
+            self.send_json(backend.list_messages(email_address))
+        elif action == "readMessage":
+            self.send_json(backend.read_message(email_address, query.get("id")))
+        elif action == "getDomainList":
+            self.send_json(backend.domains)
+        else:
+            backend.create_mailbox(email_address)
+            self.send_json([])
+
+    def do_POST(self):
+        backend = self.server.backend
+        length = int(self.headers.get("Content-Length", 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        if form.get("action") == "deleteMailBox":
+            backend.delete_mailbox(f"{form.get('login')}@{form.get('domain')}")
+        self.send_json({})
+
+
+class LocalMailboxHttpServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, backend, host, port):
+        super().__init__((host, port), _MailboxHttpHandler)
+        self.backend = backend
+        self.api = f"http://{host}:{self.server_address[1]}/api/v1/"  # the same path as the 1secmail API has
+
+    # starts the server in a background thread
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+_mailbox_backend = None
+_mailbox_backend_lock = threading.Lock()
+
+
+# returns the backend chosen in the .env file (one instance for the whole process,
+# so local servers are started only once - and only by the first process, see the top of the file)
+def get_mailbox_backend():
+    global _mailbox_backend
+    with _mailbox_backend_lock:
+        if _mailbox_backend is None:
+            if os.environ.get("MAILBOX_BACKEND", "1secmail") == "local":
+                shared_api = os.environ.get("LOCAL_MAILBOX_SHARED_URL")
+                if shared_api:  # servers are already started by the process that started this one
+                    _mailbox_backend = OneSecMailBackend(shared_api)
+                    _mailbox_backend.domains = [os.environ.get("LOCAL_MAIL_DOMAIN", "mail.local")]
+                    return _mailbox_backend
+                backend = LocalMailboxBackend()
+                host = os.environ.get("LOCAL_SMTP_HOST", "127.0.0.1")
+                backend.smtp_server = LocalSmtpServer(backend, host, int(os.environ.get("LOCAL_SMTP_PORT", 2525))).start()
+                backend.http_server = LocalMailboxHttpServer(
+                    backend, host, int(os.environ.get("LOCAL_MAILBOX_HTTP_PORT", 0))).start()
+                os.environ["LOCAL_MAILBOX_SHARED_URL"] = backend.http_server.api  # inherited by processes started
+                _mailbox_backend = backend
+            else:
+                _mailbox_backend = OneSecMailBackend()
+        return _mailbox_backend
@@ -0,0 +1,45 @@
+# this class used to keep all mails already read from one email (used by EmailAndPasswordGenerator-class):
+# - on every refresh only the list of mails is requested, and only mails that weren't read before are read
+# - mails are kept by their ID and also grouped by (sender, subject) - so mails needed can be found without
+# analyzing every mail in the email
+# - values (links, tokens, codes) are extracted from every mail only once, right after it was read
+
+class MessageIndex:
+
+    def __init__(self, mailbox, email_address, extractor=None):
+        self.mailbox = mailbox  # mailbox backend used to access the email
+        self.email = email_address
+        self.extractor = extractor  # MailExtractor used to extract values from mails
+        self.messages = {}  # ID of mail -> mail itself (a dict with keys: "id", "from", "subject", "date", "htmlBody")
+        self.messages_by_sender_and_subject = {}  # (sender, subject) -> list of mails
+        self.values_found = {}  # name of extraction rule -> list of values found in mails: (date-time, value)
+
+    # checks the email for new mails and reads only those that weren't read before
+    # returns the number of new mails found
+    def refresh(self):
+        new_mails_number = 0
+        for mail in self.mailbox.list_messages(self.email):
+            mail_id = mail.get("id")
+            if mail_id in self.messages:
+                continue
+
+            mail_read = self.mailbox.read_message(self.email, mail_id)
+            if mail_read is None:  # mail was deleted in between
+                continue
+            self.messages[mail_id] = mail_read
+            key = (mail_read.get("from"), mail_read.get("subject"))
+            self.messages_by_sender_and_subject.setdefault(key, []).append(mail_read)
+            if self.extractor is not None:
+                date_parsed, values = self.extractor.extract(mail_read)
+                for name, value in values.items():
+                    self.values_found.setdefault(name, []).append((date_parsed, value))
+            new_mails_number += 1
+        return new_mails_number
+
+    # returns a list of all mails (already read) from specific sender and with specific subject
+    def find(self, sender, subject):
+        return self.messages_by_sender_and_subject.get((sender, subject), [])
+
+    # returns a list of all values (already extracted) for specific extraction rule: (date-time, value)
+    def find_values(self, name):
+        return self.values_found.get(name, [])
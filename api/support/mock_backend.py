@@ -0,0 +1,413 @@
+# this class used as a local stand-in for the J.* backend (when the real one isn't available, or for load tests):
+# - an HTTP server started in a background thread of the current process (MockBackendServer)
+# - keeps users, tokens and confirmation codes in memory (MockBackend)
+# - serves every endpoint used by tests (registration, username check, email confirmation, log in/out,
+# deleting user, changing and resetting password, list of chats) with the same statuses and bodies as the real
+# backend, including bodies of validation errors (422)
+# - chats of users are created only by add_chat() (the mock has no endpoints to create them)
+# - sends mails (with confirmation links, codes, reset tokens) into a local mailbox backend
+# (LocalMailboxBackend from api/support/mailbox_backends.py), the same way as the real backend does
+#
+# to run tests against it - set MOCK_BACKEND=true in the .env file (see api/conftest.py),
+# to start it from code (and point all clients of api_library and the mailbox backend to it):
+#     server = start_mock_backend()
+
+import json
+import os
+import re
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from api.support.mailbox_backends import LocalMailboxBackend, get_mailbox_backend
+
+
+PASSWORD_LENGTH_MESSAGE = \
+    "Password must contain between 8 and 32 symbols (numbers and/or letters and/or special characters)"
+USERNAME_MESSAGE = "Username must contain from 3 to 32 symbols (numbers, letters or '.' are allowed)"
+USERNAME_PATTERN = re.compile(r"[A-Za-z0-9.]{3,32}")
+EMAIL_PATTERN = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@([A-Za-z0-9]([A-Za-z0-9-]*[A-Za-z0-9])?\.)+[A-Za-z]{2,}")
+
+
+# error raised by handlers of endpoints, turned into a response with the status and body given
+class MockResponseError(Exception):
+
+    def __init__(self, status, body):
+        super().__init__(status, body)
+        self.status = status
+        self.body = body
+
+
+def error(status, code, message):
+    return MockResponseError(status, {"code": code, "message": message})
+
+
+# the next functions check a value of one field of the request body,
+# and return (message, type) of the validation error - or None if the value is valid
+def password_error(value):
+    if not isinstance(value, str) or not 8 <= len(value) <= 32:
+        return PASSWORD_LENGTH_MESSAGE, "value_error"
+    return None
+
+
+def username_error(value):
+    if value == "":
+        return "Name cannot be empty", "value_error"
+    if not isinstance(value, str) or USERNAME_PATTERN.fullmatch(value) is None:
+        return USERNAME_MESSAGE, "value_error"
+    return None
+
+
+def email_error(value):
+    if not isinstance(value, str) or EMAIL_PATTERN.fullmatch(value) is None:
+        return "value is not a valid email address", "value_error.email"
+    return None
+
+
+def not_empty_error(value):
+    if value == "":
+        return "Field cannot be empty", "value_error"
+    return None
+
+
+# checks the request body like the backend does (422 with all errors found, in the order of fields)
+# "fields" - list of (name of the field, function that checks its value or None)
+# "empty_is_missing" - empty values are reported as missing (as for fields of forms)
+def validate(body, fields, empty_is_missing=False):
+    if not isinstance(body, dict):
+        raise MockResponseError(422, {"detail": [
+            {"loc": ["body"], "msg": "field required", "type": "value_error.missing"}]})
+
+    errors = []
+    for name, check in fields:
+        value = body.get(name)
+        if value is None or (empty_is_missing and value == ""):
+            errors.append({"loc": ["body", name], "msg": "field required", "type": "value_error.missing"})
+            continue
+        problem = check(value) if check is not None else None
+        if problem is not None:
+            errors.append({"loc": ["body", name], "msg": problem[0], "type": problem[1]})
+    if len(errors) > 0:
+        raise MockResponseError(422, {"detail": errors})
+    return body
+
+
+class MockBackend:
+
+    def __init__(self, mailbox=None, sender_email=None, welcome_email_subject=None):
+        self.mailbox = mailbox  # where mails are sent to (None - mails are not sent)
+        self.sender_email = sender_email or os.environ.get("SENDER_EMAIL") or "no-reply@j-project.local"
+        self.welcome_email_subject = welcome_email_subject or os.environ.get("WELCOME_EMAIL_SUBJECT") \
+            or "Welcome to J.* project"
+        self.base_url = ""  # set by the server when it's started
+        self.users_by_email = {}  # email (in lower case) -> user (a dict)
+        self.users_by_username = {}  # username -> user
+        self.confirmation_tokens = {}  # token to confirm email -> email
+        self.reset_tokens = {}  # token to reset password -> email
+        self.access_tokens = {}  # access token -> email
+        self.last_profile_id = 0
+        self.chats = {}  # email (in lower case) -> list of "chatInfo" of chats of the user (the newest first)
+        self.last_chat_id = 0
+        self.lock = threading.Lock()
+
+        # routing table: (method, pattern of path, handler)
+        self.routes = [
+            ("POST", re.compile(r"/api/registration"), self.registration),
+            ("POST", re.compile(r"/api/registration/username_check"), self.username_check),
+            ("GET", re.compile(r"/api/email/confirm_email/(?P<token>[^/]+)"), self.confirm_email),
+            ("POST", re.compile(r"/api/email/request_email_verify"), self.request_email_verify),
+            ("POST", re.compile(r"/api/login/oauth"), self.log_in),
+            ("POST", re.compile(r"/api/logout"), self.log_out),
+            ("POST", re.compile(r"/api/delete/request_delete"), self.request_delete_user),
+            ("DELETE", re.compile(r"/api/delete/user/(?P<code>[^/]+)"), self.delete_user),
+            ("POST", re.compile(r"/api/password/change_password_in_profile"), self.change_password_in_profile),
+            ("POST", re.compile(r"/api/password/request_password_recovery"), self.request_password_recovery),
+            ("GET", re.compile(r"/api/password/reset_password"), self.confirm_password_recovery),
+            ("POST", re.compile(r"/api/password/reset_password"), self.reset_password),
+            ("GET", re.compile(r"/api/chat_list"), self.chat_list),
+        ]
+
+    # finds the handler for the API-call and returns (status, body of response);
+    # "request" is a dict with keys: "path_params", "query", "json", "form", "headers"
+    def handle(self, method, path, request):
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if route_method == method and match is not None:
+                request["path_params"] = match.groupdict()
+                try:
+                    with self.lock:
+                        return handler(request)
+                except MockResponseError as response_error:
+                    return response_error.status, response_error.body
+        return 404, {"detail": "Not Found"}
+
+    # creates a user account right away (e.g. the one used to log in during load tests)
+    def add_user(self, username, email, password, confirmed=True):
+        with self.lock:
+            return self.create_user(username, email, password, confirmed)
+
+    # creates a chat of the user right away, returns its "chatInfo"
+    def add_chat(self, email, name):
+        with self.lock:
+            self.last_chat_id += 1
+            chat_info = {"id": self.last_chat_id, "name": name}
+            self.chats.setdefault(email.lower(), []).insert(0, chat_info)
+            return chat_info
+
+    def create_user(self, username, email, password, confirmed):
+        self.last_profile_id += 1
+        user = {"username": username, "email": email, "password": password, "confirmed": confirmed,
+                "deleted": False, "profile_id": self.last_profile_id, "delete_code": None}
+        self.users_by_email[email.lower()] = user
+        self.users_by_username[username] = user
+        return user
+
+    # returns the user with such email or username (or None)
+    def find_user(self, email_or_username):
+        return self.users_by_email.get(email_or_username.lower()) or self.users_by_username.get(email_or_username)
+
+    def send_mail(self, email, subject, html_body):
+        if self.mailbox is not None:
+            self.mailbox.deliver(self.sender_email, email, subject, html_body)
+
+    # returns the user authorized by the access token from headers of the API-call
+    def authorized_user(self, request):
+        email = self.access_tokens.get(self.access_token(request))
+        user = self.users_by_email.get(email) if email is not None else None
+        if user is None or user["deleted"]:
+            raise MockResponseError(401, {"detail": "Not authenticated"})
+        return user
+
+    def access_token(self, request):
+        authorization = request["headers"].get("Authorization", "")
+        return authorization[len("Bearer "):] if authorization.startswith("Bearer ") else None
+
+    def registration(self, request):
+        body = validate(request["json"], [("username", username_error), ("email", email_error),
+                                          ("password", password_error)])
+        if body["email"].lower() in self.users_by_email:
+            raise error(400, "already_exist", "User with this email is already exist")
+        if body["username"] in self.users_by_username:
+            raise error(400, "already_exist", "User with this username is already exist")
+
+        self.create_user(body["username"], body["email"], body["password"], confirmed=False)
+        self.send_confirmation_link(body["email"])
+        return 201, {"message": "successful"}
+
+    def send_confirmation_link(self, email):
+        token = secrets.token_urlsafe(24)
+        self.confirmation_tokens[token] = email.lower()
+        link = f"{self.base_url}/api/email/confirm_email/{token}"
+        self.send_mail(email, self.welcome_email_subject,
+                       f'<h3>Please confirm your e-mail</h3>\n<a href="{link}">Confirm</a>')
+
+    def username_check(self, request):
+        body = validate(request["json"], [("username", username_error)])
+        if body["username"] in self.users_by_username:
+            raise error(400, "already_exist", "User with this username is already exist")
+        return 204, None
+
+    def confirm_email(self, request):
+        email = self.confirmation_tokens.pop(request["path_params"]["token"], None)
+        user = self.users_by_email.get(email) if email is not None else None
+        if user is None or user["deleted"]:
+            raise error(400, "bad_request", "Invalid token")
+        user["confirmed"] = True
+        return 200, {"message": "Email has been confirmed"}
+
+    def request_email_verify(self, request):
+        body = validate(request["json"], [("email", email_error)])
+        user = self.users_by_email.get(body["email"].lower())
+        if user is None or user["deleted"]:
+            raise error(404, "not_found_error", "User was not found")
+        if user["confirmed"]:
+            raise error(400, "bad_request", "Email is already confirmed")
+        self.send_confirmation_link(user["email"])
+        return 200, {"message": "Verification message has been sent for your email"}
+
+    def log_in(self, request):
+        form = validate(request["form"], [("username", None), ("password", None)], empty_is_missing=True)
+        user = self.find_user(form["username"])
+        if user is None:
+            raise error(404, "not_found_error", "User was not found")
+        if user["deleted"]:
+            raise error(404, "not_found_error", "User has been banned or deleted")
+        if user["password"] != form["password"]:
+            raise error(400, "auth_error", "Incorrect password")
+        if not user["confirmed"]:
+            raise error(400, "auth_error", "Email is not confirmed")
+
+        access_token = secrets.token_urlsafe(32)
+        self.access_tokens[access_token] = user["email"].lower()
+        return 200, {
+            "access_token": access_token,
+            "token_type": "bearer",
+            "user_profile_id": user["profile_id"],
+            "user_role": "user",
+            "user_status": "active"
+        }
+
+    def log_out(self, request):
+        self.authorized_user(request)
+        self.access_tokens.pop(self.access_token(request), None)
+        return 200, {"message": "You have been logout"}
+
+    def request_delete_user(self, request):
+        user = self.authorized_user(request)
+        user["delete_code"] = secrets.token_hex(16)
+        self.send_mail(user["email"], "Account delete process", f"<h3>Your code: <b>{user['delete_code']}</b></h3>")
+        return 200, {"message": "Message has been sent for your email"}
+
+    def delete_user(self, request):
+        user = self.authorized_user(request)
+        if user["delete_code"] is None or request["path_params"]["code"] != user["delete_code"]:
+            raise error(400, "bad_request", "Wrong code")
+        user["deleted"] = True
+        user["delete_code"] = None
+        return 200, {"message": "Successfully deleted"}
+
+    def change_password_in_profile(self, request):
+        user = self.authorized_user(request)
+        body = validate(request["json"], [("newPassword1", None), ("newPassword2", password_error),
+                                          ("oldPassword", None)])
+        if body["oldPassword"] != user["password"]:
+            raise error(400, "bad_request", "Wrong old password")
+        if body["newPassword1"] != body["newPassword2"]:
+            raise error(400, "bad_request", "Passwords do not match")
+        user["password"] = body["newPassword2"]
+        return 200, {"message": "Your new password has been successfully saved"}
+
+    def request_password_recovery(self, request):
+        body = validate(request["json"], [("recoveryField", not_empty_error)])
+        user = self.find_user(body["recoveryField"])
+        if user is None or user["deleted"]:
+            raise error(404, "not_found_error", "User was not found")
+
+        token = secrets.token_urlsafe(32)
+        self.reset_tokens[token] = user["email"].lower()
+        link = f"{self.base_url}/api/password/reset_password?reset_token={token}"
+        self.send_mail(user["email"], "Password recovery process",
+                       f'<h3>You requested a password reset. Use the button below to reset it.</h3>\n'
+                       f'<a href="{link}">Reset password</a>')
+        return 200, None
+
+    def confirm_password_recovery(self, request):
+        if request["query"].get("reset_token") not in self.reset_tokens:
+            raise error(404, "not_found_error", "User was not found")
+        return 200, b"Password reset"
+
+    def reset_password(self, request):
+        body = validate(request["json"], [("newPassword1", None), ("newPassword2", password_error),
+                                          ("resetToken", None)])
+        email = self.reset_tokens.get(body["resetToken"])
+        user = self.users_by_email.get(email) if email is not None else None
+        if user is None or user["deleted"]:
+            raise error(404, "not_found_error", "User was not found")
+        if body["newPassword1"] != body["newPassword2"]:
+            raise error(400, "bad_request", "Passwords do not match")
+        user["password"] = body["newPassword2"]
+        del self.reset_tokens[body["resetToken"]]
+        return 200, {"message": "Your new password has been successfully saved"}
+
+    def chat_list(self, request):
+        user = self.authorized_user(request)
+        try:
+            limit = int(request["query"].get("limit", 100))
+            offset = int(request["query"].get("offset", 0))
+        except ValueError:
+            raise MockResponseError(422, {"detail": [
+                {"loc": ["query", "limit"], "msg": "value is not a valid integer", "type": "type_error.integer"}]})
+        chats = self.chats.get(user["email"].lower(), [])
+        return 200, [{"chatInfo": chat_info} for chat_info in chats[offset:offset + limit]]
+
+
+class _MockBackendHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"  # connections are kept alive
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024  # headers and body of the response are sent together
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_api_call(self, method):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length) if length > 0 else b""
+        content_type = self.headers.get("Content-Type", "")
+
+        request = {
+            "query": {key: values[0] for key, values in parse_qs(url.query).items()},
+            "json": None,
+            "form": {},
+            "headers": self.headers
+        }
+        if "application/json" in content_type and raw_body:
+            try:
+                request["json"] = json.loads(raw_body)
+            except ValueError:
+                request["json"] = None
+        elif "application/x-www-form-urlencoded" in content_type:
+            request["form"] = {key: values[0] for key, values in
+                               parse_qs(raw_body.decode(), keep_blank_values=True).items()}
+
+        status, body = self.server.backend.handle(method, url.path, request)
+        if status == 204:
+            content = b""
+        elif isinstance(body, bytes):
+            content = body
+        else:
+            content = json.dumps(body).encode()  # None is sent as "null"
+        self.send_response(status)
+        if status != 204:
+            self.send_header("Content-Type", "text/plain" if isinstance(body, bytes) else "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.handle_api_call("GET")
+
+    def do_POST(self):
+        self.handle_api_call("POST")
+
+    def do_DELETE(self):
+        self.handle_api_call("DELETE")
+
+
+class MockBackendServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, backend, host="127.0.0.1", port=0):
+        super().__init__((host, port), _MockBackendHandler)
+        self.backend = backend
+        self.url = f"http://{host}:{self.server_address[1]}"
+        backend.base_url = self.url
+
+    # starts the server in a background thread
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# starts the mock backend with the local mailbox backend (mails are delivered into it),
+# and points BASIC_URL (and MAILBOX_BACKEND) of the current process to them
+def start_mock_backend(host="127.0.0.1", port=0):
+    os.environ["MAILBOX_BACKEND"] = "local"
+    # every process with a mock has its own mailbox (mails are delivered by the mock of the process)
+    os.environ.pop("LOCAL_MAILBOX_SHARED_URL", None)
+    os.environ.setdefault("LOCAL_SMTP_PORT", "0")  # a free port (mails are delivered directly, not by SMTP)
+    os.environ.setdefault("MAIL_WAIT_TIMEOUT", "1")  # mails are delivered before the response is sent
+    os.environ.setdefault("SENDER_EMAIL", "no-reply@j-project.local")
+    os.environ.setdefault("WELCOME_EMAIL_SUBJECT", "Welcome to J.* project")
+    mailbox = get_mailbox_backend()
+    assert isinstance(mailbox, LocalMailboxBackend), \
+        "The mock backend needs the local mailbox backend, start it before any email is generated"
+    server = MockBackendServer(MockBackend(mailbox=mailbox), host, port).start()
+    os.environ["BASIC_URL"] = server.url
+    print(f"Mock J.* backend started: {server.url}")
+    return server
@@ -0,0 +1,166 @@
+# this class used to guard user accounts shared by several tests that only read them (see
+# shared_user_account_fixture in api/conftest.py) - e.g. tests that log in with a wrong password
+# or register with the email already used don't need an account of their own:
+# - sessions handed out to tests by fixtures of api/conftest.py are guarded (see guard_session()): every API-call
+# sent in such session that changes a user account (log out, request delete and delete the user, change password,
+# request password recovery) is checked before it's sent - if it's done for a read-only account, the test fails
+# right away
+# - the account is recognized by the access token of the session (every token received by logging in
+# as a read-only account in a guarded session, or kept for it by the token manager, is remembered) or by
+# the email/username given
+# - clients of api_library know nothing about it, so sessions created by helpers (the pool of user accounts,
+# the cleanup queue, the load runner, benchmarks) aren't guarded
+# (API-calls sent over HTTP/2, see HTTP2 in api/api_library/transport.py, and responses replayed from a cassette
+# aren't guarded either - they don't go through the adapters of the session)
+
+import json
+import threading
+from urllib.parse import parse_qsl, urlparse
+
+from requests.adapters import BaseAdapter
+
+from api.api_library.token_manager import get_token_manager
+
+# API-calls that change the user account authorized in the session: (method, path or its beginning) -> action
+ACTIONS_OF_SESSION = {
+    ("POST", "/api/logout"): "log out from",
+    ("POST", "/api/delete/request_delete"): "request deletion of",
+    ("DELETE", "/api/delete/user/"): "delete",
+    ("POST", "/api/password/change_password_in_profile"): "change password of",
+}
+# API-calls that change the user account given in the request body: (method, path) -> (field, action)
+ACTIONS_OF_PRINCIPAL = {
+    ("POST", "/api/password/request_password_recovery"): ("recoveryField", "start password recovery of"),
+}
+LOG_IN_PATH = "/api/login/oauth"
+
+
+class ReadOnlyAccounts:
+
+    def __init__(self):
+        self.accounts = set()  # emails and usernames (in lower case) of read-only accounts
+        self.tokens = {}  # access token -> email or username used to get it
+        self.lock = threading.Lock()
+
+    # makes the user account read-only (both its email and username are given);
+    # tokens the token manager already keeps for the account are remembered too
+    def protect(self, *principals):
+        with self.lock:
+            self.accounts.update(principal.lower() for principal in principals)
+        for principal in principals:
+            token = get_token_manager().token_of(principal)
+            if token is not None:
+                self.remember_token(principal, token.value)
+
+    # makes the user account writable again (e.g. when the tests sharing it are finished)
+    def release(self, *principals):
+        with self.lock:
+            for principal in principals:
+                self.accounts.discard(principal.lower())
+            self.tokens = {token: principal for token, principal in self.tokens.items()
+                           if principal in self.accounts}
+
+    def is_read_only(self, principal):
+        if not isinstance(principal, str):
+            return False
+        with self.lock:
+            return principal.lower() in self.accounts
+
+    # remembers the access token received by logging in as a read-only account
+    def remember_token(self, principal, token):
+        if token is None or not self.is_read_only(principal):
+            return
+        with self.lock:
+            self.tokens[token] = principal.lower()
+
+    # fails the test if the "Authorization" header belongs to a read-only account
+    # ("action" - what the test tries to do with the account, for the message: "log out from", "delete", ...)
+    def check_authorization(self, authorization, action):
+        authorization = authorization or ""
+        if not authorization.startswith("Bearer "):
+            return
+        with self.lock:
+            principal = self.tokens.get(authorization[len("Bearer "):])
+        assert principal is None, \
+            f"The test tries to {action} the read-only user account '{principal}' (shared by several tests) - " \
+            f"use new_user_logged_in_session_fixture for tests that change the user account"
+
+    # fails the test if the email or username belongs to a read-only account
+    def check_principal(self, principal, action):
+        assert not self.is_read_only(principal), \
+            f"The test tries to {action} the read-only user account '{principal}' (shared by several tests) - " \
+            f"use new_user_logged_in_session_fixture for tests that change the user account"
+
+    # checks the API-call (a prepared request) before it's sent
+    def check_request(self, request):
+        method, path = request.method.upper(), urlparse(request.url).path
+        for (action_method, action_path), action in ACTIONS_OF_SESSION.items():
+            if method == action_method and path.startswith(action_path):
+                self.check_authorization(request.headers.get("Authorization"), action)
+        if (method, path) in ACTIONS_OF_PRINCIPAL:
+            field, action = ACTIONS_OF_PRINCIPAL[(method, path)]
+            body = _body_of(request)
+            if isinstance(body, dict):
+                self.check_principal(body.get(field), action)
+
+    # remembers the token if the API-call logged in as a read-only account
+    def check_response(self, request, response):
+        if request.method.upper() != "POST" or urlparse(request.url).path != LOG_IN_PATH \
+                or response.status_code != 200:
+            return
+        body = _body_of(request)
+        principal = body.get("username") if isinstance(body, dict) else None
+        if self.is_read_only(principal):
+            self.remember_token(principal, response.json().get("access_token"))
+
+
+# returns the body of the prepared request as a dict (JSON or x-www-form-urlencoded), None if it can't be read
+def _body_of(request):
+    body = request.body
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode(errors="replace")
+    try:
+        return json.loads(body)
+    except ValueError:
+        return dict(parse_qsl(body, keep_blank_values=True))
+
+
+# checks every API-call of the session it's mounted on, and sends it by the adapter it replaces
+# (so the session still uses the pool of connections shared by all sessions)
+class ReadOnlyGuardAdapter(BaseAdapter):
+
+    def __init__(self, adapter, read_only_accounts):
+        super().__init__()
+        self.adapter = adapter
+        self.read_only_accounts = read_only_accounts
+
+    def send(self, request, **kwargs):
+        self.read_only_accounts.check_request(request)
+        response = self.adapter.send(request, **kwargs)
+        self.read_only_accounts.check_response(request, response)
+        return response
+
+    def close(self):
+        pass  # the adapter replaced is shared by other sessions
+
+
+# guards the session (created by create_session()) handed out to a test, returns the same session
+def guard_session(session):
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, ReadOnlyGuardAdapter(session.get_adapter(prefix), get_read_only_accounts()))
+    return session
+
+
+_read_only_accounts = None
+_read_only_accounts_lock = threading.Lock()
+
+
+# returns the guard of read-only accounts shared by all fixtures
+def get_read_only_accounts():
+    global _read_only_accounts
+    with _read_only_accounts_lock:
+        if _read_only_accounts is None:
+            _read_only_accounts = ReadOnlyAccounts()
+        return _read_only_accounts
@@ -3,16 +3,21 @@
 # - check email and return token (extracted from confirmation) needed to complete user registration (in GET /api/email/confirm_email/{token})
 # - check email and return confirmation code needed to complete deleting user (in DELETE /api/delete/user/{code})
 # - delete temporary email generated before
+# - wait for several mails at once in background, while the test keeps sending API-calls (see expect_mails())
 
-# (email is created and used by utilizing this service: https://www.1secmail.com/api/)
+# (email is created and used by utilizing a mailbox backend chosen in the .env file - by default this service:
+# https://www.1secmail.com/api/, see api/support/mailbox_backends.py for more details)
 
-import requests
 import random
 import string
-import time
-import re
-from datetime import datetime
-from api.api_library.user_account import UserAccount
+import threading
+from api.support.mail_waiter import MailWaiter
+from api.support.mail_expectation import MailExpectation
+from api.support.mailbox_backends import get_mailbox_backend
+from api.support.message_index import MessageIndex
+from api.support.username_allocator import get_username_allocator
+from api.support.mail_extraction import MailExtractor, default_extraction_rules, \
+    CONFIRMATION_LINK_FOR_REGISTRATION, CONFIRMATION_CODE_FOR_DELETE_USER, TOKEN_FOR_PASSWORD_RESET
 import allure
 import os
 
@@ -23,9 +28,12 @@ class EmailAndPasswordGenerator:
         self.username = None
         self.email = None
         self.password = None
-        self.api = "https://www.1secmail.com/api/v1/"  # link to the service that generates temporary email
-        self.sender_email = os.environ.get("SENDER_EMAIL")
-        self.welcome_email_subject = os.environ.get("WELCOME_EMAIL_SUBJECT")
+        self.mailbox = get_mailbox_backend()  # the service that generates temporary email
+        self.mail_waiter = MailWaiter()  # waits for mails instead of a fixed time gap
+        self.values_returned = set()  # tokens/codes already returned - so the next call waits for a new mail
+        self.message_index = None  # all mails already read from the email (see _messages())
+        self.mail_extractor = MailExtractor(default_extraction_rules())  # extracts links, tokens, codes from mails
+        self.lock = threading.RLock()  # the email can be checked by mails expected in background at the same time
 
     # method to generate email and password (that used in the endpoint POST /api/registration to create user account)
     # returns two strings: 1) email 2) password - if it was successfully generated;
@@ -34,24 +42,12 @@ class EmailAndPasswordGenerator:
     def generate_username_and_email_and_password(self):
 
         #  list of domains used to create an email
-        domain_list = [
-            "1secmail.com",
-            "1secmail.org",
-            "1secmail.net"
-        ]
+        domain_list = self.mailbox.domains
         random_domain_from_list = random.choice(domain_list)
 
 
-        while self.username == None:
-            #  then we create a username (25-symbols long)
-            username_symbols = string.ascii_lowercase
-            username_generated = ''.join(random.choice(username_symbols) for i in range(25))
-            not_authorized_session = requests.Session()
-            user_account_api = UserAccount(not_authorized_session)
-            check_username_response = user_account_api.username_check(username_generated)
-            status = check_username_response[1]
-            if status == 204:
-                self.username = username_generated
+        #  then we get a username (25-symbols long) that isn't used yet (see api/support/username_allocator.py)
+        self.username = get_username_allocator().allocate(25)
 
         # and a username for email from 10 random symbols (lower case and digits)
         email_symbols = string.ascii_lowercase + string.digits
@@ -65,68 +61,19 @@ class EmailAndPasswordGenerator:
         print(
             f"Username generated for test user account: {self.username}\nEmail generated for test user account: {self.email}\nPassword generated for test user account: {self.password}")
 
-        # sending request to log into the email generated - just to check it works
-        log_in_response = requests.get(f"{self.api}?login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}")
-        assert log_in_response.status_code == 200, "Unknown error. Unable to log into the email generated. Try again"
+        # log into the email generated - just to check it works
+        self.mailbox.create_mailbox(self.email)
 
         return self.username, self.email, self.password
 
     # returns token needed to complete user registration (used in the endpoint GET /api/email/confirm_email/{token})
-    # returns one string with the value for "token" - if mail with confirmation link was found in the user email
-    # (if multiple mails with confirmation link were received, then it returns the recent one)
-    # or returns None as a value for token - if no mail with confirmation link was received
+    # returns one string with the value for "token" - as soon as a mail with confirmation link is found in the user email
+    # (if multiple mails with confirmation link were received, then it returns the recent one
+    # that wasn't returned before by this instance)
+    # or returns None as a value for token - if no mail with confirmation link was received till the deadline
     @allure.step('Parce emails received and get token from confirmation link (needed to complete registration)')
     def get_token_from_confirmation_link_for_registration(self):
-        time.sleep(15)  # time gap to wait for new mails to be received, INCREASE IF IT'S NOT ENOUGH
-        link_found = None
-
-        # check the email for new mails
-        get_mail_response = requests.get(
-            f"{self.api}?action=getMessages&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}").json()
-        mails_number = len(get_mail_response)
-
-        if mails_number == 0:
-            print("No mails in the email detected")
-
-        else:
-            # print(f"Number of mails detected in the email: {mails_number}")
-            # start to collect IDs of all mails found in the email
-            list_of_mails_ids = []
-            for mail in get_mail_response:
-                for key, value in mail.items():
-                    if key == "id":  # the "id" key contains value - ID of a specific email
-                        list_of_mails_ids.append(value)  # add ID of a specific mail into a list of all mails from email
-            # print(f"The number of mails detected: {mails_number}")
-
-            # finally, analyze every mail in the email - to find those that have a confirmation link inside
-            all_links_with_dates_detected = []  # here we will save every confirmation link found + data of receiving it
-
-            for mail_id in list_of_mails_ids:
-                get_mail_response = requests.get(
-                    f"{self.api}?action=readMessage&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}&id={mail_id}").json()
-                sender = get_mail_response.get("from")
-                subject = get_mail_response.get("subject")
-                date = get_mail_response.get("date")
-                content = get_mail_response.get("htmlBody")
-
-                if (sender == self.sender_email and subject == self.welcome_email_subject):
-                    pattern_to_look_for = re.search(r'Please confirm your e-mail\s*</h3>\s*<a href="([^"]+)">', content)
-                    confirmation_link = pattern_to_look_for.group(1) \
-                        if pattern_to_look_for else None  # returns link found - or None if not found
-                    if confirmation_link is not None:  # so, if link found
-                        # then we get date-time of receiving this link into datetime-object
-                        date_parsed = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-                        all_links_with_dates_detected.append((date_parsed, confirmation_link))  # save link + date-time
-
-            if len(all_links_with_dates_detected) == 0:  # if no mail with confirmation link was found
-                print(f"No confirmation link for user registration found in email")
-
-            if len(all_links_with_dates_detected) > 1:  # if more then one email with conformation link detected
-                # we select the most recent mail (and so the link)
-                link_found = max(all_links_with_dates_detected, key=lambda x: x[0])[1]
-
-            else:  # if only one mail with confirmation link was found
-                link_found = all_links_with_dates_detected[0][1]
+        link_found = self._wait_for_new_value(CONFIRMATION_LINK_FOR_REGISTRATION)
 
         # print(f"Confirmation link for user registration found: {link_found}")
         # finally, we extract token from the confirmation link received, it's placed in the very end of the link
@@ -137,61 +84,13 @@ class EmailAndPasswordGenerator:
         return token_from_confirmation_link
 
     # returns code neeeded to complete deleting user account (used in the endpoint DELETE /api/delete/user/{code})
-    # returns one string with the value for "code" - if mail with code was found in the user email
-    # or returns None for "code" - if no mail with code was found
-    # (if multiple mails with codes were found in email, then the method returns the most recent one)
+    # returns one string with the value for "code" - as soon as a mail with code is found in the user email
+    # or returns None for "code" - if no mail with code was found till the deadline
+    # (if multiple mails with codes were found in email, then the method returns the most recent one
+    # that wasn't returned before by this instance)
     @allure.step('Parce emails received and get code from confirmation link (needed to complete deleting user account)')
     def get_confirmation_code_for_delete_user(self):
-        time.sleep(15)
-        code_found = None
-
-        # log into the email
-        log_in_response = requests.get(f"{self.api}?login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}")
-
-        # check the email for mails
-        get_mail_response = requests.get(
-            f"{self.api}?action=getMessages&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}").json()
-        messages_number = len(get_mail_response)
-        # print(f"Number of mails detected in email: {messages_number}")
-
-        if messages_number == 0:
-            print("No mails in the email detected")
-        else:
-            list_of_mails_ids = []
-            for mail in get_mail_response:
-                for key, value in mail.items():
-                    if key == "id":  # the "id" key contains value - ID of a specific mail in the email
-                        list_of_mails_ids.append(value)  # add ID of a specific mail into a list of all mails from email
-            # print(f"The number of mails detected: {messages_number}")
-
-            # finally, analyze every mail in the email - to find those that have a confirmation code inside
-            all_codes_with_dates_detected = []
-
-            for mail_id in list_of_mails_ids:
-                get_mail_response = requests.get(
-                    f"{self.api}?action=readMessage&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}&id={mail_id}").json()
-                sender = get_mail_response.get("from")
-                subject = get_mail_response.get("subject")
-                date = get_mail_response.get("date")
-                content = get_mail_response.get("htmlBody")
-
-                if (sender == self.sender_email and subject == "Account delete process"):
-                    pattern_to_look_for = re.search(r"Your code: <b>([^<]+)</b>", content)
-                    confirmation_code = pattern_to_look_for.group(1) \
-                        if (pattern_to_look_for) else None  # returns code found - or None if not found
-                    if confirmation_code is not None:
-                        date_parsed = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-                        all_codes_with_dates_detected.append((date_parsed, confirmation_code))
-
-            if len(all_codes_with_dates_detected) == 0:  # if no mail with confirmation code was detected
-                print(f"No confirmation code to delete user detected in email")
-
-            if len(all_codes_with_dates_detected) > 1:  # if more then one mail with conformation code detected
-                code_found = max(all_codes_with_dates_detected, key=lambda x: x[0])[1]  # we select the most recent
-
-            else:  # if only one mail with confirmation code was detected
-                code_found = all_codes_with_dates_detected[0][1]
-
+        code_found = self._wait_for_new_value(CONFIRMATION_CODE_FOR_DELETE_USER)
         # print(f"Code found: code_found")
         return code_found
 
@@ -199,17 +98,9 @@ class EmailAndPasswordGenerator:
     # used for complete tear-down in test
     @allure.step('Delete email account generated before (used to register account)')
     def delete_email_generated(self):
-        url = "https://www.1secmail.com/mailbox"
-
-        request_data = {
-            "action": "deleteMailBox",
-            "login": self.email.split('@')[0],
-            "domain": self.email.split('@')[1]
-        }
-
-        response = requests.post(url, data=request_data)
-        assert response.status_code == 200, "Unknown error. Unable to delete the email. Try again"
+        self.mailbox.delete_mailbox(self.email)
         print(f"Email {self.email} was deleted\n")
+        self.message_index = None
         self.email = None
         self.password = None
         self.username = None
@@ -217,55 +108,72 @@ class EmailAndPasswordGenerator:
 
     @allure.step('Parce emails received and get token from confirmation link (needed to complete password reset process')
     def get_token_for_password_reset(self):
-        time.sleep(15)
-        reset_token_found = None
-
-        # log into the email
-        log_in_response = requests.get(f"{self.api}?login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}")
-
-        # check the email for mails
-        get_mail_response = requests.get(
-            f"{self.api}?action=getMessages&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}").json()
-        messages_number = len(get_mail_response)
-        # print(f"Number of mails detected in email: {messages_number}")
-
-        if messages_number == 0:
-            print("No mails in the email detected")
-        else:
-            list_of_mails_ids = []
-            for mail in get_mail_response:
-                for key, value in mail.items():
-                    if key == "id":  # the "id" key contains value - ID of a specific mail in the email
-                        list_of_mails_ids.append(value)  # add ID of a specific mail into a list of all mails from email
-            # print(f"The number of mails detected: {messages_number}")
-
-            # finally, analyze every mail in the email - to find those that have a reset token inside
-            all_tokens_with_dates_detected = []
-
-            for mail_id in list_of_mails_ids:
-                get_mail_response = requests.get(
-                    f"{self.api}?action=readMessage&login={self.email.split('@')[0]}&domain={self.email.split('@')[1]}&id={mail_id}").json()
-                sender = get_mail_response.get("from")
-                subject = get_mail_response.get("subject")
-                date = get_mail_response.get("date")
-                content = get_mail_response.get("htmlBody")
-
-                if sender == self.sender_email and subject == "Password recovery process":
-                    pattern_to_look_for = re.search(r'Use the button below to reset it.\s*</h3>\s*<a href="[^"]*\?reset_token=([^"]+)">', content)
-                    reset_token_found = pattern_to_look_for.group(1) \
-                        if (pattern_to_look_for) else None  # returns reset_token found - or None if not found
-                    if reset_token_found is not None:
-                        date_parsed = datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
-                        all_tokens_with_dates_detected.append((date_parsed, reset_token_found))
-
-            if len(all_tokens_with_dates_detected) == 0:  # if no mail with reset_token was detected
-                print(f"No token to reset password detected in email")
-
-            if len(all_tokens_with_dates_detected) > 1:  # if more then one mail with reset_token detected
-                reset_token_found = max(all_tokens_with_dates_detected, key=lambda x: x[0])[1]  # we select the most recent
-
-            else:  # if only one mail with reset_token was detected
-                reset_token_found = all_tokens_with_dates_detected[0][1]
-
+        reset_token_found = self._wait_for_new_value(TOKEN_FOR_PASSWORD_RESET)
         # print(f"Reset token found: reset_token_found")
         return reset_token_found
+
+    # marks every value already received in the email as returned, so the next calls wait only for new mails
+    # (used if the generator is created again for an email used before, e.g. by a previous run)
+    def ignore_mails_received_before(self):
+        with self.lock:
+            for name in (CONFIRMATION_LINK_FOR_REGISTRATION, CONFIRMATION_CODE_FOR_DELETE_USER,
+                         TOKEN_FOR_PASSWORD_RESET):
+                self.values_returned.update(value for date, value in self._look_for_values(name))
+
+    # forgets values returned before and marks every value already received in the email as returned,
+    # so the next user of the email (e.g. a test leasing the user account from the pool) waits only for its own mails
+    def reset_mail_state(self):
+        with self.lock:
+            self.values_returned.clear()
+            self.ignore_mails_received_before()
+
+    # starts waiting (in background) for mails with values for the extraction rules given, returns right away;
+    # the same rule can be given several times to wait for several such mails, e.g.:
+    #     mails = generator.expect_mails(CONFIRMATION_LINK_FOR_REGISTRATION, CONFIRMATION_LINK_FOR_REGISTRATION)
+    #     ...  # API-calls that send the mails (and any other ones)
+    #     links = mails.values(CONFIRMATION_LINK_FOR_REGISTRATION)
+    # (see api/support/mail_expectation.py)
+    @allure.step('Start waiting for mails in background: {names}')
+    def expect_mails(self, *names):
+        return MailExpectation(self, names)
+
+    # checks the email once and returns up to "count" values for the extraction rule that weren't returned before
+    # (the oldest ones first), they are marked as returned
+    def take_new_values(self, name, count=1):
+        with self.lock:
+            new_values_with_dates = sorted(
+                (value_with_date for value_with_date in self._look_for_values(name)
+                 if value_with_date[1] not in self.values_returned), key=lambda x: x[0])
+            values_taken = [value for date, value in new_values_with_dates[:count]]
+            self.values_returned.update(values_taken)
+            return values_taken
+
+    # waits until a value for specific extraction rule (see api/support/mail_extraction.py) that wasn't returned
+    # before is found in the email and returns the most recent of such values;
+    # if no new value was detected till the deadline - returns None (values returned before are never returned again)
+    def _wait_for_new_value(self, name):
+
+        def check():
+            with self.lock:
+                new_values_with_dates = [value_with_date for value_with_date in self._look_for_values(name)
+                                         if value_with_date[1] not in self.values_returned]
+                if len(new_values_with_dates) == 0:
+                    return None
+                value_new = max(new_values_with_dates, key=lambda x: x[0])[1]  # we select the most recent
+                self.values_returned.add(value_new)
+                return value_new
+
+        return self.mail_waiter.wait_for(
+            check, lambda timeout: self.mailbox.wait_for_new_mail(self.email, timeout))
+
+    # returns the index of mails already read from the current email (a new one is created if the email changed)
+    def _messages(self):
+        if self.message_index is None or self.message_index.email != self.email:
+            self.message_index = MessageIndex(self.mailbox, self.email, self.mail_extractor)
+        return self.message_index
+
+    # checks the email once (only mails that weren't read before are read)
+    # and returns a list of all values found in mails for specific extraction rule: (date-time, value)
+    def _look_for_values(self, name):
+        self._messages().refresh()
+        return self._messages().find_values(name)
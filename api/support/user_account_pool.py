@@ -0,0 +1,110 @@
+# this class used to keep a pool of user accounts already created and confirmed, so tests that need
+# "some confirmed user account" don't create and delete a new one every time:
+# - creates several user accounts at once (concurrently) when the pool is filled
+# - leases a user account to a test (a new one is created if all user accounts are already leased)
+# - checks the user account when a test gives it back (and resets its password if it was changed in the test),
+# mails received by the test are marked as read
+# - hands all user accounts over to the cleanup queue at the end of the session (they are deleted in background)
+
+# size of the pool can be changed in the .env file: USER_ACCOUNT_POOL_SIZE (3 by default)
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import allure
+
+from api.api_library.password import Password
+from api.api_library.user_account import UserAccount
+from api.api_library.http_session import create_session
+from api.api_library.token_manager import get_token_manager
+from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
+
+
+class PooledUserAccount:
+
+    def __init__(self, email_and_password_generator, username, email, password):
+        self.email_and_password_generator = email_and_password_generator
+        self.username = username
+        self.email = email
+        self.password = password
+
+
+class UserAccountPool:
+
+    def __init__(self, size=None):
+        self.size = size if size is not None else int(os.environ.get("USER_ACCOUNT_POOL_SIZE", 3))
+        self.available = queue.Queue()  # user accounts that can be leased
+        self.all_accounts = []  # every user account created by the pool (to delete them at the end)
+        self.lock = threading.Lock()
+
+    @allure.step('Create user accounts for the pool')
+    def fill(self):
+        with ThreadPoolExecutor(max_workers=max(self.size, 1)) as executor:
+            for account in executor.map(lambda i: self._create_account(), range(self.size)):
+                self.available.put(account)
+
+    def _create_account(self):
+        email_and_password_generator, username, email, password = UserAccountSupport().create_user_account()
+        account = PooledUserAccount(email_and_password_generator, username, email, password)
+        with self.lock:
+            self.all_accounts.append(account)
+        return account
+
+    # returns a user account that isn't used by any other test at the moment
+    @allure.step('Lease a user account from the pool')
+    def lease(self):
+        try:
+            return self.available.get_nowait()
+        except queue.Empty:
+            return self._create_account()
+
+    # takes the user account back to the pool: mails received by the test are marked as read, so the next test
+    # doesn't get its tokens/codes; if the account can't be used anymore, it's dropped from the pool
+    # and handed over to the cleanup queue (the user account and its email are deleted in background)
+    @allure.step('Give the user account back to the pool')
+    def give_back(self, account):
+        if self._reset(account):
+            account.email_and_password_generator.reset_mail_state()
+            self.available.put(account)
+        else:
+            print(f"User account with email '{account.email}' can't be used anymore and was removed from the pool")
+            get_cleanup_queue().register(account.email_and_password_generator)
+            with self.lock:
+                self.all_accounts.remove(account)
+
+    # checks that it's possible to log in with the user account, if not - resets its password back
+    # through the password recovery process; returns True if the account can be used again
+    # (the check is done every time: the password could be changed by recovery, or with a session the token
+    # manager doesn't know about, while the token manager still keeps a token for the account)
+    def _reset(self, account):
+        not_authorized_session = create_session()
+        user_account_api = UserAccount(not_authorized_session)
+        status = user_account_api.log_in_with_email_or_username(account.email, account.password)[1]
+        if status == 200:
+            return True
+
+        # the token kept for the account (if any) was received before the password was changed
+        token = get_token_manager().token_of(account.email)
+        if token is not None:
+            get_token_manager().forget_token(token.value)
+
+        password_api = Password(not_authorized_session)
+        status = password_api.request_password_recovery_by_email_or_username(account.email)[1]
+        if status != 200:
+            return False
+        reset_token = account.email_and_password_generator.get_token_for_password_reset()
+        if reset_token is None:
+            return False
+        status = password_api.reset_password(account.password, reset_token)[1]
+        return status == 200
+
+    # deletes every user account created by the pool (and emails used to register them) - in background,
+    # by the cleanup queue (see api/support/cleanup_queue.py)
+    @allure.step('Delete all user accounts of the pool')
+    def delete_all(self):
+        for account in self.all_accounts:
+            get_cleanup_queue().register(account.email_and_password_generator)
+        self.all_accounts = []
@@ -3,7 +3,8 @@
 # 2) method to delete the account (only an account with data generated by EmailAndPasswordGenerator-class before!)
 
 from api.api_library.user_account import UserAccount
-import requests
+from api.api_library.http_session import create_session
+from api.api_library.token_manager import get_token_manager
 from api.support.temporary_email_generator import EmailAndPasswordGenerator
 import allure
 
@@ -14,7 +15,7 @@ class UserAccountSupport:
         email_and_password_generator = EmailAndPasswordGenerator()
         username, email, password = email_and_password_generator.generate_username_and_email_and_password()
 
-        not_authorized_session = requests.Session()
+        not_authorized_session = create_session()
         user_account_api = UserAccount(not_authorized_session)
         request_user_registration = user_account_api.user_registration(username, email, password)
         status = request_user_registration[1]
@@ -29,18 +30,12 @@ class UserAccountSupport:
 
     @allure.step('Delete user account created before (with credentials generated)')
     def delete_user_account(self, email_and_password_generator: EmailAndPasswordGenerator):
-        not_authorized_session = requests.Session()
-        user_account_api = UserAccount(not_authorized_session)
         email = email_and_password_generator.email
         password = email_and_password_generator.password
 
-        request_user_log_in = user_account_api.log_in_with_email_or_username(email, password)
-        response_body, status = request_user_log_in
-        assert status == 200
-        access_token_for_session = response_body.get("access_token")
-
-        authorized_session = requests.Session()
-        authorized_session.headers.update({"Authorization": f"Bearer {access_token_for_session}"})
+        # the token is taken from the token manager (it logs in only if there's no valid token yet)
+        authorized_session = create_session()
+        assert get_token_manager().authorize(authorized_session, email, password) is not None
 
         user_account_api = UserAccount(authorized_session)
         request_delete_user = user_account_api.request_delete_user()
@@ -0,0 +1,98 @@
+# this class used to generate usernames for new user accounts without checking every candidate
+# in POST /api/registration/username_check:
+# - every username starts with the ID of the run (unique for every process, including pytest-xdist workers)
+# and a counter, the rest is random - so usernames don't collide with each other and with usernames of other runs
+# - usernames already given out in the run are reserved, so the same one is never returned twice
+# - if the server check is required (USERNAME_SERVER_CHECK=true in the .env file), candidates are checked
+# in batches concurrently, and free usernames left from the batch are kept for next calls
+
+# settings can be changed in the .env file:
+# USERNAME_SERVER_CHECK - "true" to check every username in the backend before it's returned ("false" by default)
+# USERNAME_CHECK_BATCH_SIZE - how many candidates are checked at once (5 by default)
+
+import os
+import random
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.api_library.http_session import create_session
+from api.api_library.user_account import UserAccount
+
+SYMBOLS = string.ascii_lowercase + string.digits
+
+
+def to_base36(number):
+    digits = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        digits = SYMBOLS[remainder] + digits
+        if number == 0:
+            return digits
+
+
+class UsernameAllocator:
+
+    def __init__(self, server_check=None, batch_size=None):
+        self.server_check = server_check if server_check is not None \
+            else os.environ.get("USERNAME_SERVER_CHECK", "false").lower() == "true"
+        self.batch_size = batch_size if batch_size is not None \
+            else int(os.environ.get("USERNAME_CHECK_BATCH_SIZE", 5))
+        # ID of the run: time (in ms), ID of the process and 2 random symbols
+        self.run_id = to_base36(int(time.time() * 1000))[-5:] + to_base36(os.getpid())[-3:] \
+            + "".join(random.choice(string.ascii_lowercase) for i in range(2))
+        self.counter = 0
+        self.reserved = set()  # usernames already given out in the run
+        self.checked = {}  # length -> free usernames left from batches checked before
+        self.lock = threading.Lock()
+
+    # returns a new username (of the length given) that wasn't returned before,
+    # "symbols" - symbols for the random part of the username
+    def generate(self, length=25, symbols=string.ascii_lowercase):
+        with self.lock:
+            self.counter += 1
+            unique_part = self.run_id + to_base36(self.counter)
+            assert len(unique_part) <= length, f"Username of {length} symbols is too short to be unique"
+            while True:
+                username = unique_part + "".join(random.choice(symbols) for i in range(length - len(unique_part)))
+                if username not in self.reserved:
+                    self.reserved.add(username)
+                    return username
+
+    # returns a username that can be used to register a new user account
+    # (checked in the backend first - if the server check is required)
+    def allocate(self, length=25):
+        if not self.server_check:
+            return self.generate(length)
+
+        while True:
+            with self.lock:
+                if len(self.checked.get(length, [])) > 0:
+                    return self.checked[length].pop()
+            self._check_batch(length)
+
+    # checks a batch of candidates concurrently and keeps the free ones
+    def _check_batch(self, length):
+        candidates = [self.generate(length) for i in range(self.batch_size)]
+
+        def is_free(username):
+            return UserAccount(create_session()).username_check(username)[1] == 204
+
+        with ThreadPoolExecutor(max_workers=self.batch_size) as executor:
+            free_usernames = [username for username, free in zip(candidates, executor.map(is_free, candidates)) if free]
+        with self.lock:
+            self.checked.setdefault(length, []).extend(free_usernames)
+
+
+_username_allocator = None
+_username_allocator_lock = threading.Lock()
+
+
+# returns the allocator used by the whole process (so usernames are reserved for the whole run)
+def get_username_allocator():
+    global _username_allocator
+    with _username_allocator_lock:
+        if _username_allocator is None:
+            _username_allocator = UsernameAllocator()
+        return _username_allocator
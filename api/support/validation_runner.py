@@ -0,0 +1,101 @@
+# this class used to send a whole table of validation cases (request bodies the backend should check, e.g.
+# invalid emails) to one "*_custom_body" method of UserAccount or Password at once:
+# - the same request body is sent only once, even if it's given several times (duplicates in test data
+# don't cost API-calls and don't become separate tests)
+# - all request bodies are sent concurrently, every one in its own session (all sessions share one pool
+# of kept-alive connections, see api/api_library/http_session.py)
+# - every case is still checked by its own test: tests are parametrized by "cases", and each one takes the response
+# for its request body (result_of()) - the table is sent once, by the class-scoped fixture that runs it
+# - the table is sent once per process: with pytest -n ... tests of the table should be run by one worker,
+# so they are marked with "xdist_group" (kept together with --dist loadgroup), and the scheduler of
+# api/support/duration_scheduler.py (used with --dist load) keeps tests of a class-scoped fixture together too;
+# with TEST_SCHEDULER=off and --dist load every worker that gets a test of the table sends the whole table
+# - an authorized session can be given (for methods that need it) - its headers are used by all sessions
+
+# settings can be changed in the .env file:
+# VALIDATION_RUNNER_WORKERS - how many request bodies are sent at the same time (10 by default)
+#
+# EXAMPLE:
+#     invalid_email_table = ValidationTable(UserAccount, "request_email_verify_custom_body",
+#                                           [{"email": email} for email in TestData.invalid_emails])
+#
+#     @pytest.fixture(scope="class")
+#     def invalid_email_results():
+#         return invalid_email_table.run()
+#
+#     @pytest.mark.xdist_group("invalid_emails")
+#     @pytest.mark.parametrize("request_body", invalid_email_table.cases, ids=invalid_email_table.ids)
+#     def test_request_email_verify_invalid_email_address_negative(self, request_body, invalid_email_results):
+#         response_body, status = invalid_email_results.result_of(request_body)
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import allure
+
+from api.api_library.http_session import create_session
+
+
+# returns the key of the request body (equal request bodies have equal keys)
+def key_of(request_body):
+    return json.dumps(request_body, sort_keys=True)
+
+
+class ValidationTable:
+
+    # "client_class" - UserAccount or Password, "method_name" - name of its "*_custom_body" method
+    # "request_bodies" - request bodies to send (duplicates are sent only once)
+    def __init__(self, client_class, method_name, request_bodies, session=None, workers=None):
+        assert method_name.endswith("_custom_body") and hasattr(client_class, method_name), \
+            f"{client_class.__name__} has no method '{method_name}' that accepts a custom request body"
+        self.client_class = client_class
+        self.method_name = method_name
+        self.session = session  # None - sessions without any user authorized
+        self.workers = workers if workers is not None else int(os.environ.get("VALIDATION_RUNNER_WORKERS", 10))
+
+        unique_bodies = {}
+        for request_body in request_bodies:
+            unique_bodies.setdefault(key_of(request_body), request_body)
+        self.cases = list(unique_bodies.values())  # unique request bodies (in the order they were given)
+        self.results = None  # key of the request body -> ApiResult (or the error raised while sending it)
+        self.lock = threading.Lock()
+
+    # names of cases for pytest (values of fields of the request body)
+    def ids(self, request_body):
+        if isinstance(request_body, dict):
+            return "-".join(str(value) for value in request_body.values())
+        return str(request_body)
+
+    def _send(self, request_body):
+        session = create_session()
+        if self.session is not None:
+            session.headers.update(self.session.headers)
+        try:
+            return getattr(self.client_class(session), self.method_name)(request_body)
+        except Exception as error:  # reported by the test of the case only
+            return error
+
+    # sends all request bodies (only the first call sends them, next calls return the same results)
+    def run(self):
+        with self.lock:
+            if self.results is None:
+                self._run()
+        return self
+
+    @allure.step('Send all request bodies of the validation table at once')
+    def _run(self):
+        print(f"Sending {len(self.cases)} request bodies to {self.client_class.__name__}.{self.method_name}"
+              f" ({self.workers} at the same time)")
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as executor:
+            results = list(executor.map(self._send, self.cases))
+        self.results = {key_of(request_body): result for request_body, result in zip(self.cases, results)}
+
+    # returns the result of the API-call with the request body (the same as the "*_custom_body" method returns)
+    def result_of(self, request_body):
+        self.run()
+        result = self.results[key_of(request_body)]
+        if isinstance(result, Exception):
+            raise result
+        return result
@@ -0,0 +1,50 @@
+from api.api_library.conversation import Conversation
+from api.conftest import chat_id_session
+from api.conftest import user_not_logged_in_session_fixture
+import allure
+import pytest
+import os
+
+
+# GET /api/chat_list is served by the mock backend too (so the chat_id fixture works there), but these tests
+# check the endpoint itself - so they are run against the real J.* backend only
+@pytest.mark.skipif(os.environ.get("MOCK_BACKEND", "false").lower() == "true",
+                    reason="checks the endpoint of the real J.* backend, not the mock")
+class TestChatList:
+
+    @allure.feature('Chat list')
+    @allure.description('Get list of chats of authorized user (positive)')
+    @allure.severity('Critical')
+    @pytest.mark.regression
+    @pytest.mark.live
+    def test_chat_list_positive(self, chat_id_session):
+        api = Conversation(chat_id_session)
+        response_body, status = api.chat_list({"limit": 2, "offset": 0})
+        assert status == 200
+        assert isinstance(response_body, list)
+        assert len(response_body) <= 2
+        for chat in response_body:
+            assert "id" in chat["chatInfo"]
+
+    @allure.feature('Chat list')
+    @allure.description('Get list of chats with offset (positive)')
+    @allure.severity('Normal')
+    @pytest.mark.regression
+    @pytest.mark.live
+    def test_chat_list_with_offset_positive(self, chat_id_session):
+        api = Conversation(chat_id_session)
+        first_two_chats, status = api.chat_list({"limit": 2, "offset": 0})
+        assert status == 200
+        second_chat, status = api.chat_list({"limit": 1, "offset": 1})
+        assert status == 200
+        assert second_chat == first_two_chats[1:2]
+
+    @allure.feature('Chat list')
+    @allure.description('Get list of chats, not authorized session (negative)')
+    @allure.severity('Normal')
+    @pytest.mark.regression
+    @pytest.mark.live
+    def test_chat_list_not_authenticated_negative(self, user_not_logged_in_session_fixture):
+        api = Conversation(user_not_logged_in_session_fixture)
+        response_body, status = api.chat_list({"limit": 1, "offset": 0})
+        assert status == 401
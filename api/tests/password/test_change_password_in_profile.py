@@ -4,6 +4,7 @@ from api.api_library.password import Password
 from api.api_library.user_account import UserAccount
 from api.conftest import user_not_logged_in_session_fixture
 from api.conftest import user_logged_in_session_fixture
+from api.conftest import user_account_lock_fixture
 import allure
 import api.conftest
 
@@ -15,7 +16,10 @@ class TestChangePasswordInProfile:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
-    def test_change_password_in_profile_positive(self, user_logged_in_session_fixture, user_not_logged_in_session_fixture):
+    def test_change_password_in_profile_positive(self, user_logged_in_session_fixture, user_not_logged_in_session_fixture,
+                                                 user_account_lock_fixture):
+        # user_account_lock_fixture: the password of the account is changed in the test, so no other worker
+        # should log in with the account at the same time
         authorized_session = user_logged_in_session_fixture[0]
         email = user_logged_in_session_fixture[1]
         old_password = user_logged_in_session_fixture[2]
@@ -2,6 +2,7 @@ from api.api_library.password import Password
 from api.api_library.user_account import UserAccount
 from api.conftest import user_not_logged_in_session_fixture
 from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
 import string
 import random
 import allure
@@ -15,6 +16,7 @@ class TestConfirmPasswordRecovery:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_confirm_password_recovery_positive(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -39,16 +41,14 @@ class TestConfirmPasswordRecovery:
         assert response_text == expected_response_text
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Confirm password recovery (2nd step in the process)')
     @allure.description('Confirm password recovery with invalid token (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_confirm_password_recovery_incorrect_token_provided_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -75,11 +75,8 @@ class TestConfirmPasswordRecovery:
         assert status != 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
 
 
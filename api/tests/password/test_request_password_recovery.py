@@ -2,6 +2,7 @@ from api.api_library.password import Password
 from api.api_library.user_account import UserAccount
 from api.conftest import user_not_logged_in_session_fixture
 from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
 from api.support.temporary_email_generator import EmailAndPasswordGenerator
 import allure
 import pytest
@@ -13,6 +14,7 @@ class TestRequestPasswordRecovery:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_request_password_recovery_by_email_positive(self, user_not_logged_in_session_fixture):
         # set up of preconditions: create a user account
         user_account_support = UserAccountSupport()
@@ -39,17 +41,15 @@ class TestRequestPasswordRecovery:
         assert status == 200
 
         # ----- now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Request password recovery by email or username (1st step in the process)')
     @allure.description('Request password recovery by username (positive)')
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_request_password_recovery_by_username_positive(self, user_not_logged_in_session_fixture):
         # set up of preconditions: create a user account
         user_account_support = UserAccountSupport()
@@ -76,11 +76,8 @@ class TestRequestPasswordRecovery:
         assert status == 200
 
         # ----- now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Request password recovery by email (1st step in the process)')
     @allure.description('Request password recovery, but with empty request body (negative)')
@@ -127,6 +124,7 @@ class TestRequestPasswordRecovery:
     @allure.description('Request password recovery by email not registered (negative)')
     @allure.severity('Normal')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=1)
     def test_request_password_recovery_no_user_with_such_email_exist_negative(self, user_not_logged_in_session_fixture):
         not_authenticated_session = user_not_logged_in_session_fixture
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -1,5 +1,7 @@
 from api.conftest import user_not_logged_in_session_fixture
 from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
+from api.support.mail_extraction import TOKEN_FOR_PASSWORD_RESET
 from api.api_library.password import Password
 from api.api_library.user_account import UserAccount
 import requests
@@ -15,6 +17,7 @@ class TestResetPassword:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=3)
     def test_reset_password_positive(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -40,6 +43,9 @@ class TestResetPassword:
         assert status == 200
         assert response_body == expected_response_body
 
+        # the mail with the reset token (to change the password back) will be waited for in background
+        mails = email_and_password_generator.expect_mails(TOKEN_FOR_PASSWORD_RESET)
+
         # now verify that the user is able to log in with a new password after change
         user_account_api = UserAccount(not_authorized_session)
         request_log_in = user_account_api.log_in_with_email_or_username(email, new_password)
@@ -52,7 +58,7 @@ class TestResetPassword:
             request_recovery = password_api.request_password_recovery_by_email_or_username(email)
             status = request_recovery[1]
             assert status == 200
-            reset_token = email_and_password_generator.get_token_for_password_reset()
+            reset_token = mails.value(TOKEN_FOR_PASSWORD_RESET)
             assert reset_token is not None
 
             request_reset_password = password_api.reset_password(password, reset_token)
@@ -61,17 +67,15 @@ class TestResetPassword:
 
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with invalid token (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_reset_password_invalid_reset_token_negative(self):
+    @pytest.mark.waits_for_mail(mails=2)
+    def test_reset_password_invalid_reset_token_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
         user_account_support = UserAccountSupport()
@@ -114,16 +118,14 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with loo long new password, 33-symbols (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_reset_password_too_long_new_password_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -163,16 +165,14 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with loo short new password, 7-symbols (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_reset_password_too_short_new_password(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -210,16 +210,14 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with no new password one provided (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_reset_password_no_new_password_one_provided_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -261,16 +259,14 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with no new password two provided (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_reset_password_no_new_password_two_provided_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -312,16 +308,14 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Reset password (3nd step in the process, final)')
     @allure.description('Reset password with empty request body (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_reset_password_empty_request_body_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # 1) create a user account
@@ -361,11 +355,8 @@ class TestResetPassword:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
 
 
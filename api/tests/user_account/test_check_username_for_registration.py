@@ -5,6 +5,8 @@ from api.support.temporary_email_generator import EmailAndPasswordGenerator
 import string
 import random
 from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
+from api.support.username_allocator import get_username_allocator
 import allure
 
 
@@ -15,29 +17,21 @@ class TestCheckUsername:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=1)
     def test_check_username_positive(self, user_not_logged_in_session_fixture):
         not_authorized_session = user_not_logged_in_session_fixture
         user_account_api = UserAccount(user_not_logged_in_session_fixture)
 
-        username = None
-
-        for i in range(0, 3):  # making three attempts to find username
-            # that is not already registered in system (according to the result of check)
-
-            # 1) firstly create a 32-symbols long username that contains all allowed types of symbols:
-            # letters (lower and upper case), numbers and '.'
-            alphanumeric_symbols_allowed = string.ascii_lowercase + string.ascii_uppercase + string.digits
-            username_candidate = '.' + ''.join(random.choice(alphanumeric_symbols_allowed) for i in range(30)) + '.'
-
-            request_username_check = user_account_api.username_check(username_candidate)
-            response, status = request_username_check
-
-            # 2) check that it's not used yet
-            if status == 204:  # and if username is not already used, then we select it to the test itself
-                username = username_candidate
-                break
+        # 1) firstly create a 32-symbols long username that contains all allowed types of symbols:
+        # letters (lower and upper case), numbers and '.' (it starts with ID of the run and a counter,
+        # so it isn't registered in system yet, see api/support/username_allocator.py)
+        alphanumeric_symbols_allowed = string.ascii_lowercase + string.ascii_uppercase + string.digits
+        username = '.' + get_username_allocator().generate(30, alphanumeric_symbols_allowed) + '.'
 
-        assert username is not None, "Unable to find an available username for test after three attempts"
+        # 2) check that it's not used yet
+        request_username_check = user_account_api.username_check(username)
+        response, status = request_username_check
+        assert status == 204, f"Username {username} is already used"
 
         #  verify that it's not used in system yet - by registering a new account with it
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -53,18 +47,15 @@ class TestCheckUsername:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support = UserAccountSupport()
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Username check')
     @allure.description('Check username for registration, already used (negative)')
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=1)
     def test_check_username_already_used_negative(self, user_not_logged_in_session_fixture):
         # set up of preconditions:
         # create a user account (with a specific username used)
@@ -84,11 +75,8 @@ class TestCheckUsername:
         }
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Username check')
     @allure.description('Check username for registration, too short, 2 symbols long (negative)')
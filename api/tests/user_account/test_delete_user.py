@@ -14,6 +14,7 @@ class TestDeleteUser:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_delete_user_positive(self, user_not_logged_in_session_fixture):
         # ----- precondition: create a user account first
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -74,6 +75,7 @@ class TestDeleteUser:
                         'but in not authorized session (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     # try to delete user with a valid confirmation code while being not authenticated
     def test_delete_user_not_authenticated_negative(self, user_not_logged_in_session_fixture):
         # ----- precondition: create a user account first
@@ -135,6 +137,7 @@ class TestDeleteUser:
     @allure.description('Confirm user delete for existing account with invalid token (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_delete_user_invalid_code_negative(self, user_not_logged_in_session_fixture):
         # ----- precondition: create a user account first
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -200,6 +203,7 @@ class TestDeleteUser:
     @allure.description('Confirm user delete for existing account with empty token value (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_delete_user_empty_code_negative(self, user_not_logged_in_session_fixture):
         # ----- precondition: create a user account first
         email_and_password_generator = EmailAndPasswordGenerator()
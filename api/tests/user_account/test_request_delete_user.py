@@ -13,6 +13,7 @@ class TestRequestDeleteUser:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_request_delete_user_positive(self, user_not_logged_in_session_fixture):
         # ----- precondition: create a user account first
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -2,13 +2,29 @@ import pytest
 from api.api_library.user_account import UserAccount
 from api.conftest import user_not_logged_in_session_fixture
 from api.support.temporary_email_generator import EmailAndPasswordGenerator
+from api.support.mail_extraction import CONFIRMATION_LINK_FOR_REGISTRATION
 import string
 import random
 from api.support.user_account_support import UserAccountSupport
+from api.support.cleanup_queue import get_cleanup_queue
 import time
 from api.test_data.test_data_user_account import TestData
+from api.support.validation_runner import ValidationTable
 import allure
 
+# all invalid emails (without duplicates) are sent at once, every test of an email only checks the response
+# (see api/support/validation_runner.py)
+invalid_email_table = ValidationTable(UserAccount, "request_email_verify_custom_body",
+                                      [{"email": invalid_email} for invalid_email in TestData.invalid_emails])
+
+
+# fixture that sends all invalid emails of the table (once for all tests of the class run by the same process,
+# so tests of the table are kept on one pytest-xdist worker by the "xdist_group" mark below)
+@pytest.fixture(scope="class")
+def invalid_email_results():
+    return invalid_email_table.run()
+
+
 class TestRequestEmailVerify:
 
     @allure.feature('Request email verification (used to complete user registration; '
@@ -17,6 +33,7 @@ class TestRequestEmailVerify:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_request_email_verify_positive(self, user_not_logged_in_session_fixture):
         email_and_password_generator = EmailAndPasswordGenerator()
         username, email, password = email_and_password_generator.generate_username_and_email_and_password()
@@ -62,18 +79,15 @@ class TestRequestEmailVerify:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support = UserAccountSupport()
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Request email verification (used to complete user registration; '
                     'run in case no email with token was received before)')
     @allure.description('Request email verification, second attempt (positive)')
     @allure.severity('Blocker')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=1)
     # the next test verifies that the endpoint can be used as many times as needed (more than once),
     # and each time a new token received
     def test_request_email_verify_second_attempt_positive(self, user_not_logged_in_session_fixture):
@@ -83,39 +97,32 @@ class TestRequestEmailVerify:
         not_authorized_session = user_not_logged_in_session_fixture
         user_account_api = UserAccount(not_authorized_session)
 
+        # all three mails with tokens are waited for in background, while requests are sent: the first one is
+        # sent automatically when registration starts, the next two - after every request of email verification
+        mails = email_and_password_generator.expect_mails(
+            CONFIRMATION_LINK_FOR_REGISTRATION, CONFIRMATION_LINK_FOR_REGISTRATION, CONFIRMATION_LINK_FOR_REGISTRATION)
+
         request_user_registration = user_account_api.user_registration(username, email, password)
         status = request_user_registration[1]
         assert status == 201
 
-        # we retrieve the first token automatically sent when starting registration - so we won't confuse it
-        # with the second token that should be sent in the test itself
-        first_token_received = email_and_password_generator.get_token_from_confirmation_link_for_registration()
-
         # the test itself
 
         # first attempt
         request_email_verify_first_attempt = user_account_api.request_email_verify(email)
         status = request_email_verify_first_attempt[1]
         assert status == 200
-        second_token_received = None
-        for i in range(0, 10):  # make 10 attempts max to detect new token received in email
-            last_token_received = email_and_password_generator.get_token_from_confirmation_link_for_registration()
-            if last_token_received != first_token_received:
-                second_token_received = last_token_received
-                break
-        assert second_token_received is not None, "No new token (first attempt) detected in email"
 
         # second attempt
         request_email_verify_second_attempt = user_account_api.request_email_verify(email)
         status = request_email_verify_second_attempt[1]
         assert status == 200
-        third_token_received = None
-        for i in range(0, 10):  # make 10 attempts max to detect a new token received in email
-            last_token_received = email_and_password_generator.get_token_from_confirmation_link_for_registration()
-            if last_token_received != second_token_received:
-                third_token_received = last_token_received
-                break
-        assert second_token_received is not None, "No new token (second attempt) detected in email"
+
+        # every attempt should bring a new token (links found are returned in order of arrival)
+        links_received = mails.values(CONFIRMATION_LINK_FOR_REGISTRATION)
+        assert len(links_received) >= 2, "No new token (first attempt) detected in email"
+        assert len(links_received) == 3, "No new token (second attempt) detected in email"
+        assert len(set(links_received)) == 3, "The same token was sent twice"
 
         # delete email address created before - tear down
         email_and_password_generator.delete_email_generated()
@@ -125,6 +132,7 @@ class TestRequestEmailVerify:
     @allure.description('Request email verification, registration process has not been started yet (negative)')
     @allure.severity('Critical')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=1)
     def test_request_email_verify_registration_was_not_started_negative(self, user_not_logged_in_session_fixture):
         email_and_password_generator = EmailAndPasswordGenerator()
         username, email, password = email_and_password_generator.generate_username_and_email_and_password()
@@ -149,6 +157,7 @@ class TestRequestEmailVerify:
     @allure.description('Request email verification, email address is already registered (negative)')
     @allure.severity('Critical')
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_request_email_verify_with_address_already_registered_negative(self, user_not_logged_in_session_fixture):
         user_account_support = UserAccountSupport()
         # create a user account first
@@ -174,25 +183,22 @@ class TestRequestEmailVerify:
         assert status == 200
 
         # now we just delete everything created in the test before - tear-down
-        # 1) delete user account created before
-        user_account_support = UserAccountSupport()
-        user_account_support.delete_user_account(email_and_password_generator)
-
-        # 2) delete email address created before
-        email_and_password_generator.delete_email_generated()
+        # (the user account and the email are deleted in background, see api/support/cleanup_queue.py)
+        get_cleanup_queue().register(email_and_password_generator)
 
     @allure.feature('Request email verification (used to complete user registration; '
                     'run in case no email with token was received before)')
     @allure.description('Request email verification, invalid email address provided (negative)')
     @allure.severity('Critical')
     @pytest.mark.regression
-    @pytest.mark.parametrize('invalid_email', TestData.invalid_emails)
-    def test_request_email_verify_invalid_email_address_negative(self, invalid_email, user_not_logged_in_session_fixture):
-        not_authorized_session = user_not_logged_in_session_fixture
-        user_account_api = UserAccount(not_authorized_session)
+    @pytest.mark.xdist_group("request_email_verify_invalid_emails")
+    @pytest.mark.parametrize('request_body', invalid_email_table.cases, ids=invalid_email_table.ids)
+    def test_request_email_verify_invalid_email_address_negative(self, request_body, invalid_email_results):
+        invalid_email = request_body["email"]
 
-        request_email_verify = user_account_api.request_email_verify(invalid_email)
-        response_body, status =  request_email_verify
+        # the request was sent (with a not-authorized session) together with all other invalid emails
+        request_email_verify = invalid_email_results.result_of(request_body)
+        response_body, status = request_email_verify
 
         assert status == 422, f'Invalid email ({invalid_email}) was accepted'
         expected_response_body = {
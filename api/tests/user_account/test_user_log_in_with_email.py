@@ -2,7 +2,7 @@ import pytest
 from api.api_library.user_account import UserAccount
 import allure
 from api.conftest import user_not_logged_in_session_fixture
-from api.conftest import new_user_logged_in_session_fixture
+from api.conftest import shared_user_account_fixture
 from api.support.temporary_email_generator import EmailAndPasswordGenerator
 
 
@@ -13,27 +13,27 @@ class TestUserLogInWithEmail:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
-    def test_user_log_in_with_email_positive(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    @pytest.mark.latency_budget  # budget for /api/login/oauth is set in pytest.ini
+    def test_user_log_in_with_email_positive(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         not_authorized_session = user_not_logged_in_session_fixture
         api = UserAccount(not_authorized_session)
         response, status = api.log_in_with_email_or_username(email, password)
         assert status == 200
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with incorrect email (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_with_incorrect_email_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_with_incorrect_email_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         not_authorized_session = user_not_logged_in_session_fixture
         api = UserAccount(not_authorized_session)
@@ -50,17 +50,16 @@ class TestUserLogInWithEmail:
         }
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with incorrect password (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_incorrect_password_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_incorrect_password_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         not_authorized_session = user_not_logged_in_session_fixture
         api = UserAccount(not_authorized_session)
@@ -77,8 +76,7 @@ class TestUserLogInWithEmail:
         }
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('Unregistered user logs in (negative)')
@@ -107,10 +105,10 @@ class TestUserLogInWithEmail:
     @allure.description('User logs in with no email field and its value (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_no_email_field_and_its_value_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_no_email_field_and_its_value_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         api = UserAccount(user_not_logged_in_session_fixture)
         request_body = {
@@ -127,17 +125,16 @@ class TestUserLogInWithEmail:
         assert status == 422
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with no password field and its value (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_no_password_field_and_its_value_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_no_password_field_and_its_value_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         api = UserAccount(user_not_logged_in_session_fixture)
         request_body = {
@@ -153,17 +150,16 @@ class TestUserLogInWithEmail:
         assert status == 422
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with empty value in email field (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_empty_value_in_email_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_empty_value_in_email_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         not_authorized_session = user_not_logged_in_session_fixture
         api = UserAccount(not_authorized_session)
@@ -180,17 +176,16 @@ class TestUserLogInWithEmail:
         assert status == 422
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with empty value in password field (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_log_in_empty_value_in_password_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created (done by new_user_logged_in_session_fixture)
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_log_in_empty_value_in_password_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one, see shared_user_account_fixture)
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         not_authorized_session = user_not_logged_in_session_fixture
         api = UserAccount(not_authorized_session)
@@ -206,8 +201,7 @@ class TestUserLogInWithEmail:
         assert status == 422
         assert response == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
     @allure.feature('User log in with email and password')
     @allure.description('User logs in with empty request body (negative)')
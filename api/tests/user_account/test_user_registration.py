@@ -1,10 +1,10 @@
 import pytest
 import allure
 from api.api_library.user_account import UserAccount
-import requests
+from api.api_library.http_session import create_session
 from api.support.temporary_email_generator import EmailAndPasswordGenerator
 from api.conftest import user_not_logged_in_session_fixture
-from api.conftest import new_user_logged_in_session_fixture
+from api.conftest import shared_user_account_fixture
 import random
 import string
 from api.support.user_account_support import UserAccountSupport
@@ -17,6 +17,7 @@ class TestUserRegistration:
     @allure.severity('Blocker')
     @pytest.mark.smoke
     @pytest.mark.regression
+    @pytest.mark.waits_for_mail(mails=2)
     def test_user_registration_positive(self, user_not_logged_in_session_fixture):
         # generate email and password needed for user registration
         email_and_password_generator = EmailAndPasswordGenerator()
@@ -51,7 +52,7 @@ class TestUserRegistration:
         response_body, status = request_log_in
         assert status == 200
         access_token = response_body.get("access_token")
-        session_of_user_being_logged_in = requests.Session()
+        session_of_user_being_logged_in = create_session()
         session_of_user_being_logged_in.headers.update({"Authorization": f"Bearer {access_token}"})  # by that we update session, so now the user is logged in
         api = UserAccount(session_of_user_being_logged_in)
 
@@ -364,11 +365,12 @@ class TestUserRegistration:
     @allure.description('Register user with email already used (negative)')
     @allure.severity('Blocker')
     @pytest.mark.regression
-    def test_user_registration_email_already_used_negative(self, new_user_logged_in_session_fixture, user_not_logged_in_session_fixture):
-        # precondition: to have a user account already created
-        username = new_user_logged_in_session_fixture[6]
-        email = new_user_logged_in_session_fixture[1]
-        password = new_user_logged_in_session_fixture[2]
+    def test_user_registration_email_already_used_negative(self, shared_user_account_fixture, user_not_logged_in_session_fixture):
+        # precondition: to have a user account already created (a read-only one shared by tests of the module,
+        # see shared_user_account_fixture)
+        username = shared_user_account_fixture[2]
+        email = shared_user_account_fixture[0]
+        password = shared_user_account_fixture[1]
 
         # create session (empty, no user authorized yet)
         user_not_authorized_session = user_not_logged_in_session_fixture
@@ -386,6 +388,5 @@ class TestUserRegistration:
         }
         assert response_body == expected_response_body
 
-        # now the user account and the email created before will be
-        # automatically deleted by the new_user_logged_in_session_fixture
+        # the user account isn't changed by the test - it's shared with other tests of the module
 
@@ -0,0 +1,198 @@
+# the file contains everything needed to benchmark the framework itself (clients of api_library and support helpers)
+# against a local stub, instead of the real J.* backend (see benchmarks/stub_server.py):
+# - the stub is started in its own process when benchmarks are collected, and clients and the mailbox backend
+# of this process are pointed at it (settings from the .env file are NOT used, so results don't depend on them)
+# - the measure fixture benchmarks a call (by pytest-benchmark) and adds to the results: API-calls made by it,
+# time spent in them (from sending till the response received, as measured by the transport), overhead of the framework
+# (everything else) and memory allocated by the call (peak, traced by tracemalloc)
+# - overhead and allocations are compared with baselines saved in benchmarks/baselines.json, the table is printed
+# in the end of the run; a benchmark fails if it allocates more than the baseline allows
+# (BENCHMARK_ALLOCATION_TOLERANCE - share, 0.25 by default, plus 2 KiB)
+# - baselines are updated by running benchmarks with --update-baselines (the file is kept in the repository,
+# so changes of the framework that make it slower or hungrier show up in review)
+#
+# to run benchmarks (see README.md for more options):
+#     python -m pytest benchmarks
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+STUB_EMAIL = "bench_user@1secmail.com"
+STUB_PASSWORD = "BenchUser1"
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+ALLOCATION_SLACK_KIB = 2.0
+ALLOCATION_ROUNDS = 5
+
+
+# starts the stub and points clients and the mailbox backend of this process at it
+def start_stub():
+    os.environ.update({
+        "MAILBOX_BACKEND": "1secmail",
+        "SENDER_EMAIL": "no-reply@j-project.local",
+        "WELCOME_EMAIL_SUBJECT": "Welcome to J.* project",
+        "MAIL_WAIT_TIMEOUT": "2",
+        "MAIL_POLL_INITIAL_INTERVAL": "0.01",
+        "HTTP_CASSETTE_MODE": "off",
+        "HTTP_RETRIES": "0",
+        "USERNAME_SERVER_CHECK": "false"
+    })
+    stub = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_server", STUB_EMAIL, STUB_PASSWORD],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    for line in stub.stdout:
+        if line.startswith("{"):
+            links = json.loads(line)
+            break
+    else:
+        raise AssertionError(f"The stub exited before it started: {stub.wait()}")
+    os.environ["BASIC_URL"] = links["basic_url"]
+    os.environ["ONESECMAIL_API_URL"] = links["mailbox_api_url"]
+    return stub
+
+
+stub_process = start_stub()
+
+from api.api_library.metrics import latency_recorder  # noqa: E402 (BASIC_URL must be set first)
+
+
+class BenchmarkResult:
+
+    def __init__(self, name):
+        self.name = name
+        self.mean_ms = 0.0
+        self.api_calls = 0.0  # API-calls made by one call
+        self.api_ms = 0.0  # time spent in API-calls by one call
+        self.peak_kib = 0.0  # memory allocated by one call
+
+    @property
+    def overhead_ms(self):
+        return max(self.mean_ms - self.api_ms, 0.0)
+
+    def as_dict(self):
+        return {"overhead_ms": round(self.overhead_ms, 3), "peak_kib": round(self.peak_kib, 1)}
+
+
+results = {}  # name of benchmark (class and test) -> BenchmarkResult
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as file:
+        return json.load(file)
+
+
+def pytest_addoption(parser):
+    parser.addoption("--update-baselines", action="store_true", default=False,
+                     help="save overhead and allocations of benchmarks run as new baselines "
+                          "(benchmarks/baselines.json)")
+
+
+# benchmarks "function" by pytest-benchmark; "setup" (not measured) is run before every call
+# and returns arguments for it: (args, kwargs)
+def measure_call(benchmark, name, config, function, setup=None, rounds=20):
+    result = BenchmarkResult(name)
+    api_calls = []  # API-calls made by every call measured: [timings, ...]
+
+    def measured(*args, **kwargs):
+        calls_before = len(latency_recorder.calls)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            api_calls.append(latency_recorder.calls[calls_before:])
+
+    if setup is None:
+        benchmark(measured)
+    else:
+        benchmark.pedantic(measured, setup=setup, rounds=rounds, warmup_rounds=1)
+
+    if benchmark.stats is not None:  # None - benchmarks are disabled (--benchmark-disable)
+        result.mean_ms = benchmark.stats.stats.mean * 1000
+    result.api_calls = statistics.mean(len(calls) for calls in api_calls)
+    result.api_ms = statistics.mean(sum(call.ttfb for call in calls) for calls in api_calls) * 1000
+
+    # allocations are measured separately (tracemalloc makes every call slower)
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(ALLOCATION_ROUNDS):
+            args, kwargs = setup() if setup is not None else ((), {})
+            allocated_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            function(*args, **kwargs)
+            peaks.append(tracemalloc.get_traced_memory()[1] - allocated_before)
+    finally:
+        tracemalloc.stop()
+    result.peak_kib = statistics.median(peaks) / 1024
+
+    benchmark.extra_info.update({"api_calls": result.api_calls, "api_ms": result.api_ms,
+                                 "overhead_ms": result.overhead_ms, "peak_kib": result.peak_kib})
+    results[name] = result
+    if not config.getoption("--update-baselines"):
+        check_allocations(result)
+    return result
+
+
+def check_allocations(result):
+    baseline = load_baselines().get(result.name)
+    if baseline is None:
+        return
+    tolerance = float(os.environ.get("BENCHMARK_ALLOCATION_TOLERANCE", 0.25))
+    allowed_kib = baseline["peak_kib"] * (1 + tolerance) + ALLOCATION_SLACK_KIB
+    assert result.peak_kib <= allowed_kib, \
+        f"{result.name} allocates {result.peak_kib:.1f} KiB per call, the baseline is {baseline['peak_kib']:.1f} KiB"
+
+
+# fixture that benchmarks a call, e.g.:
+#     def test_username_check(self, measure):
+#         measure(UserAccount(create_session()).username_check, setup=lambda: ((new_username(),), {}))
+@pytest.fixture()
+def measure(benchmark, request):
+    name = request.node.nodeid.split("::", 1)[1]  # e.g. "TestUserAccountBenchmarks::test_user_registration"
+
+    def measure_function(function, setup=None, rounds=20):
+        return measure_call(benchmark, name, request.config, function, setup, rounds)
+    return measure_function
+
+
+# credentials of the user account created in the stub right away (for benchmarks that only need to log in)
+@pytest.fixture(scope="session")
+def stub_user():
+    return STUB_EMAIL, STUB_PASSWORD
+
+
+def pytest_sessionfinish(session):
+    if session.config.getoption("--update-baselines") and len(results) > 0:
+        baselines = load_baselines()
+        baselines.update({name: result.as_dict() for name, result in results.items()})
+        with open(BASELINES_PATH, "w") as file:
+            json.dump(baselines, file, indent=1, sort_keys=True)
+            file.write("\n")
+    stub_process.stdin.close()
+    try:
+        stub_process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        stub_process.kill()
+
+
+# prints overhead and allocations of every benchmark next to its baseline
+def pytest_terminal_summary(terminalreporter):
+    if len(results) == 0:
+        return
+    baselines = load_baselines()
+    terminalreporter.write_sep("-", "framework overhead per call (baseline in brackets)")
+    terminalreporter.write_line(
+        f"{'benchmark':<90} {'API-calls':>9} {'API ms':>8} {'overhead ms':>20} {'peak KiB':>20}")
+    for name in sorted(results):
+        result = results[name]
+        baseline = baselines.get(name, {})
+        overhead = f"{result.overhead_ms:.3f} ({baseline.get('overhead_ms', '-')})"
+        peak = f"{result.peak_kib:.1f} ({baseline.get('peak_kib', '-')})"
+        terminalreporter.write_line(
+            f"{name:<90} {result.api_calls:>9.1f} {result.api_ms:>8.3f} {overhead:>20} {peak:>20}")
@@ -0,0 +1,66 @@
+# the file contains setups for benchmarks (run before every call measured, not measured themselves) -
+# they prepare what the call needs in the stub: new credentials, user accounts registered or confirmed,
+# sessions of users logged in, codes and tokens received by email
+
+from api.api_library.http_session import create_session
+from api.api_library.password import Password
+from api.api_library.user_account import UserAccount
+from api.support.temporary_email_generator import EmailAndPasswordGenerator
+from api.support.user_account_support import UserAccountSupport
+
+
+# setup for calls that send mails, but need no new arguments: with a setup the call is run a fixed number of rounds
+# (without it pytest-benchmark runs fast calls thousands of times, and mails pile up in the stub)
+def no_arguments():
+    return (), {}
+
+
+# returns a generator with new credentials (and the email created)
+def new_credentials():
+    email_and_password_generator = EmailAndPasswordGenerator()
+    email_and_password_generator.generate_username_and_email_and_password()
+    return email_and_password_generator
+
+
+# returns a generator with credentials of a new user account registered (but not confirmed)
+def registered_user():
+    email_and_password_generator = new_credentials()
+    status = UserAccount(create_session()).user_registration(
+        email_and_password_generator.username, email_and_password_generator.email,
+        email_and_password_generator.password)[1]
+    assert status == 201
+    return email_and_password_generator
+
+
+# returns a generator with credentials of a new user account registered and confirmed
+def confirmed_user():
+    return UserAccountSupport().create_user_account()[0]
+
+
+# returns a new session logged in as the user (the token manager isn't used - so every session gets its own token)
+def logged_in_session(email, password):
+    session = create_session()
+    response_body, status = UserAccount(session).log_in_with_email_or_username(email, password)
+    assert status == 200
+    session.headers.update({"Authorization": f"Bearer {response_body['access_token']}"})
+    return session
+
+
+# returns a reset token for the user account (from the mail received after password recovery was requested)
+def reset_token_for(email_and_password_generator):
+    status = Password(create_session()).request_password_recovery_by_email_or_username(
+        email_and_password_generator.email)[1]
+    assert status == 200
+    reset_token = email_and_password_generator.get_token_for_password_reset()
+    assert reset_token is not None
+    return reset_token
+
+
+# returns a session of a new user account (logged in) and the code to delete the user account
+def delete_code_for_new_user():
+    email_and_password_generator = confirmed_user()
+    session = logged_in_session(email_and_password_generator.email, email_and_password_generator.password)
+    assert UserAccount(session).request_delete_user()[1] == 200
+    code = email_and_password_generator.get_confirmation_code_for_delete_user()
+    assert code is not None
+    return session, code
@@ -0,0 +1,34 @@
+# the local stub used by benchmarks: the mock J.* backend (see api/support/mock_backend.py) started in its own
+# process, so time and memory spent by the stub aren't counted as overhead of the framework:
+# - mails are delivered into the local mailbox backend of this process, and shared with the benchmark process
+# through the local HTTP server that works the same way as the 1secmail API does
+# - a user account for benchmarks that only need to log in is created right away (with chats for benchmarks
+# of the Conversation-client)
+# - links to the backend and to the mailbox API are printed as one line of JSON
+# - the stub stops as soon as its stdin is closed (e.g. the benchmark process exited)
+#
+#     python -m benchmarks.stub_server <email> <password>
+
+import json
+import os
+import sys
+
+from api.support.mock_backend import start_mock_backend
+
+
+def main(email, password):
+    server = start_mock_backend()
+    server.backend.add_user(email.split("@")[0].replace("_", "."), email, password)
+    for number in range(1, 51):
+        server.backend.add_chat(email, f"Chat {number}")
+    sys.stdout.write(json.dumps({
+        "basic_url": server.url,
+        "mailbox_api_url": server.backend.mailbox.http_server.api
+    }) + "\n")
+    sys.stdout.flush()
+    sys.stdout = open(os.devnull, "w")  # nobody reads the output anymore
+    sys.stdin.read()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
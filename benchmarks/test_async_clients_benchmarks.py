@@ -0,0 +1,173 @@
+# benchmarks of every method of the AsyncUserAccount and AsyncPassword classes (see benchmarks/conftest.py
+# for what is measured); every call is awaited alone on one event loop, so the results can be compared
+# with the ones of the sync clients (API-calls of async clients are sent and measured by the transport too)
+
+import asyncio
+
+import httpx
+import pytest
+
+from api.api_library.async_password import AsyncPassword
+from api.api_library.async_user_account import AsyncUserAccount
+from api.support.username_allocator import get_username_allocator
+from benchmarks.setups import no_arguments, new_credentials, registered_user, confirmed_user, logged_in_session, \
+    delete_code_for_new_user, reset_token_for
+
+
+class AsyncRunner:
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.sessions = []
+
+    # returns a new session (authorized with the token of the sync session given, if any)
+    def session(self, sync_session=None):
+        headers = {"Authorization": sync_session.headers["Authorization"]} if sync_session is not None else None
+        session = httpx.AsyncClient(headers=headers)
+        self.sessions.append(session)
+        return session
+
+    # returns a sync function that runs the method of an async client (an unbound method gets the client first)
+    def sync(self, method):
+        return lambda *args: self.loop.run_until_complete(method(*args))
+
+    def close(self):
+        for session in self.sessions:
+            self.loop.run_until_complete(session.aclose())
+        self.loop.close()
+
+
+@pytest.fixture()
+def async_runner():
+    runner = AsyncRunner()
+    yield runner
+    runner.close()
+
+
+@pytest.fixture(scope="module")
+def recovery_user():
+    return confirmed_user()
+
+
+class TestAsyncUserAccountBenchmarks:
+
+    def test_user_registration(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+
+        def setup():
+            generator = new_credentials()
+            return (generator.username, generator.email, generator.password), {}
+
+        measure(async_runner.sync(api.user_registration), setup=setup)
+
+    def test_confirm_email(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+
+        def setup():
+            return (registered_user().get_token_from_confirmation_link_for_registration(),), {}
+
+        measure(async_runner.sync(api.confirm_email), setup=setup)
+
+    def test_log_in_with_email_or_username(self, measure, async_runner, stub_user):
+        api = AsyncUserAccount(async_runner.session())
+        measure(lambda: async_runner.sync(api.log_in_with_email_or_username)(*stub_user))
+
+    def test_user_logout(self, measure, async_runner, stub_user):
+        def setup():
+            return (AsyncUserAccount(async_runner.session(logged_in_session(*stub_user))),), {}
+
+        measure(async_runner.sync(AsyncUserAccount.user_logout), setup=setup)
+
+    def test_request_delete_user(self, measure, async_runner, stub_user):
+        api = AsyncUserAccount(async_runner.session(logged_in_session(*stub_user)))
+        measure(async_runner.sync(api.request_delete_user), setup=no_arguments)
+
+    def test_delete_user(self, measure, async_runner):
+        def setup():
+            session, code = delete_code_for_new_user()
+            return (AsyncUserAccount(async_runner.session(session)), code), {}
+
+        measure(async_runner.sync(AsyncUserAccount.delete_user), setup=setup)
+
+    def test_request_email_verify(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+
+        def setup():
+            return (registered_user().email,), {}
+
+        measure(async_runner.sync(api.request_email_verify), setup=setup)
+
+    def test_username_check(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+
+        def setup():
+            return (get_username_allocator().generate(25),), {}
+
+        measure(async_runner.sync(api.username_check), setup=setup)
+
+    def test_user_registration_custom_body(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+        request_body = {"username": "", "email": "not an email", "password": "short"}
+        measure(lambda: async_runner.sync(api.user_registration_custom_body)(request_body))
+
+    def test_log_in_with_email_custom_body(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+        request_body = {"username": "", "password": ""}
+        measure(lambda: async_runner.sync(api.log_in_with_email_custom_body)(request_body))
+
+    def test_request_email_verify_custom_body(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+        request_body = {"email": "not an email"}
+        measure(lambda: async_runner.sync(api.request_email_verify_custom_body)(request_body))
+
+    def test_username_check_custom_body(self, measure, async_runner):
+        api = AsyncUserAccount(async_runner.session())
+        request_body = {"username": ""}
+        measure(lambda: async_runner.sync(api.username_check_custom_body)(request_body))
+
+
+class TestAsyncPasswordBenchmarks:
+
+    def test_change_password_in_profile(self, measure, async_runner):
+        def setup():
+            generator = confirmed_user()
+            session = async_runner.session(logged_in_session(generator.email, generator.password))
+            return (AsyncPassword(session), generator.password, generator.password + "x"), {}
+
+        measure(async_runner.sync(AsyncPassword.change_password_in_profile), setup=setup)
+
+    def test_request_password_recovery_by_email_or_username(self, measure, async_runner, recovery_user):
+        api = AsyncPassword(async_runner.session())
+        request_password_recovery = async_runner.sync(api.request_password_recovery_by_email_or_username)
+        measure(lambda: request_password_recovery(recovery_user.username), setup=no_arguments)
+
+    def test_confirm_password_recovery(self, measure, async_runner, recovery_user):
+        api = AsyncPassword(async_runner.session())
+
+        def setup():
+            return (reset_token_for(recovery_user),), {}
+
+        measure(async_runner.sync(api.confirm_password_recovery), setup=setup)
+
+    def test_reset_password(self, measure, async_runner, recovery_user):
+        api = AsyncPassword(async_runner.session())
+
+        def setup():
+            return (recovery_user.password, reset_token_for(recovery_user)), {}
+
+        measure(async_runner.sync(api.reset_password), setup=setup)
+
+    def test_change_password_in_profile_custom_body(self, measure, async_runner, stub_user):
+        api = AsyncPassword(async_runner.session(logged_in_session(*stub_user)))
+        request_body = {"newPassword1": "", "newPassword2": "short", "oldPassword": ""}
+        measure(lambda: async_runner.sync(api.change_password_in_profile_custom_body)(request_body))
+
+    def test_request_password_recovery_custom_body(self, measure, async_runner):
+        api = AsyncPassword(async_runner.session())
+        request_body = {"recoveryField": ""}
+        measure(lambda: async_runner.sync(api.request_password_recovery_custom_body)(request_body))
+
+    def test_reset_password_custom_body(self, measure, async_runner):
+        api = AsyncPassword(async_runner.session())
+        request_body = {"newPassword1": "", "newPassword2": "short", "resetToken": ""}
+        measure(lambda: async_runner.sync(api.reset_password_custom_body)(request_body))
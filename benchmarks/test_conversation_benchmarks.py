@@ -0,0 +1,30 @@
+# benchmarks of every method of the Conversation-class (see benchmarks/conftest.py for what is measured);
+# the user account of the stub has 50 chats, the cache of chats is cleared before every call
+# unless the benchmark measures the cached lookup
+
+import pytest
+
+from api.api_library.conversation import Conversation, ChatCache
+from benchmarks.setups import logged_in_session
+
+
+@pytest.fixture()
+def conversation_api(stub_user):
+    return Conversation(logged_in_session(*stub_user), cache=ChatCache())
+
+
+class TestConversationBenchmarks:
+
+    def test_chat_list(self, measure, conversation_api):
+        measure(lambda: conversation_api.chat_list({"limit": 20, "offset": 0}))
+
+    def test_first_chat(self, measure, conversation_api):
+        def setup():
+            conversation_api.cache = ChatCache()
+            return (), {}
+
+        measure(conversation_api.first_chat, setup=setup)
+
+    def test_first_chat_cached(self, measure, conversation_api):
+        conversation_api.first_chat()
+        measure(conversation_api.first_chat)
@@ -0,0 +1,58 @@
+# benchmarks of every method of the Password-class (see benchmarks/conftest.py for what is measured)
+
+import pytest
+
+from api.api_library.http_session import create_session
+from api.api_library.password import Password
+from benchmarks.setups import no_arguments, confirmed_user, logged_in_session, reset_token_for
+
+
+@pytest.fixture()
+def password_api():
+    return Password(create_session())
+
+
+# a user account of its own - so mails sent by benchmarks don't pile up in the email of the stub user
+@pytest.fixture(scope="module")
+def recovery_user():
+    return confirmed_user()
+
+
+class TestPasswordBenchmarks:
+
+    def test_change_password_in_profile(self, measure):
+        def setup():
+            generator = confirmed_user()
+            session = logged_in_session(generator.email, generator.password)
+            return (Password(session), generator.password, generator.password + "x"), {}
+
+        measure(Password.change_password_in_profile, setup=setup)
+
+    def test_request_password_recovery_by_email_or_username(self, measure, password_api, recovery_user):
+        measure(lambda: password_api.request_password_recovery_by_email_or_username(recovery_user.username),
+                setup=no_arguments)
+
+    def test_confirm_password_recovery(self, measure, password_api, recovery_user):
+        def setup():
+            return (reset_token_for(recovery_user),), {}
+
+        measure(password_api.confirm_password_recovery, setup=setup)
+
+    def test_reset_password(self, measure, password_api, recovery_user):
+        def setup():
+            return (recovery_user.password, reset_token_for(recovery_user)), {}
+
+        measure(password_api.reset_password, setup=setup)
+
+    def test_change_password_in_profile_custom_body(self, measure, stub_user):
+        password_api = Password(logged_in_session(*stub_user))
+        request_body = {"newPassword1": "", "newPassword2": "short", "oldPassword": ""}
+        measure(lambda: password_api.change_password_in_profile_custom_body(request_body))
+
+    def test_request_password_recovery_custom_body(self, measure, password_api):
+        request_body = {"recoveryField": ""}
+        measure(lambda: password_api.request_password_recovery_custom_body(request_body))
+
+    def test_reset_password_custom_body(self, measure, password_api):
+        request_body = {"newPassword1": "", "newPassword2": "short", "resetToken": ""}
+        measure(lambda: password_api.reset_password_custom_body(request_body))
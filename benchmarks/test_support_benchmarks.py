@@ -0,0 +1,169 @@
+# benchmarks of support helpers (api/support) and of the parts of the framework every test goes through:
+# creating a session, allure steps, decoding JSON of responses, authorizing a session by the token manager
+# (like fixtures do) and the transport itself (see benchmarks/conftest.py for what is measured)
+
+import json
+import os
+
+import allure
+import pytest
+import requests
+
+from api.api_library.cassette import Cassette
+from api.api_library.http_session import create_session
+from api.api_library.password import Password
+from api.api_library.token_manager import TokenManager
+from api.api_library.transport import Transport
+from api.api_library.user_account import UserAccount
+from api.support.mail_extraction import MailExtractor, default_extraction_rules
+from api.support.temporary_email_generator import EmailAndPasswordGenerator
+from api.support.user_account_support import UserAccountSupport
+from api.support.username_allocator import UsernameAllocator
+from api.support.validation_runner import ValidationTable
+from benchmarks.setups import no_arguments, new_credentials, registered_user, confirmed_user, logged_in_session, \
+    reset_token_for
+
+PROFILE_BODY = {"access_token": "a" * 180, "token_type": "bearer", "user_profile_id": 1, "user_role": "user",
+                "user_status": "active"}
+VALIDATION_ERROR_BODY = {"detail": [{"loc": ["body", "password"], "msg": "field required",
+                                     "type": "value_error.missing"}] * 3}
+
+
+def response_with(body, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    return response
+
+
+class TestEmailAndPasswordGeneratorBenchmarks:
+
+    def test_generate_username_and_email_and_password(self, measure):
+        def setup():
+            return (EmailAndPasswordGenerator(),), {}
+
+        measure(EmailAndPasswordGenerator.generate_username_and_email_and_password, setup=setup)
+
+    def test_get_token_from_confirmation_link_for_registration(self, measure):
+        def setup():
+            return (registered_user(),), {}
+
+        measure(EmailAndPasswordGenerator.get_token_from_confirmation_link_for_registration, setup=setup)
+
+    def test_get_confirmation_code_for_delete_user(self, measure):
+        def setup():
+            generator = confirmed_user()
+            session = logged_in_session(generator.email, generator.password)
+            assert UserAccount(session).request_delete_user()[1] == 200
+            return (generator,), {}
+
+        measure(EmailAndPasswordGenerator.get_confirmation_code_for_delete_user, setup=setup)
+
+    def test_get_token_for_password_reset(self, measure):
+        generator = confirmed_user()
+
+        def setup():
+            assert Password(create_session()).request_password_recovery_by_email_or_username(generator.email)[1] == 200
+            return (), {}
+
+        measure(generator.get_token_for_password_reset, setup=setup)
+
+    def test_delete_email_generated(self, measure):
+        def setup():
+            return (new_credentials(),), {}
+
+        measure(EmailAndPasswordGenerator.delete_email_generated, setup=setup)
+
+    def test_ignore_mails_received_before(self, measure):
+        generator = confirmed_user()
+
+        def setup():
+            reset_token_for(generator)
+            return (), {}
+
+        measure(generator.ignore_mails_received_before, setup=setup)
+
+
+class TestUserAccountSupportBenchmarks:
+
+    def test_create_user_account(self, measure):
+        measure(UserAccountSupport().create_user_account, setup=no_arguments)
+
+    def test_delete_user_account(self, measure):
+        def setup():
+            return (confirmed_user(),), {}
+
+        measure(UserAccountSupport().delete_user_account, setup=setup)
+
+
+class TestHelpersBenchmarks:
+
+    def test_mail_extractor_extract(self, measure):
+        extractor = MailExtractor(default_extraction_rules())
+        mail = {"from": "no-reply@j-project.local", "subject": "Password recovery process",
+                "date": "2024-01-01 10:00:00",
+                "htmlBody": "<h3>You requested a password reset. Use the button below to reset it.</h3>\n"
+                            f'<a href="http://127.0.0.1/api/password/reset_password?reset_token={"t" * 43}">'
+                            "Reset password</a>"}
+        measure(lambda: extractor.extract(mail))
+
+    def test_username_allocator_generate(self, measure):
+        allocator = UsernameAllocator(server_check=False)
+        measure(lambda: allocator.generate(25))
+
+    # 20 invalid emails sent at once (a new table every time, so every call sends all of them)
+    def test_validation_table_run(self, measure):
+        def setup():
+            request_bodies = [{"email": f"username{number}@domain..com"} for number in range(20)]
+            return (ValidationTable(UserAccount, "request_email_verify_custom_body", request_bodies),), {}
+
+        measure(ValidationTable.run, setup=setup)
+
+    def test_token_manager_authorize_cached(self, measure, stub_user):
+        token_manager = TokenManager()
+        token_manager.get(*stub_user)  # the token is cached, as it is for every fixture but the first one
+        measure(lambda: token_manager.authorize(create_session(), *stub_user))
+
+
+class TestFrameworkOverheadBenchmarks:
+
+    def test_create_session(self, measure):
+        measure(create_session)
+
+    def test_plain_function(self, measure):
+        def plain_function(value):
+            return value
+
+        measure(lambda: plain_function(1))
+
+    def test_allure_step(self, measure):
+        @allure.step('Step with a value: {value}')
+        def function_with_step(value):
+            return value
+
+        measure(lambda: function_with_step(1))
+
+    @pytest.mark.parametrize("body", [PROFILE_BODY, VALIDATION_ERROR_BODY], ids=["profile", "validation_error"])
+    def test_response_json(self, measure, body):
+        response = response_with(body)
+        measure(response.json)
+
+    # the transport without the network: every response is replayed from the cassette
+    def test_transport_request_replayed(self, measure, tmp_path):
+        cassette = Cassette(str(tmp_path / "cassette.json"), mode="replay")
+        session = create_session()
+        url = "http://127.0.0.1/api/registration"
+        request_body = {"username": "", "email": "not an email", "password": "short"}
+        key = cassette.key_of(session, "POST", url, {"json": request_body})
+        cassette.entries[key] = {"status": 422, "content_type": "application/json",
+                                 "body": json.dumps(VALIDATION_ERROR_BODY), "recorded_at": ""}
+        transport = Transport(cassette=cassette)
+        measure(lambda: transport.request(session, "POST", url, json=request_body).json())
+
+    def test_transport_request(self, measure):
+        transport = Transport()
+        session = create_session()
+        url = os.environ.get("BASIC_URL") + "/api/registration/username_check"
+        measure(lambda: transport.request(session, "POST", url, json={"username": ""}))
@@ -0,0 +1,79 @@
+# benchmarks of every method of the UserAccount-class (see benchmarks/conftest.py for what is measured)
+
+import pytest
+
+from api.api_library.http_session import create_session
+from api.api_library.user_account import UserAccount
+from api.support.username_allocator import get_username_allocator
+from benchmarks.setups import no_arguments, new_credentials, registered_user, logged_in_session, \
+    delete_code_for_new_user
+
+
+@pytest.fixture()
+def user_account_api():
+    return UserAccount(create_session())
+
+
+class TestUserAccountBenchmarks:
+
+    def test_user_registration(self, measure, user_account_api):
+        def setup():
+            generator = new_credentials()
+            return (generator.username, generator.email, generator.password), {}
+
+        measure(user_account_api.user_registration, setup=setup)
+
+    def test_confirm_email(self, measure, user_account_api):
+        def setup():
+            return (registered_user().get_token_from_confirmation_link_for_registration(),), {}
+
+        measure(user_account_api.confirm_email, setup=setup)
+
+    def test_log_in_with_email_or_username(self, measure, user_account_api, stub_user):
+        email, password = stub_user
+        measure(lambda: user_account_api.log_in_with_email_or_username(email, password))
+
+    def test_user_logout(self, measure, stub_user):
+        def setup():
+            return (UserAccount(logged_in_session(*stub_user)),), {}
+
+        measure(UserAccount.user_logout, setup=setup)
+
+    def test_request_delete_user(self, measure, stub_user):
+        user_account_api = UserAccount(logged_in_session(*stub_user))
+        measure(user_account_api.request_delete_user, setup=no_arguments)
+
+    def test_delete_user(self, measure):
+        def setup():
+            session, code = delete_code_for_new_user()
+            return (UserAccount(session), code), {}
+
+        measure(UserAccount.delete_user, setup=setup)
+
+    def test_request_email_verify(self, measure, user_account_api):
+        def setup():
+            return (registered_user().email,), {}
+
+        measure(user_account_api.request_email_verify, setup=setup)
+
+    def test_username_check(self, measure, user_account_api):
+        def setup():
+            return (get_username_allocator().generate(25),), {}
+
+        measure(user_account_api.username_check, setup=setup)
+
+    def test_user_registration_custom_body(self, measure, user_account_api):
+        request_body = {"username": "", "email": "not an email", "password": "short"}
+        measure(lambda: user_account_api.user_registration_custom_body(request_body))
+
+    def test_log_in_with_email_custom_body(self, measure, user_account_api):
+        request_body = {"username": "", "password": ""}
+        measure(lambda: user_account_api.log_in_with_email_custom_body(request_body))
+
+    def test_request_email_verify_custom_body(self, measure, user_account_api):
+        request_body = {"email": "not an email"}
+        measure(lambda: user_account_api.request_email_verify_custom_body(request_body))
+
+    def test_username_check_custom_body(self, measure, user_account_api):
+        request_body = {"username": ""}
+        measure(lambda: user_account_api.username_check_custom_body(request_body))